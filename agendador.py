@@ -0,0 +1,70 @@
+"""
+Agendador de prazos baseado em heap (janela de reconexão, remoção e expiração de salas)
+"""
+import heapq
+import itertools
+
+
+class AgendadorPrazos:
+    """Mantém um prazo por chave e devolve apenas as chaves vencidas.
+
+    Reagendar ou cancelar uma chave não remove a entrada antiga do heap: ela é
+    descartada quando chega ao topo (remoção preguiçosa). O custo de cada
+    varredura é proporcional aos itens vencidos, não ao total de chaves.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._prazos = {}  # chave -> (prazo, seq) vigente
+        self._seq = itertools.count()
+
+    def agendar(self, chave, prazo):
+        """Agenda (ou reagenda) a chave para o instante ``prazo``"""
+        seq = next(self._seq)
+        self._prazos[chave] = (prazo, seq)
+        heapq.heappush(self._heap, (prazo, seq, chave))
+
+    def cancelar(self, chave):
+        """Cancela o prazo da chave. Retorna True se havia um prazo ativo"""
+        return self._prazos.pop(chave, None) is not None
+
+    def prazo(self, chave):
+        """Retorna o prazo vigente da chave, ou None"""
+        atual = self._prazos.get(chave)
+        return atual[0] if atual else None
+
+    def vencidos(self, agora, limite=None):
+        """Remove e retorna as chaves com prazo <= agora (no máximo ``limite``)"""
+        resultado = []
+        heap = self._heap
+        while heap and heap[0][0] <= agora:
+            if limite is not None and len(resultado) >= limite:
+                break
+            prazo, seq, chave = heapq.heappop(heap)
+            if self._prazos.get(chave) != (prazo, seq):
+                continue  # entrada obsoleta (cancelada ou reagendada)
+            del self._prazos[chave]
+            resultado.append(chave)
+        self._compactar()
+        return resultado
+
+    def proximo_prazo(self):
+        """Instante do próximo prazo ativo, ou None"""
+        while self._heap:
+            prazo, seq, chave = self._heap[0]
+            if self._prazos.get(chave) == (prazo, seq):
+                return prazo
+            heapq.heappop(self._heap)
+        return None
+
+    def _compactar(self):
+        # Reconstruir o heap quando as entradas obsoletas dominarem
+        if len(self._heap) > 64 and len(self._heap) > 4 * len(self._prazos):
+            self._heap = [(p, s, c) for c, (p, s) in self._prazos.items()]
+            heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._prazos)
+
+    def __contains__(self, chave):
+        return chave in self._prazos
@@ -1,12 +1,24 @@
 import os
 import time
-import random
-import string
+import atexit
 import logging
-from flask import Flask, render_template, request, jsonify
+from functools import wraps
+from flask import Flask, render_template, request, jsonify, g, has_app_context
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from jogo import Jogador, PartidaMultiplayer, Configuracao
-from health import register_health_routes
+from jogo import Jogador, PartidaMultiplayer, Configuracao, PalavrasDesconhecidas
+from normalizador import estatisticas_cache, lexico_completo
+from registro_salas import RegistroSalas
+from armazenamento import ConflitoVersao, criar_armazenamento
+from fila_mensagens import criar_gerenciador
+from zelador import Zelador
+from agendador import AgendadorPrazos
+from shards import gerar_codigo, validar_shards
+from snapshots import GerenciadorSnapshots
+from delta_estado import CacheVisoes, calcular_delta, chave_visao, copiar_estado, projetar, visiveis_por_jogador
+from health import register_health_routes, register_metrics_provider
+from limitador import LimitadorEventos, ler_limites
+from reacoes import AgregadorReacoes
+from lote_chat import LoteChat
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'jogo_das_palavras_secret')
@@ -14,6 +26,19 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'jogo_das_palavras_secre
 # Detectar se está em produção (Render)
 IS_PRODUCTION = os.environ.get('RENDER') is not None
 
+# Afinidade por processo: com TOTAL_SHARDS > 1, cada processo (SHARD_ID) só cria
+# salas cujo código aponta para ele, e o roteador (roteador.py) encaminha o tráfego
+TOTAL_SHARDS = max(1, int(os.environ.get('TOTAL_SHARDS', 1)))
+validar_shards(TOTAL_SHARDS)
+SHARD_ID = int(os.environ.get('SHARD_ID', 0)) % TOTAL_SHARDS
+
+# Fila de mensagens opcional para distribuir broadcasts entre processos
+# (ex.: redis://localhost:6379/0 ou local://127.0.0.1:5600 para o broker local)
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+opcoes_fila = {}
+if SOCKETIO_MESSAGE_QUEUE:
+    opcoes_fila['client_manager'] = criar_gerenciador(SOCKETIO_MESSAGE_QUEUE)
+
 # Configurações condicionais para SocketIO
 if IS_PRODUCTION:
     # Usa gevent no Render (compatível com gunicorn worker gevent)
@@ -24,7 +49,8 @@ if IS_PRODUCTION:
         ping_interval=25,
         logger=False,
         engineio_logger=False,
-        async_mode='gevent'
+        async_mode='gevent',
+        **opcoes_fila
     )
 else:
     socketio = SocketIO(
@@ -34,7 +60,8 @@ else:
         ping_interval=60,
         logger=True,
         engineio_logger=True,
-        async_mode='threading'
+        async_mode='threading',
+        **opcoes_fila
     )
 
 # Configurar logging
@@ -43,8 +70,26 @@ logger = logging.getLogger(__name__)
 
 # Registrar rotas de health check
 register_health_routes(app)
-
-salas = {}
+if SOCKETIO_MESSAGE_QUEUE:
+    register_metrics_provider('fila_mensagens', opcoes_fila['client_manager'].estatisticas)
+if TOTAL_SHARDS > 1:
+    register_metrics_provider('shard', lambda: {'id': SHARD_ID, 'total': TOTAL_SHARDS, 'salas': len(salas)})
+
+def _salas_do_evento():
+    """Códigos de sala já conferidos no armazenamento durante o evento atual"""
+    if not has_app_context():
+        return None
+    if 'salas_conferidas' not in g:
+        g.salas_conferidas = set()
+    return g.salas_conferidas
+
+# Salas indexadas por código, com índices reversos SID → sala/jogador.
+# SALAS_BACKEND=redis (com REDIS_URL) compartilha o estado entre workers;
+# cada evento do Socket.IO confere a versão de uma sala uma única vez.
+salas = RegistroSalas(criar_armazenamento(
+    os.environ.get('SALAS_BACKEND', 'memoria'),
+    os.environ.get('REDIS_URL')
+), escopo=_salas_do_evento)
 
 # Pool de possíveis "memes" locais (arquivos em static/avatars/<slug>.(svg|webp|png|jpg|jpeg))
 AVATAR_MEME_SLUGS = [
@@ -142,43 +187,179 @@ def broadcast_status_prontos(codigo):
     except Exception as e:
         logger.error(f'Erro ao emitir status de prontos: {e}', exc_info=True)
 
-def limpar_salas_inativas():
-    """Remove salas inativas (sem jogadores há mais de 1 hora) ou marcadas para remoção (após 5 minutos)"""
-    tempo_atual = time.time()
-    
-    salas_para_remover = []
-    for codigo, sala in salas.items():
-        # Remover salas inativas há mais de 1 hora
-        if 'ultimo_acesso' in sala and (tempo_atual - sala['ultimo_acesso']) > 3600:
-            # Remover apenas se não houver jogadores
-            if len(sala['players']) == 0:
-                salas_para_remover.append(codigo)
-                logger.info(f'Sala inativa {codigo} será removida (inativa por mais de 1 hora)')
-        
-        # Remover salas marcadas para remoção após o tempo definido
-        if 'marcada_para_remocao' in sala and tempo_atual > sala['marcada_para_remocao']:
-            # Se ainda houver jogadores, estender o prazo
-            if len(sala['players']) > 0:
-                logger.info(f'Estendendo prazo de remoção da sala {codigo} - ainda tem {len(sala["players"])} jogadores')
-                sala['marcada_para_remocao'] = tempo_atual + 300  # mais 5 minutos
-            else:
-                # Verificar se a sala foi criada recentemente (menos de 1 minuto)
-                sala_recente = False
-                if 'criada_em' in sala and (tempo_atual - sala['criada_em']) < 60:
-                    # Sala recém-criada - dar mais tempo para o criador reconectar
-                    sala_recente = True
-                    logger.info(f'Sala {codigo} é recente, adiando remoção')
-                    sala['marcada_para_remocao'] = tempo_atual + 120  # mais 2 minutos
-                
-                if not sala_recente:
-                    salas_para_remover.append(codigo)
-                    logger.info(f'Sala {codigo} será removida (marcada para remoção e tempo expirado)')
-    
-    # Remover as salas identificadas
-    for codigo in salas_para_remover:
-        if codigo in salas:  # Verificação extra para evitar KeyError
-            del salas[codigo]
-            logger.info(f'Sala {codigo} removida')
+# ===== Estado do jogo versionado (broadcast por deltas) =====
+# sala['estado_transmitido'] guarda a última versão enviada: {'versao': n, 'estado': {...}}
+def montar_estado(sala):
+    """Estado atual da partida com o SID do criador"""
+    estado = sala['partida'].get_estado_jogo()
+    estado['criador'] = sala.get('criador')
+    return estado
+
+def registrar_estado_completo(sala):
+    """Registra o estado atual como nova versão. Retorna {'versao', 'estado'}"""
+    anterior = sala.get('estado_transmitido')
+    versao = (anterior['versao'] if anterior else 0) + 1
+    estado = copiar_estado(montar_estado(sala))
+    sala['estado_transmitido'] = {'versao': versao, 'estado': estado}
+    return {'versao': versao, 'estado': estado}
+
+def registrar_delta_estado(sala):
+    """Registra o estado atual como nova versão. Retorna {'versao', 'base', 'delta'}"""
+    anterior = sala.get('estado_transmitido')
+    if anterior is None:
+        return registrar_estado_completo(sala)
+    estado = copiar_estado(montar_estado(sala))
+    delta = calcular_delta(anterior['estado'], estado)
+    if not delta:
+        return {'versao': anterior['versao'], 'base': anterior['versao'], 'delta': delta}
+    versao = anterior['versao'] + 1
+    sala['estado_transmitido'] = {'versao': versao, 'estado': estado}
+    return {'versao': versao, 'base': anterior['versao'], 'delta': delta}
+
+def estado_versionado(sala):
+    """Estado completo da última versão enviada (para quem entra ou perdeu versões)"""
+    transmitido = sala.get('estado_transmitido')
+    if transmitido is None:
+        return registrar_estado_completo(sala)
+    return {'versao': transmitido['versao'], 'estado': transmitido['estado']}
+
+# Cada jogador recebe a sua visão do estado (ele, quem o tem como alvo, espectador);
+# visões iguais são montadas uma vez por versão e reaproveitadas
+visoes = CacheVisoes()
+register_metrics_provider('visoes_estado', visoes.estatisticas)
+register_metrics_provider('cache_normalizador', estatisticas_cache)
+
+def visao_do_jogador(codigo, sala, versionado, nome, visiveis=None):
+    """Projeção do estado versionado para o jogador ``nome`` (cacheada por versão)"""
+    estado = sala['estado_transmitido']['estado']
+    if visiveis is None:
+        visiveis = visiveis_por_jogador(estado)
+    vistos = visiveis.get(nome, frozenset())
+    return visoes.obter(codigo, versionado['versao'], chave_visao(versionado, vistos),
+                        lambda: projetar(versionado, estado, vistos))
+
+def emitir_estado(codigo, sala, evento, versionado, extras=None, emissor=None):
+    """Envia o estado versionado a cada jogador conectado, na visão dele"""
+    emissor = emissor or emit
+    visiveis = visiveis_por_jogador(sala['estado_transmitido']['estado'])
+    grupos = {}
+    for sid, nome in sala.get('players', {}).items():
+        visao = visao_do_jogador(codigo, sala, versionado, nome, visiveis)
+        grupos.setdefault(id(visao), (visao, []))[1].append(sid)
+    for visao, sids in grupos.values():
+        emissor(evento, {**(extras or {}), **visao}, to=sids)
+
+# ===== Gravação com controle de versão (backend compartilhado) =====
+def alterar_sala(codigo, alterar, tentativas=3):
+    """Aplica ``alterar(sala)`` e grava, repetindo sobre o estado recarregado
+    se outro worker gravou a sala antes (``ConflitoVersao``).
+
+    ``alterar`` pode rodar mais de uma vez, então só deve mexer na sala (nada
+    de emitir); para desistir sem gravar, levanta ``ValueError``. Retorna
+    ``(sala, resultado)``, ou ``(None, None)`` se a sala deixou de existir.
+    """
+    for tentativa in range(tentativas):
+        sala = salas.get(codigo)
+        if sala is None:
+            return None, None
+        resultado = alterar(sala)
+        try:
+            salas.salvar(codigo)
+            return sala, resultado
+        except ConflitoVersao:
+            if tentativa == tentativas - 1:
+                raise
+            logger.info(f'Conflito de versão na sala {codigo}; repetindo sobre o estado atual')
+
+def avisar_conflito(codigo):
+    """A alteração perdeu para a de outro worker: reenvia o estado atual e pede nova tentativa"""
+    logger.warning(f'Conflito de versão na sala {codigo}; alteração descartada')
+    emit('erro', {'msg': 'A sala foi alterada ao mesmo tempo por outro jogador. Tente novamente.'})
+    sala = salas.get(codigo)
+    if sala is not None and sala['partida'].jogo_iniciado:
+        nome = salas.salas_do_sid(request.sid).get(codigo, '')
+        emit('estado_completo', visao_do_jogador(codigo, sala, estado_versionado(sala), nome))
+
+# ===== Prazos das salas (reconexão, remoção e inatividade) =====
+PRAZO_RECONEXAO = 30  # segundos para o jogador reconectar
+PRAZO_INATIVIDADE = 3600  # sala sem jogadores é removida após 1 hora sem acesso
+
+agendador = AgendadorPrazos()
+
+def agendar_inatividade(codigo, sala):
+    """Agenda a verificação de inatividade a partir do último acesso da sala"""
+    agendador.agendar(('inatividade', codigo), sala.get('ultimo_acesso', time.time()) + PRAZO_INATIVIDADE)
+
+def marcar_para_remocao(codigo, sala, prazo):
+    """Marca a sala para remoção no instante ``prazo``"""
+    sala['marcada_para_remocao'] = prazo
+    agendador.agendar(('remocao', codigo), prazo)
+
+def registrar_desconexao(codigo, sala, nome, tempo_atual):
+    """Abre a janela de reconexão do jogador"""
+    sala.setdefault('desconexoes', {})[nome] = tempo_atual
+    agendador.agendar(('reconexao', codigo, nome), tempo_atual + PRAZO_RECONEXAO)
+
+def cancelar_desconexao(codigo, sala, nome):
+    """Fecha a janela de reconexão do jogador. Retorna True se ele estava desconectado"""
+    agendador.cancelar(('reconexao', codigo, nome))
+    return sala.get('desconexoes', {}).pop(nome, None) is not None
+
+def remover_sala(codigo):
+    """Remove a sala e cancela os prazos pendentes dela"""
+    sala = salas.get(codigo)
+    if sala is None:
+        return False
+    del salas[codigo]
+    visoes.descartar(codigo)
+    reacoes.descartar_sala(codigo)
+    if lote_chat:
+        lote_chat.descartar_sala(codigo)
+    agendador.cancelar(('inatividade', codigo))
+    agendador.cancelar(('remocao', codigo))
+    for nome in sala.get('desconexoes', {}):
+        agendador.cancelar(('reconexao', codigo, nome))
+    logger.info(f'Sala {codigo} removida')
+    return True
+
+def verificar_inatividade(codigo, sala, tempo_atual):
+    """Remove a sala se estiver sem jogadores e sem acesso há mais de 1 hora. Retorna True se removida"""
+    prazo = sala.get('ultimo_acesso', tempo_atual) + PRAZO_INATIVIDADE
+    if prazo > tempo_atual:
+        # Houve acesso depois do agendamento: reagendar a partir do último acesso
+        agendador.agendar(('inatividade', codigo), prazo)
+        return False
+    if len(sala['players']) > 0:
+        agendador.agendar(('inatividade', codigo), tempo_atual + PRAZO_INATIVIDADE)
+        return False
+    logger.info(f'Sala inativa {codigo} será removida (inativa por mais de 1 hora)')
+    return remover_sala(codigo)
+
+def verificar_remocao(codigo, sala, tempo_atual):
+    """Remove a sala marcada para remoção cujo prazo expirou. Retorna True se removida"""
+    prazo = sala.get('marcada_para_remocao')
+    if prazo is None:
+        return False
+    if tempo_atual <= prazo:
+        agendador.agendar(('remocao', codigo), prazo)
+        return False
+
+    # Se ainda houver jogadores, estender o prazo
+    if len(sala['players']) > 0:
+        logger.info(f'Estendendo prazo de remoção da sala {codigo} - ainda tem {len(sala["players"])} jogadores')
+        marcar_para_remocao(codigo, sala, tempo_atual + 300)  # mais 5 minutos
+        salas.salvar(codigo)
+        return False
+
+    # Sala recém-criada (menos de 1 minuto) - dar mais tempo para o criador reconectar
+    if 'criada_em' in sala and (tempo_atual - sala['criada_em']) < 60:
+        logger.info(f'Sala {codigo} é recente, adiando remoção')
+        marcar_para_remocao(codigo, sala, tempo_atual + 120)  # mais 2 minutos
+        salas.salvar(codigo)
+        return False
+
+    logger.info(f'Sala {codigo} será removida (marcada para remoção e tempo expirado)')
+    return remover_sala(codigo)
 
 def verificar_iniciar_jogo(codigo):
     """Verifica se o jogo pode ser iniciado e o inicia se possível"""
@@ -218,14 +399,12 @@ def verificar_iniciar_jogo(codigo):
     # Tudo pronto, iniciar jogo!
     try:
         partida.iniciar_jogo()
+        completo = registrar_estado_completo(sala)
+        salas.salvar(codigo)
         
-        estado = partida.get_estado_jogo()
-        # Incluir info do criador no estado
-        estado['criador'] = sala.get('criador')
-        emit('jogo_iniciado', {
-            'msg': 'Todos definiram as palavras! O jogo começou!',
-            'estado': estado
-        }, room=codigo)
+        emitir_estado(codigo, sala, 'jogo_iniciado', completo, {
+            'msg': 'Todos definiram as palavras! O jogo começou!'
+        })
         
         logger.info(f'Jogo iniciado na sala {codigo} com {len(partida.jogadores)} jogadores')
         return True
@@ -234,61 +413,210 @@ def verificar_iniciar_jogo(codigo):
         emit('erro', {'msg': f'Erro ao iniciar jogo: {str(e)}'}, room=codigo)
         return False
 
-def limpar_jogadores_desconectados():
-    """Remove jogadores desconectados após período de reconexão"""
-    tempo_atual = time.time()
-    
-    for codigo, sala in list(salas.items()):
-        if 'desconexoes' in sala:
-            jogadores_para_remover = []
-            
-            for nome_jogador, tempo_desconexao in list(sala['desconexoes'].items()):
-                if tempo_atual - tempo_desconexao > 30:  # 30 segundos para reconectar
-                    jogadores_para_remover.append(nome_jogador)
-            
-            # Remover jogadores que não reconectaram no tempo
-            for nome_jogador in jogadores_para_remover:
-                partida = sala['partida']
-                partida.jogadores = [j for j in partida.jogadores if j.nome.lower() != nome_jogador.lower()]
-                
-                # Remover da lista de desconexões
-                del sala['desconexoes'][nome_jogador]
-                
-                # Notificar os outros na sala
-                emit('jogador_saiu', {
-                    'jogador': nome_jogador,
-                    'msg': f'{nome_jogador} saiu da sala (tempo de reconexão expirou)',
-                    'jogadores_restantes': [j.nome for j in partida.jogadores]
-                }, room=codigo)
-                
-                logger.info(f'Jogador {nome_jogador} removido da sala {codigo} (tempo de reconexão expirou)')
-                
-                # Se criador atual não tem SID válido, promover alguém conectado
-                criador_sid = sala.get('criador')
-                if criador_sid not in sala.get('players', {}) and len(sala.get('players', {})) > 0:
-                    novo_criador_sid, novo_criador_nome = next(iter(sala['players'].items()))
-                    sala['criador'] = novo_criador_sid
-                    emit('novo_criador', { 'nome': novo_criador_nome }, room=codigo)
-                
-                # Reconfigurar alvos se necessário e o jogo já tiver iniciado
-                if len(partida.jogadores) >= 2:
-                    try:
-                        estado = partida.get_estado_jogo()
-                        if estado and 'jogador_da_vez' in estado:
-                            partida._configurar_alvos()
-                            estado = partida.get_estado_jogo()
-                            estado['criador'] = sala.get('criador')
-                            emit('estado_atualizado', {'estado': estado}, room=codigo)
-                    except Exception:
-                        pass
+def expirar_reconexao(codigo, sala, nome_jogador, tempo_atual):
+    """Remove da sala o jogador que não reconectou dentro da janela. Retorna True se removido"""
+    tempo_desconexao = sala.get('desconexoes', {}).get(nome_jogador)
+    if tempo_desconexao is None:
+        return False
+    if tempo_atual - tempo_desconexao <= PRAZO_RECONEXAO:
+        agendador.agendar(('reconexao', codigo, nome_jogador), tempo_desconexao + PRAZO_RECONEXAO)
+        return False
 
-def limpar_mensagens_antigas():
-    """Limita o número de mensagens de chat por sala para economizar memória"""
-    for codigo, sala in salas.items():
-        if 'partida' in sala:
-            partida = sala['partida']
-            if hasattr(partida, 'mensagens_chat') and len(partida.mensagens_chat) > 50:
-                partida.mensagens_chat = partida.mensagens_chat[-50:]  # Manter apenas as 50 mais recentes
+    partida = sala['partida']
+    partida.remover_jogador(nome_jogador)
+    
+    # Remover da lista de desconexões
+    del sala['desconexoes'][nome_jogador]
+    
+    # Notificar os outros na sala (fora de contexto de requisição: usar socketio.emit)
+    socketio.emit('jogador_saiu', {
+        'jogador': nome_jogador,
+        'msg': f'{nome_jogador} saiu da sala (tempo de reconexão expirou)',
+        'jogadores_restantes': [j.nome for j in partida.jogadores]
+    }, room=codigo)
+    
+    logger.info(f'Jogador {nome_jogador} removido da sala {codigo} (tempo de reconexão expirou)')
+    
+    # Se criador atual não tem SID válido, promover alguém conectado
+    criador_sid = sala.get('criador')
+    if criador_sid not in sala.get('players', {}) and len(sala.get('players', {})) > 0:
+        novo_criador_sid, novo_criador_nome = next(iter(sala['players'].items()))
+        sala['criador'] = novo_criador_sid
+        socketio.emit('novo_criador', { 'nome': novo_criador_nome }, room=codigo)
+    
+    # Reconfigurar alvos se necessário e o jogo já tiver iniciado
+    if len(partida.jogadores) >= 2:
+        try:
+            estado = partida.get_estado_jogo()
+            if estado and 'jogador_da_vez' in estado:
+                partida._configurar_alvos()
+                emitir_estado(codigo, sala, 'estado_atualizado', registrar_delta_estado(sala), emissor=socketio.emit)
+        except Exception:
+            pass
+    salas.salvar(codigo)
+    return True
+
+def disparar_prazo(chave, tempo_atual):
+    """Trata um prazo vencido do agendador. Retorna True se a sala foi removida"""
+    tipo, codigo = chave[0], chave[1]
+    sala = salas.get(codigo)
+    if sala is None:
+        return False
+    if tipo == 'reconexao':
+        expirar_reconexao(codigo, sala, chave[2], tempo_atual)
+        return False
+    if tipo == 'remocao':
+        return verificar_remocao(codigo, sala, tempo_atual)
+    if tipo == 'inatividade':
+        return verificar_inatividade(codigo, sala, tempo_atual)
+    return False
+
+# Prazos disparados em segundo plano (iniciado no worker, ver iniciar_tarefas)
+zelador = Zelador(
+    socketio,
+    agendador,
+    disparar_prazo,
+    intervalo=float(os.environ.get('ZELADOR_INTERVALO', 5)),
+    orcamento_ms=float(os.environ.get('ZELADOR_ORCAMENTO_MS', 20)),
+)
+register_metrics_provider('zelador', zelador.estatisticas)
+
+# Limite de eventos por conexão e por jogador (LIMITES_EVENTOS=evento=capacidade/taxa,...)
+limitador = LimitadorEventos(ler_limites(os.environ.get('LIMITES_EVENTOS')))
+register_metrics_provider('limitador', limitador.estatisticas)
+
+# Reações agregadas por sala: um quadro a cada REACOES_JANELA_MS (0 = envio imediato)
+reacoes = AgregadorReacoes(socketio, janela=float(os.environ.get('REACOES_JANELA_MS', 100)) / 1000)
+register_metrics_provider('reacoes', reacoes.estatisticas)
+
+# Chat em lotes (opcional): CHAT_LOTE_MS > 0 junta as mensagens da sala por até esse
+# tempo ou CHAT_LOTE_MAX mensagens num só pacote nova_mensagem_chat
+lote_chat = None
+CHAT_LOTE_MS = float(os.environ.get('CHAT_LOTE_MS', 0))
+if CHAT_LOTE_MS > 0:
+    lote_chat = LoteChat(socketio, intervalo=CHAT_LOTE_MS / 1000, tamanho_maximo=int(os.environ.get('CHAT_LOTE_MAX', 20)))
+    register_metrics_provider('lote_chat', lote_chat.estatisticas)
+
+def limitado(evento):
+    """Descarta o evento sem processá-lo quando a conexão ou o jogador passou do limite.
+
+    O jogador é o associado ao SID pelo servidor; o player_id do payload não conta.
+    """
+    def decorar(handler):
+        @wraps(handler)
+        def envolvido(data=None, *args):
+            if not limitador.permitir(evento, request.sid):
+                return None
+            return handler(data, *args)
+        return envolvido
+    return decorar
+
+def preparar_sala_restaurada(codigo, sala):
+    """Ajusta uma sala lida do snapshot: os SIDs antigos não existem mais"""
+    tempo_atual = time.time()
+    sala['criador_restaurado'] = sala.get('players', {}).get(sala.get('criador'))
+    sala['criador'] = None
+    nomes = [j.nome for j in sala['partida'].jogadores]
+    sala['players'] = {}
+    sala['players_prontos'] = set()
+    # Janela de reconexão estendida para todos (o reinício também consumiu tempo)
+    sala['desconexoes'] = {}
+    for nome in nomes:
+        registrar_desconexao(codigo, sala, nome, tempo_atual + PRAZO_RECONEXAO)
+    if sala.get('marcada_para_remocao') is not None:
+        marcar_para_remocao(codigo, sala, max(sala['marcada_para_remocao'], tempo_atual + 120))
+    agendar_inatividade(codigo, sala)
+
+# Snapshots incrementais em disco (SNAPSHOT_ARQUIVO); só com o backend em memória,
+# já que um backend compartilhado sobrevive ao reinício do processo
+snapshots = None
+SNAPSHOT_ARQUIVO = os.environ.get('SNAPSHOT_ARQUIVO')
+if SNAPSHOT_ARQUIVO and not salas.armazenamento.compartilhado:
+    snapshots = GerenciadorSnapshots(
+        salas,
+        SNAPSHOT_ARQUIVO,
+        socketio,
+        intervalo=float(os.environ.get('SNAPSHOT_INTERVALO', 10)),
+    )
+    snapshots.restaurar(preparar_sala_restaurada)
+    atexit.register(snapshots.salvar_incremental)
+    register_metrics_provider('snapshots', snapshots.estatisticas)
+
+# ===== Passagem das salas entre workers do gunicorn =====
+# O worker é reciclado após max_requests; antes de sair ele grava todas as salas
+# em memória compartilhada e o substituto as carrega antes de atender conexões
+PASSAGEM_ARQUIVO = os.environ.get(
+    'PASSAGEM_ARQUIVO',
+    '/dev/shm/corrente_verbal_passagem.snap' if os.path.isdir('/dev/shm') else '/tmp/corrente_verbal_passagem.snap'
+)
+PASSAGEM_VALIDADE = 60  # segundos; arquivos mais antigos são descartados
+
+def entregar_salas():
+    """Grava as salas para o próximo worker (hook worker_exit do gunicorn)"""
+    if salas.armazenamento.compartilhado or len(salas) == 0:
+        return 0
+    if snapshots:
+        snapshots.salvar_incremental()
+    total = GerenciadorSnapshots(salas, PASSAGEM_ARQUIVO).salvar_completo()
+    logger.info(f'{total} salas entregues ao próximo worker em {PASSAGEM_ARQUIVO}')
+    return total
+
+def _passagem_recente():
+    """Indica se há uma passagem de salas válida; descarta arquivos antigos"""
+    if not os.path.exists(PASSAGEM_ARQUIVO):
+        return False
+    if time.time() - os.path.getmtime(PASSAGEM_ARQUIVO) <= PASSAGEM_VALIDADE:
+        return True
+    logger.warning(f'Passagem de salas antiga descartada: {PASSAGEM_ARQUIVO}')
+    os.remove(PASSAGEM_ARQUIVO)
+    return False
+
+def _carregar_passagem():
+    """Carrega as salas entregues, sobrepondo as de mesmo código já presentes"""
+    total = GerenciadorSnapshots(salas, PASSAGEM_ARQUIVO).restaurar(preparar_sala_restaurada)
+    os.remove(PASSAGEM_ARQUIVO)
+    return total
+
+def _aguardar_passagem(limite):
+    """Espera o worker anterior entregar as salas; sem entrega no prazo, usa o snapshot.
+
+    Salas criadas neste worker durante a espera são mantidas: as entregues
+    prevalecem nos códigos repetidos e o snapshot só preenche as que faltam.
+    """
+    while time.time() < limite:
+        socketio.sleep(0.5)
+        if _passagem_recente():
+            _carregar_passagem()
+            return
+    logger.warning('O worker anterior não entregou as salas no prazo')
+    if snapshots:
+        snapshots.restaurar(preparar_sala_restaurada, ignorar_existentes=True)
+
+def receber_salas(espera=0):
+    """Carrega as salas no worker recém-criado (hook post_worker_init do gunicorn).
+
+    Com preload_app as salas herdadas do processo mestre estão desatualizadas:
+    valem as entregues pelo worker anterior ou, na falta delas, o snapshot em
+    disco. Num reload (HUP) o novo worker sobe antes de o antigo sair; nesse
+    caso a passagem é aguardada em segundo plano por até ``espera`` segundos,
+    sem carregar o snapshot, que é mais antigo que ela (traria de volta salas
+    já removidas e versões anteriores das demais).
+    """
+    if salas.armazenamento.compartilhado:
+        return 0
+    for codigo in list(salas):
+        del salas[codigo]
+    # A limpeza não é remoção de verdade: sem isto o próximo snapshot incremental
+    # gravaria a remoção de todas as salas e o snapshot não serviria de reserva
+    salas.armazenamento.retirar_alteracoes()
+    if _passagem_recente():
+        return _carregar_passagem()
+    if espera > 0:
+        socketio.start_background_task(_aguardar_passagem, time.time() + espera)
+        return 0
+    if snapshots:
+        return snapshots.restaurar(preparar_sala_restaurada)
+    return 0
 
 @app.route('/')
 def index():
@@ -308,77 +636,97 @@ def teste_meusid():
 def sala_jogo(codigo):
     return render_template('jogo.html')
 
+def iniciar_tarefas():
+    """Inicia o zelador e os snapshots periódicos no processo que atende as conexões.
+
+    Com preload_app o módulo é importado no mestre do gunicorn, onde tarefas
+    em segundo plano não sobrevivem ao fork; por isso o início fica para o
+    hook post_worker_init (ou para o ``__main__``). Assim os prazos das salas
+    restauradas vencem mesmo que ninguém se conecte.
+    """
+    zelador.iniciar()
+    if snapshots:
+        snapshots.iniciar()
+
 @socketio.on('connect')
-def on_connect():
+def on_connect(auth=None):
     logger.info(f'Cliente conectado: {request.sid}')
-    # Limpar recursos para economizar memória
-    limpar_salas_inativas()
-    limpar_jogadores_desconectados()
-    limpar_mensagens_antigas()
-    
-    # Debug - mostrar salas ativas após cada conexão
-    debug_salas()
+    if isinstance(auth, dict):
+        limitador.associar(request.sid, auth.get('player_id'))
+    # Já iniciadas no worker; aqui só cobre servidores sem o hook do gunicorn
+    iniciar_tarefas()
 
 @socketio.on('disconnect')
 def on_disconnect():
     logger.info(f'Cliente desconectado: {request.sid}')
+    limitador.esquecer(request.sid)
     
-    # Procurar o jogador em todas as salas
-    for codigo, sala in list(salas.items()):
-        if request.sid in sala['players']:
-            nome_jogador = sala['players'][request.sid]
-            
-            # Remover da lista de players deste SID
-            del sala['players'][request.sid]
+    # Localizar as salas deste SID pelo índice reverso; cada sala é tratada à parte
+    # para que uma falha (ex.: conflito de versão persistente) não pule as demais
+    for codigo in list(salas.salas_do_sid(request.sid)):
+        try:
+            desconectar_da_sala(codigo, request.sid)
+        except ConflitoVersao:
+            logger.error(f'Conflito de versão persistente ao desconectar {request.sid} da sala {codigo}')
+        except Exception as e:
+            logger.error(f'Erro ao desconectar {request.sid} da sala {codigo}: {e}', exc_info=True)
+
+def desconectar_da_sala(codigo, sid):
+    """Tira o SID da sala e abre a janela de reconexão (ou promove outro criador)"""
+    def sair(sala):
+        removidos = salas.desconectar(sid, codigo, salvar=False)
+        if not removidos:
+            return None
+        nome_jogador = removidos[0][1]
+        tempo_atual = time.time()
 
-            # Remover do set de prontos imediatamente para não travar o início
-            try:
-                sala.setdefault('players_prontos', set()).discard(nome_jogador)
-            except Exception:
-                pass
+        # Remover do set de prontos imediatamente para não travar o início
+        sala.setdefault('players_prontos', set()).discard(nome_jogador)
 
-            # Atualizar status de prontos
-            broadcast_status_prontos(codigo)
-            
-            # Se for o criador, promover automaticamente outro jogador se houver
-            if request.sid == sala['criador']:
-                tempo_atual = time.time()
-                if len(sala['players']) > 0:
-                    # Promover o primeiro SID disponível
-                    novo_criador_sid, novo_criador_nome = next(iter(sala['players'].items()))
-                    sala['criador'] = novo_criador_sid
-                    emit('novo_criador', { 'nome': novo_criador_nome }, room=codigo)
-                    logger.info(f'Criador desconectou na sala {codigo}. Novo criador: {novo_criador_nome}')
-                else:
-                    # Sem jogadores restantes: marcar para remoção rápida
-                    sala['marcada_para_remocao'] = tempo_atual + 60
-                    logger.info(f'Sala {codigo} marcada para remoção (criador saiu e não há mais jogadores)')
-                # Atualizar o último acesso
-                sala['ultimo_acesso'] = tempo_atual
-                continue
-            # Verificar se o jogador ainda tem conexões ativas (em outras abas)
-            jogador_ainda_conectado = False
-            for sid, nome in sala['players'].items():
-                if nome.lower() == nome_jogador.lower():
-                    jogador_ainda_conectado = True
-                    break
-                    
-            # Se o jogador não estiver mais conectado, remover da partida após 30 segundos (permitir reconexão)
-            if not jogador_ainda_conectado:
-                # Definir timestamp de desconexão para permitir janela de reconexão
-                sala['desconexoes'] = sala.get('desconexoes', {})
-                sala['desconexoes'][nome_jogador] = time.time()
-                
-                # Notificar os outros na sala
-                emit('jogador_desconectado', {
-                    'jogador': nome_jogador,
-                    'msg': f'{nome_jogador} desconectou-se (tem 30 segundos para reconectar)',
-                    'jogadores_restantes': [j.nome for j in sala['partida'].jogadores]
-                }, room=codigo)
-                
-                logger.info(f'Jogador {nome_jogador} desconectado da sala {codigo} (janela de reconexão iniciada)')
+        # Se for o criador, promover automaticamente outro jogador se houver
+        if sid == sala['criador']:
+            novo_criador = next(iter(sala['players'].items()), None)
+            if novo_criador:
+                # Promover o primeiro SID disponível
+                sala['criador'] = novo_criador[0]
+            else:
+                # Sem jogadores restantes: marcar para remoção rápida
+                marcar_para_remocao(codigo, sala, tempo_atual + 60)
+            # Atualizar o último acesso
+            sala['ultimo_acesso'] = tempo_atual
+            return nome_jogador, 'criador', novo_criador
+
+        # Se o jogador não tiver mais conexões (outras abas), abrir a janela de reconexão
+        if not salas.esta_conectado(codigo, nome_jogador):
+            registrar_desconexao(codigo, sala, nome_jogador, tempo_atual)
+            return nome_jogador, 'desconectado', None
+        return nome_jogador, None, None
+
+    sala, resultado = alterar_sala(codigo, sair)
+    if sala is None or resultado is None:
+        return
+    nome_jogador, situacao, novo_criador = resultado
+
+    # Atualizar status de prontos
+    broadcast_status_prontos(codigo)
+
+    if situacao == 'criador':
+        if novo_criador:
+            emit('novo_criador', { 'nome': novo_criador[1] }, room=codigo)
+            logger.info(f'Criador desconectou na sala {codigo}. Novo criador: {novo_criador[1]}')
+        else:
+            logger.info(f'Sala {codigo} marcada para remoção (criador saiu e não há mais jogadores)')
+    elif situacao == 'desconectado':
+        # Notificar os outros na sala
+        emit('jogador_desconectado', {
+            'jogador': nome_jogador,
+            'msg': f'{nome_jogador} desconectou-se (tem 30 segundos para reconectar)',
+            'jogadores_restantes': [j.nome for j in sala['partida'].jogadores]
+        }, room=codigo)
+        logger.info(f'Jogador {nome_jogador} desconectado da sala {codigo} (janela de reconexão iniciada)')
 
 @socketio.on('criar_sala')
+@limitado('criar_sala')
 def criar_sala(data):
     try:
         logger.info(f'=== INÍCIO CRIAR_SALA ===')
@@ -392,8 +740,11 @@ def criar_sala(data):
         modo = (data.get('modo') or 'classico').strip().lower()
         if modo not in ('classico', 'cooperativo', 'duelo', 'relampago'):
             modo = 'classico'
+        # Validar palavras no dicionário (só com léxico carregado, ver LEXICO_ARQUIVO)
+        validar_palavras = bool(data.get('validar_palavras')) and lexico_completo()
         # Novo: capturar player_id (para identidade estável/avatares)
         player_id = (data or {}).get('player_id')
+        limitador.associar(request.sid, player_id)
 
         logger.info(f'Parâmetros processados: nome={nome}, palavras={num_palavras}, max={max_jogadores}, modo={modo}')
 
@@ -410,7 +761,7 @@ def criar_sala(data):
         # Gera código único com mais tentativas
         codigo = None
         for tentativa in range(20):  # Aumentado de 10 para 20
-            codigo_tentativa = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+            codigo_tentativa = gerar_codigo(SHARD_ID, TOTAL_SHARDS)
             if codigo_tentativa not in salas:
                 codigo = codigo_tentativa
                 logger.info(f'Código gerado na tentativa {tentativa + 1}: {codigo}')
@@ -418,7 +769,7 @@ def criar_sala(data):
                 
         # Se não conseguir gerar um código único, gerar um mais longo
         if not codigo:
-            codigo = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+            codigo = gerar_codigo(SHARD_ID, TOTAL_SHARDS, tamanho=8)
             logger.warning(f'Usando código longo devido a colisões: {codigo}')
             
         logger.info(f'Criando sala com código: {codigo} por {nome} ({request.sid})')
@@ -445,9 +796,12 @@ def criar_sala(data):
             'ultimo_acesso': tempo_atual,
             'criada_em': tempo_atual,
             'modo': modo,
+            'validar_palavras': validar_palavras,
         }
         # Definir avatar do criador
         _get_avatar_for(salas[codigo], nome)
+        salas.salvar(codigo)
+        agendar_inatividade(codigo, salas[codigo])
 
         logger.info(f'Sala {codigo} salva no dicionário. Total de salas: {len(salas)}')
 
@@ -461,7 +815,8 @@ def criar_sala(data):
             'nome': nome,
             'config': {
                 'num_palavras': num_palavras,
-                'max_jogadores': max_jogadores
+                'max_jogadores': max_jogadores,
+                'validar_palavras': validar_palavras
             },
             'players': salas[codigo]['players'],
             'criador': salas[codigo]['criador'],
@@ -472,9 +827,6 @@ def criar_sala(data):
 
         # Emite confirmação de criação, incluindo players e criador
         emit('sala_criada', resposta)
-        
-        # Logar detalhes da sala criada para debug
-        debug_salas()
 
         logger.info(f'=== SUCESSO CRIAR_SALA: {codigo} ===')
 
@@ -487,6 +839,7 @@ def criar_sala(data):
         emit('erro', {'msg': 'Erro interno do servidor'})
 
 @socketio.on('entrar_na_sala')
+@limitado('entrar_na_sala')
 def entrar_na_sala(data):
     try:
         # Garantir que o código de sala seja sempre normalizado
@@ -503,7 +856,7 @@ def entrar_na_sala(data):
             emit('erro', {'msg': 'Código da sala é obrigatório'})
             return
         if codigo not in salas:
-            logger.warning(f'Sala não encontrada: "{codigo}" (original: "{codigo_original}"). Salas disponíveis: {list(salas.keys())}')
+            logger.warning(f'Sala não encontrada: "{codigo}" (original: "{codigo_original}")')
             emit('erro', {'msg': 'Sala não encontrada. Verifique o código e tente novamente.'})
             return
         if not nome:
@@ -525,17 +878,14 @@ def entrar_na_sala(data):
                 emit('erro', {'msg': 'Este nome já está em uso na sala. Escolha outro.'})
                 return
             sala['player_ids'][nome_key] = player_id
+            limitador.associar(request.sid, player_id)
 
         # Verifica se o jogador já está na sala (pelo nome)
-        jogador_existente = next((j for j in partida.jogadores if j.nome.lower() == nome_key), None)
+        jogador_existente = partida.obter_jogador(nome)
 
         # Verificar criador atual por SID → nome
         criador_sid_atual = sala.get('criador')
-        nome_criador = None
-        for sid, nome_player in sala.get('players', {}).items():
-            if sid == criador_sid_atual:
-                nome_criador = nome_player
-                break
+        nome_criador = sala.get('players', {}).get(criador_sid_atual)
 
         eh_criador_desta_conexao = (request.sid == criador_sid_atual)
 
@@ -552,7 +902,7 @@ def entrar_na_sala(data):
             logger.info(f'Jogador {nome} ({request.sid}) entrou na sala {codigo}')
         else:
             # Re-conexão: mover mapping de SID antigo para o novo, se existir
-            sids_mesmo_nome = [sid for sid, n in sala['players'].items() if n.lower() == nome_key and sid != request.sid]
+            sids_mesmo_nome = salas.sids_do_nome(codigo, nome) - {request.sid}
             for old_sid in sids_mesmo_nome:
                 # Migrar palavras do old_sid para o novo SID
                 if 'palavras' in sala and old_sid in sala['palavras']:
@@ -561,39 +911,31 @@ def entrar_na_sala(data):
                         del sala['palavras'][old_sid]
                     except KeyError:
                         pass
-                try:
-                    del sala['players'][old_sid]
-                except KeyError:
-                    pass
+                salas.desconectar(old_sid, codigo)
+            # Sala restaurada de snapshot: o criador é reconhecido pelo nome
+            nome_criador = nome_criador or sala.get('criador_restaurado')
             # Se reconectou e era o criador (por nome), atualizar criador para o novo SID
             if nome_criador and nome.lower() == nome_criador.lower():
+                sala.pop('criador_restaurado', None)
                 sala['criador'] = request.sid
                 eh_criador_desta_conexao = True
             logger.info(f'Jogador {nome} ({request.sid}) reconectou na sala {codigo}')
 
         # Entrar na room e registrar este SID → nome
         join_room(codigo)
-        sala['players'][request.sid] = nome
+        salas.conectar(codigo, request.sid, nome)
         # Garantir avatar do jogador
         _get_avatar_for(sala, nome)
 
         # Limpar marca de desconexão se houver
-        if 'desconexoes' in sala and nome in sala['desconexoes']:
-            try:
-                del sala['desconexoes'][nome]
-            except KeyError:
-                pass
+        if cancelar_desconexao(codigo, sala, jogador_existente.nome if jogador_existente else nome):
             emit('aviso', {'msg': f'{nome} reconectou.'}, room=codigo)
+        salas.salvar(codigo)
 
         # Preparar informações dos jogadores com status de pronto (APENAS online)
         jogadores_info = []
         players_prontos = sala.get('players_prontos', set())
-        criador_sid_atual = sala.get('criador')
-        nome_criador_atual = None
-        for sid, nome_player in sala.get('players', {}).items():
-            if sid == criador_sid_atual:
-                nome_criador_atual = nome_player
-                break
+        nome_criador_atual = sala.get('players', {}).get(sala.get('criador'))
         nomes_online = set(nomes_conectados(sala))
         for j in partida.jogadores:
             if j.nome in nomes_online:
@@ -623,11 +965,15 @@ def entrar_na_sala(data):
             'avatar': sala['avatars'].get(nome)
         })
 
+        # Partida em andamento: estado completo da versão atual (base dos próximos deltas)
+        if partida.jogo_iniciado:
+            emit('estado_completo', visao_do_jogador(codigo, sala, estado_versionado(sala), nome))
+
         # Se o jogador já tinha enviado palavras, avisar
         if 'palavras' in sala:
             palavras_jogador = None
-            for sid, player_nome in sala['players'].items():
-                if player_nome.lower() == nome.lower() and sid in sala['palavras']:
+            for sid in salas.sids_do_nome(codigo, nome):
+                if sid in sala['palavras']:
                     palavras_jogador = sala['palavras'][sid]
                     break
             if palavras_jogador:
@@ -636,6 +982,8 @@ def entrar_na_sala(data):
                 })
                 verificar_iniciar_jogo(codigo)
 
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except ValueError as e:
         logger.error(f'Erro ao entrar na sala {codigo}: {str(e)}')
         emit('erro', {'msg': str(e)})
@@ -646,44 +994,38 @@ def entrar_na_sala(data):
 @socketio.on('expulsar_jogador')
 def expulsar_jogador(data):
     try:
-        sala = data.get('sala', '').strip().upper()
+        codigo = data.get('sala', '').strip().upper()
         nome_alvo = data.get('nome', '').strip()
         
-        if not sala or sala not in salas:
+        sala = salas.get(codigo) if codigo else None
+        if sala is None:
             emit('erro', {'msg': 'Sala não encontrada'})
             return
             
-        criador_sid = salas[sala]['criador']
-        
         # Só o criador pode expulsar
-        if request.sid != criador_sid:
+        if request.sid != sala['criador']:
             emit('erro', {'msg': 'Apenas o criador da sala pode expulsar jogadores'})
             return
             
         # Encontrar o SID do jogador alvo pelo nome
-        alvo_sid = None
-        for sid, nome in salas[sala]['players'].items():
-            if nome.lower() == nome_alvo.lower():
-                alvo_sid = sid
-                break
+        alvo_sid = salas.sid_do_nome(codigo, nome_alvo)
                 
         if not alvo_sid:
             emit('erro', {'msg': 'Jogador não encontrado'})
             return
             
         # Remover jogador da partida
-        partida = salas[sala]['partida']
-        partida.jogadores = [j for j in partida.jogadores if j.nome.lower() != nome_alvo.lower()]
+        partida = sala['partida']
+        partida.remover_jogador(nome_alvo)
         
         # Remover do dicionário de players
-        if alvo_sid in salas[sala]['players']:
-            del salas[sala]['players'][alvo_sid]
+        salas.desconectar(alvo_sid, codigo)
         
         # Remover do set de prontos
-        salas[sala].setdefault('players_prontos', set()).discard(nome_alvo)
+        sala.setdefault('players_prontos', set()).discard(nome_alvo)
         
         # Atualizar status de prontos
-        broadcast_status_prontos(sala)
+        broadcast_status_prontos(codigo)
         
         # Notificar o alvo
         emit('foi_expulso', {}, room=alvo_sid)
@@ -693,18 +1035,21 @@ def expulsar_jogador(data):
             'jogador': nome_alvo,
             'msg': f'{nome_alvo} foi expulso da sala',
             'jogadores_restantes': [j.nome for j in partida.jogadores]
-        }, room=sala)
+        }, room=codigo)
         
         # Reconfigurar alvos se necessário
         if len(partida.jogadores) >= 2:
             partida._configurar_alvos()
+        salas.salvar(codigo)
             
         # Remover da sala e desconectar
-        leave_room(sala, sid=alvo_sid)
+        leave_room(codigo, sid=alvo_sid)
         socketio.server.disconnect(alvo_sid)
         
-        logger.info(f'Jogador {nome_alvo} expulso da sala {sala} pelo criador')
+        logger.info(f'Jogador {nome_alvo} expulso da sala {codigo} pelo criador')
         
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except Exception as e:
         logger.error(f'Erro ao expulsar jogador: {str(e)}')
         emit('erro', {'msg': 'Erro interno do servidor'})
@@ -712,11 +1057,11 @@ def expulsar_jogador(data):
 @socketio.on('enviar_palavras')
 def receber_palavras(data):
     try:
-        sala = data.get('sala', '').strip().upper()
+        codigo = data.get('sala', '').strip().upper()
         nome = data.get('nome', '').strip()
         palavras = data.get('palavras', [])
 
-        if not sala or sala not in salas:
+        if not codigo or codigo not in salas:
             emit('erro', {'msg': 'Sala não encontrada'})
             return
 
@@ -728,25 +1073,26 @@ def receber_palavras(data):
             emit('erro', {'msg': 'Nenhuma palavra informada'})
             return
 
-        partida = salas[sala]['partida']
-        
-        # Atualizar timestamp de último acesso
-        salas[sala]['ultimo_acesso'] = time.time()
+        def definir(sala):
+            # Atualizar timestamp de último acesso
+            sala['ultimo_acesso'] = time.time()
 
-        # Buscar o jogador
-        jogador = next((j for j in partida.jogadores if j.nome.lower() == nome.lower()), None)
+            # Buscar o jogador
+            jogador = sala['partida'].obter_jogador(nome)
+            if not jogador:
+                raise ValueError('Jogador não encontrado na sala')
 
-        if not jogador:
-            emit('erro', {'msg': 'Jogador não encontrado na sala'})
-            return
+            # Definir palavras
+            jogador.definir_palavras(palavras, validar_dicionario=sala.get('validar_palavras', False))
 
-        # Definir palavras
-        jogador.definir_palavras(palavras)
-        
-        # Armazenar palavras também no SID para reconexão
-        if 'palavras' not in salas[sala]:
-            salas[sala]['palavras'] = {}
-        salas[sala]['palavras'][request.sid] = palavras
+            # Armazenar palavras também no SID para reconexão
+            sala.setdefault('palavras', {})[request.sid] = palavras
+
+        sala, _ = alterar_sala(codigo, definir)
+        if sala is None:
+            emit('erro', {'msg': 'Sala não encontrada'})
+            return
+        partida = sala['partida']
 
         # Informar que as palavras foram recebidas
         emit('palavras_recebidas', {
@@ -764,77 +1110,110 @@ def receber_palavras(data):
         emit('status_palavras_atualizado', {
             'msg': f'{nome} definiu suas palavras!',
             'status_jogadores': status_jogadores
-        }, room=sala)
+        }, room=codigo)
 
         # Verificar se todos definiram as palavras e iniciar o jogo
-        verificar_iniciar_jogo(sala)
+        verificar_iniciar_jogo(codigo)
 
+    except PalavrasDesconhecidas as e:
+        emit('erro', {'msg': str(e), 'sugestoes': e.sugestoes})
+    except ValueError as e:
+        emit('erro', {'msg': str(e)})
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except Exception as e:
         logger.error(f'Erro ao receber palavras: {str(e)}')
         emit('erro', {'msg': 'Erro interno do servidor'})
 
 @socketio.on('tentar_adivinhar')
+@limitado('tentar_adivinhar')
 def tentar_adivinhar(data):
     try:
-        sala = data.get('sala', '')
+        codigo = data.get('sala', '')
         nome = data.get('nome', '')
         palavra = data.get('palavra', '').strip()
 
-        if not sala or sala not in salas:
+        if not codigo or codigo not in salas:
             emit('erro', {'msg': 'Sala não encontrada'})
             return
 
-        partida = salas[sala]['partida']
-        
-        # Atualizar timestamp de último acesso
-        salas[sala]['ultimo_acesso'] = time.time()
+        def tentar(sala):
+            # Atualizar timestamp de último acesso
+            sala['ultimo_acesso'] = time.time()
 
-        # Verificar se é a vez do jogador
-        jogador_da_vez = partida.get_jogador_da_vez()
-        if not jogador_da_vez or jogador_da_vez.nome != nome:
-            emit('erro', {'msg': 'Não é sua vez de jogar'})
-            return
+            # Verificar se é a vez do jogador
+            jogador_da_vez = sala['partida'].get_jogador_da_vez()
+            if not jogador_da_vez or jogador_da_vez.nome != nome:
+                raise ValueError('Não é sua vez de jogar')
 
-        # Tentar adivinhar
-        acertou, mensagem = partida.tentar_adivinhar(nome, palavra)
-        
-        # Obter estado atualizado
-        estado = partida.get_estado_jogo()
-        estado['criador'] = salas[sala].get('criador')
+            acertou, mensagem = sala['partida'].tentar_adivinhar(nome, palavra)
+            # Só o que mudou desde a versão anterior do estado
+            return acertou, mensagem, registrar_delta_estado(sala)
+
+        sala, resultado = alterar_sala(codigo, tentar)
+        if sala is None:
+            emit('erro', {'msg': 'Sala não encontrada'})
+            return
+        acertou, mensagem, versionado = resultado
+        partida = sala['partida']
 
-        # Emitir resultado para todos na sala
-        emit('resposta_tentativa', {
+        # Emitir resultado para todos na sala (cada um na sua visão do estado)
+        emitir_estado(codigo, sala, 'resposta_tentativa', versionado, {
             'jogador': nome,
             'palavra_tentada': palavra,
             'acertou': acertou,
-            'mensagem': mensagem,
-            'estado': estado
-        }, room=sala)
+            'mensagem': mensagem
+        })
 
         # Log para debug
         novo_jogador_da_vez = partida.get_jogador_da_vez()
         if novo_jogador_da_vez:
-            logger.info(f'Sala {sala}: {nome} {"acertou" if acertou else "errou"} "{palavra}". Próximo: {novo_jogador_da_vez.nome}')
+            logger.info(f'Sala {codigo}: {nome} {"acertou" if acertou else "errou"} "{palavra}". Próximo: {novo_jogador_da_vez.nome}')
         
-        # Verificar se alguém ganhou
-        if estado.get('vencedor'):
+        # Verificar se alguém ganhou (o estado final já foi na resposta_tentativa)
+        if partida.vencedor:
             emit('fim_de_jogo', {
-                'mensagem': f'🎉 {estado["vencedor"]} venceu o jogo!',
-                'estado': estado
-            }, room=sala)
+                'mensagem': f'🎉 {partida.vencedor.nome} venceu o jogo!',
+                'versao': versionado['versao']
+            }, room=codigo)
 
+    except ValueError as e:
+        emit('erro', {'msg': str(e)})
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except Exception as e:
         logger.error(f'Erro ao tentar adivinhar: {str(e)}')
         emit('erro', {'msg': 'Erro interno do servidor'})
 
+@socketio.on('pedir_estado')
+def pedir_estado(data):
+    """Reenvia o estado completo a quem perdeu alguma versão"""
+    try:
+        codigo = (data or {}).get('sala', '')
+        sala = salas.get(codigo) if codigo else None
+        if sala is None:
+            emit('erro', {'msg': 'Sala não encontrada'})
+            return
+        if sala['partida'].jogo_iniciado:
+            nome = salas.salas_do_sid(request.sid).get(codigo, '')
+            emit('estado_completo', visao_do_jogador(codigo, sala, estado_versionado(sala), nome))
+            salas.salvar(codigo)
+    except ConflitoVersao:
+        # O estado já enviado continua válido; a próxima versão chega pelo delta
+        logger.info(f'Conflito de versão ao reenviar o estado da sala {codigo}')
+    except Exception as e:
+        logger.error(f'Erro ao reenviar estado: {str(e)}')
+        emit('erro', {'msg': 'Erro interno do servidor'})
+
 @socketio.on('enviar_mensagem_chat')
+@limitado('enviar_mensagem_chat')
 def enviar_mensagem_chat(data):
     try:
-        sala = data.get('sala', '')
+        codigo = data.get('sala', '')
         nome = data.get('nome', '')
         mensagem = data.get('mensagem', '').strip()
 
-        if not sala or sala not in salas:
+        if not codigo or codigo not in salas:
             emit('erro', {'msg': 'Sala não encontrada'})
             return
 
@@ -843,47 +1222,72 @@ def enviar_mensagem_chat(data):
 
         # Limitar tamanho da mensagem
         mensagem = mensagem[:200]
-        
-        # Atualizar timestamp de último acesso
-        salas[sala]['ultimo_acesso'] = time.time()
 
-        partida = salas[sala]['partida']
-        partida.adicionar_mensagem_chat(nome, mensagem)
+        def adicionar(sala):
+            # Atualizar timestamp de último acesso
+            sala['ultimo_acesso'] = time.time()
+            return sala['partida'].adicionar_mensagem_chat(nome, mensagem)
 
-        # Timestamp no formato HH:MM:SS
-        import datetime
-        timestamp = datetime.datetime.now().strftime('%H:%M:%S')
+        sala, registro = alterar_sala(codigo, adicionar)
+        if sala is None:
+            return
 
-        emit('nova_mensagem_chat', {
-            'jogador': nome,
-            'mensagem': mensagem,
-            'timestamp': timestamp
-        }, room=sala)
+        # {seq, jogador, mensagem, timestamp}: o seq permite detectar mensagens perdidas
+        if lote_chat:
+            lote_chat.adicionar(codigo, registro)
+        else:
+            emit('nova_mensagem_chat', registro, room=codigo)
 
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except Exception as e:
         logger.error(f'Erro ao enviar mensagem: {str(e)}')
 
+@socketio.on('historico_chat')
+@limitado('historico_chat')
+def historico_chat(data):
+    """Envia as mensagens com seq maior que ``desde_seq`` (paginado por ``limite``)"""
+    try:
+        codigo = (data or {}).get('sala', '')
+        sala = salas.get(codigo) if codigo else None
+        if sala is None:
+            emit('erro', {'msg': 'Sala não encontrada'})
+            return
+        desde_seq = max(0, int(data.get('desde_seq', 0) or 0))
+        limite = max(1, min(50, int(data.get('limite', 50) or 50)))
+
+        chat = sala['partida'].chat
+        mensagens = chat.desde(desde_seq, limite)
+        emit('historico_chat', {
+            'mensagens': mensagens,
+            'ultima_seq': chat.ultima_seq,
+            'tem_mais': bool(mensagens) and mensagens[-1]['seq'] < chat.ultima_seq
+        })
+    except (TypeError, ValueError):
+        emit('erro', {'msg': 'Parâmetros inválidos'})
+    except Exception as e:
+        logger.error(f'Erro ao enviar histórico do chat: {str(e)}')
+
 @socketio.on('enviar_emoji')
+@limitado('enviar_emoji')
 def enviar_emoji(data):
     try:
-        sala = data.get('sala', '')
+        codigo = data.get('sala', '')
         nome = data.get('nome', '')
         emoji = data.get('emoji', '')
 
-        if not sala or sala not in salas:
+        sala = salas.get(codigo) if codigo else None
+        if sala is None:
             return
 
         if not nome or not emoji:
             return
 
         # Atualizar timestamp de último acesso
-        salas[sala]['ultimo_acesso'] = time.time()
+        sala['ultimo_acesso'] = time.time()
 
-        # Enviar emoji para todos na sala
-        emit('emoji_recebido', {
-            'nome': nome,
-            'emoji': emoji
-        }, room=sala)
+        # Enviar emoji para todos na sala (agregado com os da mesma janela)
+        reacoes.adicionar(codigo, nome, emoji)
 
     except Exception as e:
         logger.error(f'Erro ao enviar emoji: {str(e)}')
@@ -891,18 +1295,18 @@ def enviar_emoji(data):
 @socketio.on('obter_gabarito')
 def obter_gabarito(data):
     try:
-        sala = data.get('sala', '')
+        codigo = data.get('sala', '')
 
-        if not sala or sala not in salas:
+        sala = salas.get(codigo) if codigo else None
+        if sala is None:
             emit('erro', {'msg': 'Sala não encontrada'})
             return
 
-        partida = salas[sala]['partida']
-        gabarito = partida.get_gabarito_completo()
+        gabarito = sala['partida'].get_gabarito_completo()
 
         emit('gabarito_completo', {
             'gabarito': gabarito
-        }, room=sala)
+        }, room=codigo)
 
     except Exception as e:
         logger.error(f'Erro ao obter gabarito: {str(e)}')
@@ -911,29 +1315,32 @@ def obter_gabarito(data):
 @socketio.on('novo_jogo')
 def novo_jogo(data):
     try:
-        sala = data.get('sala', '')
+        codigo = data.get('sala', '')
         nome = data.get('nome', '')
 
-        if not sala or sala not in salas:
+        sala = salas.get(codigo) if codigo else None
+        if sala is None:
             emit('erro', {'msg': 'Sala não encontrada'})
             return
 
         # Apenas o criador pode reiniciar
-        if request.sid != salas[sala]['criador']:
+        if request.sid != sala['criador']:
             emit('erro', {'msg': 'Apenas o criador da sala pode iniciar um novo jogo'})
             return
             
-        partida = salas[sala]['partida']
-        partida.reiniciar_jogo()
+        sala['partida'].reiniciar_jogo()
 
         # Limpar palavras armazenadas
-        if 'palavras' in salas[sala]:
-            salas[sala]['palavras'] = {}
+        if 'palavras' in sala:
+            sala['palavras'] = {}
+        salas.salvar(codigo)
 
         emit('jogo_reiniciado', {
             'msg': 'Jogo reiniciado! Todos devem definir novas palavras.'
-        }, room=sala)
+        }, room=codigo)
 
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except Exception as e:
         logger.error(f'Erro ao reiniciar jogo: {str(e)}')
         emit('erro', {'msg': 'Erro interno do servidor'})
@@ -1051,17 +1458,23 @@ def marcar_pronto(data):
             return
         
         # Atualizar status de pronto
-        sala.setdefault('players_prontos', set())
-        if pronto:
-            sala['players_prontos'].add(nome)
-        else:
-            sala['players_prontos'].discard(nome)
+        def atualizar(sala):
+            prontos = sala.setdefault('players_prontos', set())
+            if pronto:
+                prontos.add(nome)
+            else:
+                prontos.discard(nome)
+
+        if alterar_sala(codigo, atualizar)[0] is None:
+            return
         
         # Emite status atualizado para todos
         broadcast_status_prontos(codigo)
         
         logger.info(f'Status de prontos emitido para sala {codigo}')
         
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except Exception as e:
         logger.error(f'Erro ao marcar pronto: {e}', exc_info=True)
         emit('error', {'msg': 'Erro interno do servidor'})
@@ -1084,8 +1497,11 @@ def selecionar_modo(data):
             emit('erro', {'msg': 'Modo inválido'})
             return
         sala['modo'] = modo
+        salas.salvar(codigo)
         emit('modo_atualizado', { 'modo': modo }, room=codigo)
         logger.info(f'Sala {codigo}: modo alterado para {modo} por {nome}')
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except Exception as e:
         logger.error(f'Erro ao selecionar modo: {e}', exc_info=True)
         emit('erro', {'msg': 'Erro interno do servidor'})
@@ -1103,15 +1519,12 @@ def transferir_criador(data):
             emit('erro', {'msg': 'Apenas o criador pode transferir a liderança'})
             return
         # Encontrar SID do destino
-        destino_sid = None
-        for sid, n in sala.get('players', {}).items():
-            if n.lower() == nome_destino.lower():
-                destino_sid = sid
-                break
+        destino_sid = salas.sid_do_nome(codigo, nome_destino)
         if not destino_sid:
             emit('erro', {'msg': 'Jogador de destino não encontrado ou desconectado'})
             return
         sala['criador'] = destino_sid
+        salas.salvar(codigo)
         emit('novo_criador', { 'nome': nome_destino }, room=codigo)
         # Reemitir status de prontos com flag de criador atualizada
         partida = sala['partida']
@@ -1130,6 +1543,8 @@ def transferir_criador(data):
             'jogadores_prontos': len(sala.get('players_prontos', set()))
         }, room=codigo)
         logger.info(f'Sala {codigo}: criador transferido para {nome_destino}')
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except Exception as e:
         logger.error(f'Erro ao transferir criador: {e}', exc_info=True)
         emit('erro', {'msg': 'Erro interno do servidor'})
@@ -1147,8 +1562,7 @@ def sair_da_sala(data):
         partida = sala['partida']
 
         # Remover do mapa de sockets
-        if request.sid in sala['players']:
-            del sala['players'][request.sid]
+        salas.desconectar(request.sid, codigo)
 
         # Remover do set de prontos
         try:
@@ -1160,22 +1574,19 @@ def sair_da_sala(data):
         broadcast_status_prontos(codigo)
 
         # Remover jogador da partida pelo nome
-        nomes_antes = [j.nome for j in partida.jogadores]
-        partida.jogadores = [j for j in partida.jogadores if j.nome.lower() != nome.lower()]
-        nomes_depois = [j.nome for j in partida.jogadores]
+        partida.remover_jogador(nome)
 
         # Se o criador saiu, remarcar a sala para remoção ou promover outro
         if request.sid == sala.get('criador'):
             if partida.jogadores:
                 # Promover primeiro jogador restante (pelo nome)
                 novo_nome = partida.jogadores[0].nome
-                for sid, n in sala.get('players', {}).items():
-                    if n.lower() == novo_nome.lower():
-                        sala['criador'] = sid
-                        emit('novo_criador', { 'nome': novo_nome }, room=codigo)
-                        break
+                novo_sid = salas.sid_do_nome(codigo, novo_nome)
+                if novo_sid:
+                    sala['criador'] = novo_sid
+                    emit('novo_criador', { 'nome': novo_nome }, room=codigo)
             else:
-                sala['marcada_para_remocao'] = time.time() + 60
+                marcar_para_remocao(codigo, sala, time.time() + 60)
 
         leave_room(codigo)
 
@@ -1190,11 +1601,13 @@ def sair_da_sala(data):
         if len(partida.jogadores) >= 2:
             try:
                 partida._configurar_alvos()
-                estado = partida.get_estado_jogo()
-                emit('estado_atualizado', {'estado': estado}, room=codigo)
+                emitir_estado(codigo, sala, 'estado_atualizado', registrar_delta_estado(sala))
             except Exception:
                 pass
+        salas.salvar(codigo)
 
+    except ConflitoVersao:
+        avisar_conflito(codigo)
     except Exception as e:
         logger.error(f'Erro em sair_da_sala: {e}', exc_info=True)
         emit('erro', {'msg': 'Erro interno do servidor'})
@@ -1220,13 +1633,14 @@ def garantir_criador_na_sala(codigo):
         primeiro_jogador = partida.jogadores[0]
         
         # Encontrar o SID deste jogador
-        for sid, nome in sala.get('players', {}).items():
-            if nome.lower() == primeiro_jogador.nome.lower():
-                sala['criador'] = sid
-                logger.info(f'Jogador {primeiro_jogador.nome} promovido a criador da sala {codigo}')
-                return True
+        sid = salas.sid_do_nome(codigo, primeiro_jogador.nome)
+        if sid:
+            sala['criador'] = sid
+            logger.info(f'Jogador {primeiro_jogador.nome} promovido a criador da sala {codigo}')
+            return True
     
     return sala.get('criador') is not None
 
 if __name__ == '__main__':
+    iniciar_tarefas()
     socketio.run(app, debug=False, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,295 @@
+"""
+Armazenamento do estado das salas: em memória (padrão) ou chave-valor compartilhado entre processos
+"""
+import json
+import threading
+import zlib
+
+from jogo import PartidaMultiplayer
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # redis é opcional (apenas para o backend compartilhado)
+    class WatchError(Exception):
+        """Chave observada foi alterada antes do EXEC"""
+
+
+class ConflitoVersao(Exception):
+    """A sala foi alterada por outro processo desde a última leitura"""
+
+
+def serializar_sala(sala):
+    """Serializa a sala em JSON compacto comprimido"""
+    dados = dict(sala)
+    dados['partida'] = sala['partida'].para_dict()
+    dados['players_prontos'] = sorted(sala.get('players_prontos', ()))
+    texto = json.dumps(dados, separators=(',', ':'), ensure_ascii=False)
+    return zlib.compress(texto.encode('utf-8'), 1)
+
+
+def desserializar_sala(blob):
+    """Reconstrói a sala a partir de ``serializar_sala``"""
+    dados = json.loads(zlib.decompress(blob).decode('utf-8'))
+    dados['partida'] = PartidaMultiplayer.de_dict(dados['partida'])
+    dados['players_prontos'] = set(dados.get('players_prontos', ()))
+    return dados
+
+
+class ArmazenamentoMemoria:
+    """Backend padrão: objetos vivos no próprio processo, sem serialização"""
+
+    compartilhado = False
+
+    def __init__(self):
+        self._salas = {}
+        self._versoes = {}
+        # Alterações desde a última consulta (usadas pelos snapshots incrementais)
+        self._alteradas = set()
+        self._removidas = set()
+
+    def carregar(self, codigo):
+        """Retorna (sala, versao) ou None"""
+        if codigo not in self._salas:
+            return None
+        return self._salas[codigo], self._versoes[codigo]
+
+    def versao(self, codigo):
+        return self._versoes.get(codigo)
+
+    def salvar(self, codigo, sala, versao_esperada=None):
+        """Grava a sala e retorna a nova versão"""
+        versao = self._versoes.get(codigo, 0) + 1
+        self._salas[codigo] = sala
+        self._versoes[codigo] = versao
+        self._alteradas.add(codigo)
+        self._removidas.discard(codigo)
+        return versao
+
+    def remover(self, codigo):
+        self._salas.pop(codigo, None)
+        self._versoes.pop(codigo, None)
+        self._alteradas.discard(codigo)
+        self._removidas.add(codigo)
+
+    def retirar_alteracoes(self):
+        """Retorna (alteradas, removidas) desde a chamada anterior e zera o controle"""
+        alteradas, removidas = self._alteradas, self._removidas
+        self._alteradas, self._removidas = set(), set()
+        return alteradas, removidas
+
+    def marcar_alterada(self, codigo):
+        """Devolve a sala ao controle de alterações (ex.: gravação adiada)"""
+        if codigo in self._salas:
+            self._alteradas.add(codigo)
+
+    def existe(self, codigo):
+        return codigo in self._salas
+
+    def codigos(self):
+        return list(self._salas)
+
+    def total(self):
+        return len(self._salas)
+
+
+class ArmazenamentoChaveValor:
+    """Backend compartilhado em um servidor chave-valor compatível com Redis.
+
+    Cada sala ocupa duas chaves: o blob serializado e um contador de versão.
+    ``salvar`` faz compare-and-set otimista (WATCH/MULTI/EXEC) sobre a versão
+    e levanta ``ConflitoVersao`` se outro processo gravou antes.
+    """
+
+    compartilhado = True
+
+    def __init__(self, cliente, prefixo='cv:'):
+        self.cliente = cliente
+        self.prefixo = prefixo
+        self._chave_indice = f'{prefixo}salas'
+
+    def _chave(self, codigo):
+        return f'{self.prefixo}sala:{codigo}'
+
+    def _chave_versao(self, codigo):
+        return f'{self.prefixo}sala:{codigo}:v'
+
+    def carregar(self, codigo):
+        """Retorna (sala, versao) lidos atomicamente, ou None"""
+        pipe = self.cliente.pipeline()
+        pipe.get(self._chave(codigo))
+        pipe.get(self._chave_versao(codigo))
+        blob, versao = pipe.execute()
+        if blob is None or versao is None:
+            return None
+        return desserializar_sala(blob), int(versao)
+
+    def versao(self, codigo):
+        versao = self.cliente.get(self._chave_versao(codigo))
+        return int(versao) if versao is not None else None
+
+    def salvar(self, codigo, sala, versao_esperada=None):
+        """Grava a sala se a versão remota ainda for ``versao_esperada``. Retorna a nova versão"""
+        blob = serializar_sala(sala)
+        chave_versao = self._chave_versao(codigo)
+        pipe = self.cliente.pipeline()
+        try:
+            pipe.watch(chave_versao)
+            atual = pipe.get(chave_versao)
+            atual = int(atual) if atual is not None else None
+            if atual != versao_esperada:
+                raise ConflitoVersao(f'Sala {codigo}: versão {atual}, esperada {versao_esperada}')
+            nova = (atual or 0) + 1
+            pipe.multi()
+            pipe.set(self._chave(codigo), blob)
+            pipe.set(chave_versao, nova)
+            pipe.sadd(self._chave_indice, codigo)
+            pipe.execute()
+            return nova
+        except WatchError:
+            raise ConflitoVersao(f'Sala {codigo} alterada durante a gravação')
+        finally:
+            pipe.reset()
+
+    def remover(self, codigo):
+        pipe = self.cliente.pipeline()
+        pipe.delete(self._chave(codigo), self._chave_versao(codigo))
+        pipe.srem(self._chave_indice, codigo)
+        pipe.execute()
+
+    def existe(self, codigo):
+        return bool(self.cliente.exists(self._chave_versao(codigo)))
+
+    def codigos(self):
+        return [c.decode() if isinstance(c, bytes) else c for c in self.cliente.smembers(self._chave_indice)]
+
+    def total(self):
+        return self.cliente.scard(self._chave_indice)
+
+
+class ClienteChaveValorLocal:
+    """Substituto em processo de um cliente Redis (subconjunto usado pelo backend).
+
+    Útil para testes e desenvolvimento: implementa GET/SET/DELETE/EXISTS, sets
+    e pipelines com WATCH/MULTI/EXEC com a mesma semântica do redis-py.
+    """
+
+    def __init__(self):
+        self._dados = {}
+        self._revisoes = {}  # chave -> contador de escritas (para WATCH)
+        self._trava = threading.RLock()
+
+    @staticmethod
+    def _bytes(valor):
+        if isinstance(valor, bytes):
+            return valor
+        return str(valor).encode('utf-8')
+
+    def _tocar(self, chave):
+        self._revisoes[chave] = self._revisoes.get(chave, 0) + 1
+
+    def get(self, chave):
+        with self._trava:
+            return self._dados.get(chave)
+
+    def set(self, chave, valor):
+        with self._trava:
+            self._dados[chave] = self._bytes(valor)
+            self._tocar(chave)
+            return True
+
+    def delete(self, *chaves):
+        with self._trava:
+            removidas = 0
+            for chave in chaves:
+                if self._dados.pop(chave, None) is not None:
+                    removidas += 1
+                    self._tocar(chave)
+            return removidas
+
+    def exists(self, *chaves):
+        with self._trava:
+            return sum(1 for c in chaves if c in self._dados)
+
+    def sadd(self, chave, *membros):
+        with self._trava:
+            conjunto = self._dados.setdefault(chave, set())
+            antes = len(conjunto)
+            conjunto.update(self._bytes(m) for m in membros)
+            self._tocar(chave)
+            return len(conjunto) - antes
+
+    def srem(self, chave, *membros):
+        with self._trava:
+            conjunto = self._dados.get(chave, set())
+            antes = len(conjunto)
+            conjunto.difference_update(self._bytes(m) for m in membros)
+            self._tocar(chave)
+            return antes - len(conjunto)
+
+    def smembers(self, chave):
+        with self._trava:
+            return set(self._dados.get(chave, ()))
+
+    def scard(self, chave):
+        with self._trava:
+            return len(self._dados.get(chave, ()))
+
+    def pipeline(self, transaction=True):
+        return _PipelineLocal(self)
+
+
+class _PipelineLocal:
+    """Pipeline com semântica WATCH/MULTI/EXEC do redis-py"""
+
+    def __init__(self, cliente):
+        self._cliente = cliente
+        self._observadas = {}
+        self._comandos = []
+        self._imediato = False
+
+    def watch(self, *chaves):
+        self._imediato = True
+        for chave in chaves:
+            self._observadas[chave] = self._cliente._revisoes.get(chave, 0)
+
+    def multi(self):
+        self._imediato = False
+
+    def __getattr__(self, nome):
+        metodo = getattr(self._cliente, nome)
+
+        def comando(*args):
+            if self._imediato:
+                return metodo(*args)
+            self._comandos.append((metodo, args))
+            return self
+        return comando
+
+    def execute(self):
+        cliente = self._cliente
+        with cliente._trava:
+            for chave, revisao in self._observadas.items():
+                if cliente._revisoes.get(chave, 0) != revisao:
+                    self.reset()
+                    raise WatchError(f'Chave observada alterada: {chave}')
+            resultados = [metodo(*args) for metodo, args in self._comandos]
+        self.reset()
+        return resultados
+
+    def reset(self):
+        self._observadas = {}
+        self._comandos = []
+        self._imediato = False
+
+
+def criar_armazenamento(backend='memoria', url=None):
+    """Cria o backend pelo nome: 'memoria', 'local' (chave-valor em processo) ou 'redis'"""
+    backend = (backend or 'memoria').strip().lower()
+    if backend == 'memoria':
+        return ArmazenamentoMemoria()
+    if backend == 'local':
+        return ArmazenamentoChaveValor(ClienteChaveValorLocal())
+    if backend == 'redis':
+        import redis
+        return ArmazenamentoChaveValor(redis.Redis.from_url(url or 'redis://localhost:6379/0'))
+    raise ValueError(f'Backend de armazenamento desconhecido: {backend}')
@@ -0,0 +1,383 @@
+"""
+Benchmarks do jogo
+
+    python benchmark.py jogadores [--total 2000]
+    python benchmark.py normalizador [--total 100000]
+    python benchmark.py proximidade [--total 300000]
+    python benchmark.py lexico [--total 300000]
+    python benchmark.py regressao [--salvar] [--limite 0.3] [--base benchmark_base.json]
+
+``jogadores``: memória por jogador (tracemalloc), custo de criar um ``Jogador``
+e latência de ``entrar_na_sala`` pelo cliente de teste do Flask-SocketIO.
+``normalizador``: ``normalizar`` palavra a palavra e ``normalizar_lote`` sobre
+um corpus sintético (10% do dicionário, 5% com sufixo -cao/-ao/-oes), sem cache;
+``remover_acentos`` pela tabela de ``str.translate`` contra o caminho NFD; e
+``comparar_palavras`` numa sequência de palpites repetidos, com e sem cache.
+``proximidade``: vizinhos de palavras com erro de digitação num léxico sintético
+e o teste de "quase" contra a palavra certa.
+``lexico``: compila um léxico sintético no formato compacto e mede tamanho,
+abertura, memória residente e consultas pelo mmap, comparando com um dict.
+``regressao``: tempo por chamada das funções quentes de ``jogo.py`` e
+``normalizador.py`` (sem o cache LRU), comparado com a base gravada em
+``benchmark_base.json``. Sai com código 1 se algum caso ficar mais lento que a
+base além do ``--limite`` (fração, padrão 0.3); ``--salvar`` regrava a base.
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import random
+import time
+import timeit
+import tracemalloc
+
+
+def medir_memoria_jogadores(total):
+    """Bytes alocados por jogador criado e adicionado a uma partida"""
+    from jogo import Configuracao, Jogador, PartidaMultiplayer
+
+    partidas = []
+    tracemalloc.start()
+    inicio = tracemalloc.take_snapshot()
+    for i in range(total // 10):
+        partida = PartidaMultiplayer(Configuracao(5, 10))
+        for n in range(10):
+            jogador = Jogador(f'jogador{n}', 5)
+            partida.adicionar_jogador(jogador)
+            jogador.definir_palavras(['casa', 'carro', 'pedra', 'agua', 'sol'])
+        partidas.append(partida)
+    fim = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    alocado = sum(s.size_diff for s in fim.compare_to(inicio, 'filename'))
+    return alocado / (len(partidas) * 10)
+
+
+def medir_criacao_jogador():
+    """Microssegundos para construir um Jogador (melhor de 5 rodadas)"""
+    from jogo import Jogador
+
+    rodadas = timeit.repeat(lambda: Jogador('jogador', 5), number=10000, repeat=5)
+    return min(rodadas) / 10000 * 1e6
+
+
+def medir_entrar_na_sala(total):
+    """Latência (ms) de entrar_na_sala, em salas de 10 jogadores"""
+    import app as aplicacao
+
+    logging.disable(logging.CRITICAL)
+    aplicacao.socketio.server.logger.disabled = True
+    aplicacao.socketio.server.eio.logger.disabled = True
+    latencias = []
+    clientes = []
+    for s in range(max(1, total // 10)):
+        criador = aplicacao.socketio.test_client(aplicacao.app)
+        clientes.append(criador)
+        criador.emit('criar_sala', {'nome': 'j0', 'max_jogadores': 10})
+        codigo = next(r['args'][0]['codigo'] for r in criador.get_received() if r['name'] == 'sala_criada')
+        for n in range(1, 10):
+            cliente = aplicacao.socketio.test_client(aplicacao.app)
+            clientes.append(cliente)
+            inicio = time.perf_counter()
+            cliente.emit('entrar_na_sala', {'sala': codigo, 'nome': f'j{n}'})
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            cliente.get_received()
+        criador.get_received()
+    latencias.sort()
+    return {
+        'media_ms': sum(latencias) / len(latencias),
+        'p50_ms': latencias[len(latencias) // 2],
+        'p95_ms': latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))],
+    }
+
+
+def gerar_corpus(total, semente=42):
+    """Palavras sintéticas em minúsculas, com parte do dicionário e dos sufixos corrigíveis"""
+    from normalizador import CORRECOES
+
+    aleatorio = random.Random(semente)
+    letras = 'aaaaeeeeiiioooouucdlmnprsstvgbfhjqz'
+    dicionario = list(CORRECOES)
+    corpus = []
+    for _ in range(total):
+        sorteio = aleatorio.random()
+        if sorteio < 0.10:
+            corpus.append(aleatorio.choice(dicionario))
+            continue
+        palavra = ''.join(aleatorio.choice(letras) for _ in range(aleatorio.randint(3, 9)))
+        if sorteio < 0.15:
+            palavra += aleatorio.choice(['cao', 'ao', 'oes'])
+        corpus.append(palavra)
+    return corpus
+
+
+def melhor_tempo(funcao, repeticoes=5):
+    """Menor tempo (s) entre ``repeticoes`` execuções"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def benchmark_normalizador(total):
+    import normalizador as modulo
+    normalizador = modulo.normalizador_compartilhado
+
+    tamanho_cache = modulo.TAMANHO_CACHE
+    modulo.configurar_cache(0)
+    corpus = gerar_corpus(total)
+    por_palavra = melhor_tempo(lambda: [normalizador.normalizar(p) for p in corpus])
+    lote = melhor_tempo(lambda: normalizador.normalizar_lote(corpus))
+    acentuadas = [p for p in normalizador.normalizar_lote(corpus) if not p.isascii()]
+    acentos_nfd = melhor_tempo(lambda: [modulo._remover_acentos_nfd(p) for p in acentuadas])
+    acentos_tabela = melhor_tempo(lambda: [normalizador.remover_acentos(p) for p in acentuadas])
+    acentos_lote = melhor_tempo(lambda: normalizador.remover_acentos_lote(acentuadas))
+
+    # Palpites de uma partida: poucas palavras distintas, comparadas muitas vezes
+    alvos = gerar_corpus(50, semente=7)
+    palpites = list(zip(gerar_corpus(total, semente=8)[:total // 100] * 100, alvos * (total // 50)))
+    sem_cache = melhor_tempo(lambda: [normalizador.comparar_palavras(p, a) for p, a in palpites])
+    modulo.configurar_cache(tamanho_cache or 4096)
+    com_cache = melhor_tempo(lambda: [normalizador.comparar_palavras(p, a) for p, a in palpites])
+    modulo.configurar_cache(tamanho_cache)
+    print(f'normalizar ({total} palavras):      {por_palavra * 1000:.1f} ms '
+          f'({por_palavra / total * 1e9:.0f} ns/palavra)')
+    print(f'normalizar_lote ({total} palavras): {lote * 1000:.1f} ms '
+          f'({lote / total * 1e9:.0f} ns/palavra)')
+    print(f'remover_acentos ({len(acentuadas)} palavras acentuadas): NFD {acentos_nfd * 1000:.1f} ms, '
+          f'tabela {acentos_tabela * 1000:.1f} ms, lote {acentos_lote * 1000:.1f} ms')
+    print(f'comparar_palavras ({len(palpites)} palpites): sem cache {sem_cache * 1000:.1f} ms, '
+          f'com cache {com_cache * 1000:.1f} ms')
+
+
+def gerar_lexico(total, semente=1):
+    """Léxico sintético de ``total`` palavras distintas formadas por sílabas"""
+    aleatorio = random.Random(semente)
+    silabas = [c + v for c in 'bcdfglmnprstv' for v in 'aeiou'] + ['ção', 'ões', 'ão', 'nh', 'lh', 'r', 's']
+    lexico = set()
+    while len(lexico) < total:
+        lexico.add(''.join(aleatorio.choice(silabas) for _ in range(aleatorio.randint(2, 5))))
+    return lexico
+
+
+def benchmark_proximidade(total):
+    from normalizador import normalizador_compartilhado as normalizador
+    from proximidade import IndiceProximidade
+
+    lexico = gerar_lexico(total)
+    inicio = time.perf_counter()
+    indice = IndiceProximidade(lexico)
+    montagem = time.perf_counter() - inicio
+
+    aleatorio = random.Random(2)
+    palavras = aleatorio.sample(sorted(p for p in lexico if len(p) >= 4), 200)
+    # Um erro por palavra: troca, remoção ou transposição de letras
+    erradas = [p[:2] + 'x' + p[3:] if i % 3 == 0 else p[:1] + p[2:] if i % 3 == 1 else p[:1] + p[2] + p[1] + p[3:]
+               for i, p in enumerate(palavras)]
+    consulta = melhor_tempo(lambda: [indice.vizinhos(p) for p in erradas]) / len(erradas)
+    quase = melhor_tempo(lambda: [normalizador.quase_acertou(e, p) for e, p in zip(erradas, palavras)]) / len(erradas)
+    longe = melhor_tempo(lambda: [normalizador.quase_acertou(p, 'paralelepipedo') for p in palavras]) / len(palavras)
+    print(f'léxico:            {len(lexico)} palavras (índice em {montagem * 1000:.0f} ms)')
+    print(f'vizinhos:          {consulta * 1e6:.0f} µs por consulta')
+    print(f'quase_acertou:     {quase * 1e6:.1f} µs (perto), {longe * 1e6:.1f} µs (longe)')
+
+
+def memoria_anonima():
+    """Memória anônima (heap) residente em bytes, sem as páginas de arquivos mapeados (Linux)"""
+    with open('/proc/self/status') as status:
+        for linha in status:
+            if linha.startswith('RssAnon:'):
+                return int(linha.split()[1]) * 1024
+    return 0
+
+
+def benchmark_lexico(total, caminho='/tmp/corrente_verbal_bench.lex'):
+    import os
+    from lexico import LexicoCompacto, compilar_lexico
+    from normalizador import normalizador_compartilhado as normalizador
+
+    pares = [(normalizador.remover_acentos(p), p) for p in gerar_lexico(total)]
+    inicio = time.perf_counter()
+    compilar_lexico(pares, caminho)
+    compilacao = time.perf_counter() - inicio
+    consultas = [chave for chave, _ in random.Random(3).sample(pares, 2000)] + ['naoexiste'] * 200
+
+    privada_antes = memoria_anonima()
+    inicio = time.perf_counter()
+    lexico = LexicoCompacto(caminho)
+    abertura = time.perf_counter() - inicio
+    por_consulta = melhor_tempo(lambda: [lexico.get(c) for c in consultas]) / len(consultas)
+    privada_mmap = memoria_anonima() - privada_antes
+
+    # O mesmo léxico carregado num dict (cópias novas das strings, como ao ler de um arquivo)
+    privada_antes = memoria_anonima()
+    como_dict = {chave.encode().decode(): forma.encode().decode() for chave, forma in pares}
+    privada_dict = memoria_anonima() - privada_antes
+    por_consulta_dict = melhor_tempo(lambda: [como_dict.get(c) for c in consultas]) / len(consultas)
+    lexico.fechar()
+
+    print(f'léxico:      {len(como_dict)} palavras, {os.path.getsize(caminho) / 1e6:.1f} MB em disco '
+          f'(compilado em {compilacao:.1f} s)')
+    print(f'abertura:    {abertura * 1000:.2f} ms')
+    print(f'memória:     mmap +{privada_mmap / 1e6:.1f} MB de heap após {len(consultas)} consultas, '
+          f'dict +{privada_dict / 1e6:.1f} MB')
+    print(f'consulta:    mmap {por_consulta * 1e6:.2f} µs, dict {por_consulta_dict * 1e6:.2f} µs')
+
+
+def benchmark_jogadores(total):
+    memoria = medir_memoria_jogadores(total)
+    criacao = medir_criacao_jogador()
+    latencia = medir_entrar_na_sala(min(total, 500))
+    print(f'memória por jogador:  {memoria:.0f} bytes')
+    print(f'criar Jogador:        {criacao:.2f} µs')
+    print(f'entrar_na_sala:       média {latencia["media_ms"]:.3f} ms, '
+          f'p50 {latencia["p50_ms"]:.3f} ms, p95 {latencia["p95_ms"]:.3f} ms')
+
+
+# ===== Regressão =====
+BASE_REGRESSAO = 'benchmark_base.json'
+PALAVRAS_PARTIDA = ['casa', 'carro', 'pedra', 'coração', 'sol']
+
+
+def montar_partida(jogadores):
+    """Partida iniciada com ``jogadores`` jogadores, todos com as palavras definidas"""
+    from jogo import Configuracao, Jogador, PartidaMultiplayer
+
+    partida = PartidaMultiplayer(Configuracao(5, 10))
+    for n in range(jogadores):
+        partida.adicionar_jogador(Jogador(f'jogador{n}', 5))
+    for jogador in partida.jogadores:
+        jogador.definir_palavras(PALAVRAS_PARTIDA)
+    partida.iniciar_jogo()
+    return partida
+
+
+def casos_regressao():
+    """nome -> função sem argumentos; cada chamada é uma operação medida.
+
+    Os casos do normalizador percorrem um corpus de 1000 palavras por chamada.
+    """
+    import normalizador as modulo
+    from jogo import Jogador
+
+    normalizador = modulo.normalizador_compartilhado
+    corpus = gerar_corpus(1000)
+    acentuadas = [p for p in normalizador.normalizar_lote(corpus) if not p.isascii()]
+    pares = list(zip(gerar_corpus(1000, semente=8), corpus))
+    jogador = Jogador('jogador', 5)
+
+    # Acerto: volta o palpite para a 2ª palavra antes de cada tentativa
+    acerto = montar_partida(2).jogadores[0]
+    palavra_certa = acerto.alvo_jogador.palavras_originais[1]
+
+    def tentar_acerto():
+        acerto.palavra_atual_index = 1
+        acerto.tentar_adivinhar(palavra_certa)
+
+    erro = montar_partida(2).jogadores[0]
+    casos = {
+        'definir_palavras': lambda: jogador.definir_palavras(PALAVRAS_PARTIDA),
+        'tentar_adivinhar_acerto': tentar_acerto,
+        'tentar_adivinhar_erro': lambda: erro.tentar_adivinhar('paralelepipedo'),
+        'normalizar': lambda: [normalizador.normalizar(p) for p in corpus],
+        'comparar_palavras': lambda: [normalizador.comparar_palavras(p, a) for p, a in pares],
+        'remover_acentos': lambda: [normalizador.remover_acentos(p) for p in acentuadas],
+    }
+    for jogadores in (2, 4, 6, 8, 10):
+        casos[f'get_estado_jogo_{jogadores}'] = montar_partida(jogadores).get_estado_jogo
+    return casos
+
+
+def medir_casos(casos, passadas=3, repeticoes=10):
+    """Microssegundos por chamada de cada caso: melhor rodada curta (~20 ms) de todas.
+
+    As passadas percorrem todos os casos intercalados, e muitas rodadas curtas
+    resistem melhor a pausas da máquina do que poucas longas: basta uma rodada
+    sem interferência para o mínimo valer.
+    """
+    cronometros = {}
+    for nome, funcao in casos.items():
+        cronometro = timeit.Timer(funcao)
+        numero, _ = cronometro.autorange()
+        cronometros[nome] = (cronometro, max(1, numero // 10))
+    medidas = dict.fromkeys(casos, float('inf'))
+    for _ in range(passadas):
+        for nome, (cronometro, numero) in cronometros.items():
+            medidas[nome] = min(medidas[nome], min(cronometro.repeat(repeticoes, numero)) / numero * 1e6)
+    return medidas
+
+
+def ambiente_medicao():
+    return {'python': platform.python_version(), 'maquina': platform.machine(), 'sistema': platform.system()}
+
+
+def benchmark_regressao(caminho, limite, salvar):
+    """Mede os casos e compara com a base; retorna o código de saída (1 = regressão)"""
+    import normalizador as modulo
+
+    tamanho_cache = modulo.TAMANHO_CACHE
+    modulo.configurar_cache(0)
+    try:
+        medidas = medir_casos(casos_regressao())
+    finally:
+        modulo.configurar_cache(tamanho_cache)
+
+    if salvar:
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump({'ambiente': ambiente_medicao(), 'us_por_chamada': {n: round(v, 3) for n, v in medidas.items()}},
+                      arquivo, indent=2)
+            arquivo.write('\n')
+        for nome, atual in medidas.items():
+            print(f'{nome:<26} {atual:>10.2f} µs')
+        print(f'base gravada em {caminho}')
+        return 0
+
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+    except FileNotFoundError:
+        print(f'Sem base em {caminho}; grave uma com --salvar')
+        return 1
+    if base.get('ambiente') != ambiente_medicao():
+        print(f'Aviso: base medida em {base.get("ambiente")}, agora {ambiente_medicao()}')
+
+    regressoes = []
+    print(f'{"caso":<26} {"base µs":>10} {"atual µs":>10} {"variação":>9}')
+    for nome, atual in medidas.items():
+        referencia = base['us_por_chamada'].get(nome)
+        if referencia is None:
+            print(f'{nome:<26} {"-":>10} {atual:>10.2f}  (novo)')
+            continue
+        variacao = atual / referencia - 1
+        marca = ''
+        if variacao > limite:
+            regressoes.append(nome)
+            marca = '  REGRESSÃO'
+        print(f'{nome:<26} {referencia:>10.2f} {atual:>10.2f} {variacao:>+8.0%}{marca}')
+    if regressoes:
+        print(f'{len(regressoes)} caso(s) acima de +{limite:.0%}: {", ".join(regressoes)}')
+        return 1
+    print(f'Nenhum caso acima de +{limite:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks do Corrente Verbal')
+    parser.add_argument('alvo', choices=['jogadores', 'normalizador', 'proximidade', 'lexico', 'regressao'])
+    parser.add_argument('--total', type=int)
+    parser.add_argument('--base', default=BASE_REGRESSAO, help='arquivo da base (regressao)')
+    parser.add_argument('--limite', type=float, default=0.3, help='piora tolerada sobre a base (regressao)')
+    parser.add_argument('--salvar', action='store_true', help='grava as medidas como nova base (regressao)')
+    args = parser.parse_args()
+    if args.alvo == 'jogadores':
+        benchmark_jogadores(args.total or 2000)
+    elif args.alvo == 'normalizador':
+        benchmark_normalizador(args.total or 100000)
+    elif args.alvo == 'proximidade':
+        benchmark_proximidade(args.total or 300000)
+    elif args.alvo == 'lexico':
+        benchmark_lexico(args.total or 300000)
+    elif args.alvo == 'regressao':
+        sys.exit(benchmark_regressao(args.base, args.limite, args.salvar))
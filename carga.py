@@ -0,0 +1,574 @@
+"""
+Teste de carga: salas com jogadores simulados pelo protocolo real do Socket.IO
+
+    python carga.py [--salas 5,20,50] [--jogadores 4] [--duracao 20] [--saida carga.json] [--url URL]
+
+Além do requirements.txt, o cliente Socket.IO dos bots precisa de
+``websocket-client`` e ``requests``: ``pip install -r requirements-dev.txt``.
+
+Sem ``--url``, sobe o app localmente com o gunicorn (``gunicorn.conf.py``, o
+mesmo worker gevent de produção, com ``max_requests`` desligado para o worker
+não ser reciclado no meio da medição) numa porta livre.
+
+A carga sobe em etapas: em cada uma as salas são completadas até o total
+pedido e a carga roda por ``--duracao`` segundos. Cada sala tem um criador e
+``--jogadores - 1`` convidados, que passam por ``criar_sala``,
+``entrar_na_sala``, ``marcar_pronto`` e ``enviar_palavras``; com o jogo
+iniciado, quem está na vez chama ``tentar_adivinhar`` (às vezes errando) e
+todos mandam chat e emojis periodicamente. No fim de cada jogo o criador
+chama ``novo_jogo`` e as palavras são enviadas de novo.
+
+Por etapa: latência de ida e volta por evento (p50/p95/p99, do envio até a
+resposta que o próprio jogador recebe), eventos enviados por segundo e
+memória residente (RSS) e CPU do worker. O resultado vai em JSON para
+comparar rodadas.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import deque
+
+import psutil
+import socketio
+
+from delta_estado import aplicar_delta
+
+PALAVRAS = (
+    'casa', 'mesa', 'porta', 'livro', 'pedra', 'folha', 'nuvem', 'terra', 'fogo',
+    'vento', 'praia', 'barco', 'ponte', 'trem', 'carro', 'janela', 'cadeira',
+    'escada', 'jardim', 'floresta', 'montanha', 'cidade', 'estrada', 'relogio',
+)
+PALAVRA_ERRADA = 'xyzxyz'
+EMOJIS = ('👍', '😂', '🔥', '🤔')
+TEMPO_RESPOSTA = 10.0  # segundos até um envio sem resposta ser dado como perdido
+
+
+def percentil(ordenados, p):
+    """Percentil ``p`` (0-100) pelo posto mais próximo de uma lista ordenada"""
+    if not ordenados:
+        return None
+    posto = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[posto]
+
+
+class Metricas:
+    """Latências por evento e contadores de uma etapa (compartilhadas entre threads)"""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._trava:
+            self.latencias = {}
+            self.enviados = 0
+            self.recebidos = 0
+            self.sem_resposta = 0
+            self.erros = {}
+            self.inicio = time.perf_counter()
+
+    def enviado(self):
+        with self._trava:
+            self.enviados += 1
+
+    def recebido(self):
+        with self._trava:
+            self.recebidos += 1
+
+    def latencia(self, evento, segundos):
+        with self._trava:
+            self.latencias.setdefault(evento, []).append(segundos * 1000)
+
+    def perdido(self, quantidade=1):
+        with self._trava:
+            self.sem_resposta += quantidade
+
+    def erro(self, mensagem):
+        with self._trava:
+            self.erros[mensagem] = self.erros.get(mensagem, 0) + 1
+
+    def resumo(self):
+        with self._trava:
+            segundos = time.perf_counter() - self.inicio
+            latencias = {}
+            for evento, valores in sorted(self.latencias.items()):
+                valores = sorted(valores)
+                latencias[evento] = {
+                    'n': len(valores),
+                    'p50': round(percentil(valores, 50), 2),
+                    'p95': round(percentil(valores, 95), 2),
+                    'p99': round(percentil(valores, 99), 2),
+                }
+            return {
+                'segundos': round(segundos, 2),
+                'eventos_enviados': self.enviados,
+                'eventos_recebidos': self.recebidos,
+                'enviados_por_segundo': round(self.enviados / segundos, 1),
+                'recebidos_por_segundo': round(self.recebidos / segundos, 1),
+                'sem_resposta': self.sem_resposta,
+                'erros': dict(self.erros),
+                'latencia_ms': latencias,
+            }
+
+
+class Agenda:
+    """Uma thread que executa as ações agendadas de todos os bots"""
+
+    def __init__(self):
+        self._fila = []
+        self._contador = itertools.count()
+        self._condicao = threading.Condition()
+        self._ativa = True
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    def agendar(self, atraso, acao):
+        with self._condicao:
+            heapq.heappush(self._fila, (time.monotonic() + atraso, next(self._contador), acao))
+            self._condicao.notify()
+
+    def parar(self):
+        with self._condicao:
+            self._ativa = False
+            self._condicao.notify()
+        self._thread.join()
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while self._ativa and (not self._fila or self._fila[0][0] > time.monotonic()):
+                    self._condicao.wait(self._fila[0][0] - time.monotonic() if self._fila else None)
+                if not self._ativa:
+                    return
+                _, _, acao = heapq.heappop(self._fila)
+            try:
+                acao()
+            except Exception:
+                pass  # bot desconectado no meio da ação
+
+
+class Bot:
+    """Jogador simulado: um cliente Socket.IO que segue o protocolo do jogo"""
+
+    def __init__(self, sala, nome, agenda, metricas, opcoes):
+        self.sala = sala
+        self.nome = nome
+        self.agenda = agenda
+        self.metricas = metricas
+        self.opcoes = opcoes
+        self.player_id = f'carga-{nome}-{random.getrandbits(32):08x}'
+        self.codigo = None
+        self.estado = None
+        self.versao = 0
+        self.tentando = False
+        self.ativo = True
+        self._pendentes = {}  # evento da resposta -> deque[(evento enviado, instante)]
+        self._chat_pendente = {}  # texto -> instante
+        self._seq_chat = itertools.count()
+        self._trava = threading.Lock()
+        self.pronto = {evento: threading.Event() for evento in ('sala_criada', 'meu_status', 'palavras_recebidas')}
+
+        self.cliente = socketio.Client(reconnection=False)
+        respostas = {
+            'sala_criada': self._ao_criar,
+            'meu_status': self._ao_entrar,
+            'status_prontos_atualizado': self._ao_pronto,
+            'palavras_recebidas': self._ao_receber_palavras,
+            'jogo_iniciado': self._ao_receber_estado,
+            'estado_completo': self._ao_receber_estado,
+            'estado_atualizado': self._ao_receber_estado,
+            'resposta_tentativa': self._ao_responder_tentativa,
+            'fim_de_jogo': self._ao_terminar,
+            'jogo_reiniciado': self._ao_reiniciar,
+            'nova_mensagem_chat': self._ao_receber_chat,
+            'emoji_recebido': self._ao_receber_emoji,
+            'emojis_recebidos': self._ao_receber_emojis,
+            'erro': self._ao_errar,
+        }
+        for evento, tratar in respostas.items():
+            self.cliente.on(evento, self._contando(tratar))
+        self.cliente.on('*', lambda *args: self.metricas.recebido())
+
+    # ===== Envio e medição =====
+    def _contando(self, tratar):
+        def tratar_contando(data=None):
+            self.metricas.recebido()
+            tratar(data or {})
+        return tratar_contando
+
+    def conectar(self, url):
+        self.cliente.connect(url, transports=['websocket'], auth={'player_id': self.player_id})
+
+    def enviar(self, evento, dados, resposta=None):
+        if not self.ativo:
+            return
+        if resposta:
+            with self._trava:
+                self._pendentes.setdefault(resposta, deque()).append((evento, time.perf_counter()))
+        self.metricas.enviado()
+        self.cliente.emit(evento, dados)
+
+    def _respondido(self, resposta, quantidade=1):
+        agora = time.perf_counter()
+        with self._trava:
+            fila = self._pendentes.get(resposta)
+            for _ in range(quantidade):
+                if not fila:
+                    return
+                evento, inicio = fila.popleft()
+                if agora - inicio > TEMPO_RESPOSTA:
+                    self.metricas.perdido()
+                    continue
+                self.metricas.latencia(evento, agora - inicio)
+
+    def descartar_antigos(self):
+        """Conta como perdidos os envios sem resposta há mais de TEMPO_RESPOSTA"""
+        limite = time.perf_counter() - TEMPO_RESPOSTA
+        with self._trava:
+            for fila in self._pendentes.values():
+                while fila and fila[0][1] < limite:
+                    fila.popleft()
+                    self.metricas.perdido()
+            antigos = [texto for texto, inicio in self._chat_pendente.items() if inicio < limite]
+            for texto in antigos:
+                del self._chat_pendente[texto]
+            self.metricas.perdido(len(antigos))
+
+    # ===== Protocolo =====
+    def criar_sala(self):
+        self.enviar('criar_sala', {
+            'nome': self.nome,
+            'num_palavras': self.opcoes.num_palavras,
+            'max_jogadores': self.opcoes.jogadores,
+            'player_id': self.player_id,
+        }, 'sala_criada')
+
+    def entrar_na_sala(self, codigo):
+        self.codigo = codigo
+        self.enviar('entrar_na_sala', {'sala': codigo, 'nome': self.nome, 'player_id': self.player_id}, 'meu_status')
+
+    def marcar_pronto(self):
+        self.enviar('marcar_pronto', {'sala': self.codigo, 'nome': self.nome, 'pronto': True}, 'status_prontos_atualizado')
+
+    def enviar_palavras(self):
+        palavras = random.sample(PALAVRAS, self.opcoes.num_palavras)
+        self.sala.palavras[self.nome] = palavras
+        self.enviar('enviar_palavras', {'sala': self.codigo, 'nome': self.nome, 'palavras': palavras}, 'palavras_recebidas')
+
+    def tentar(self):
+        self.tentando = False
+        estado = self.estado
+        if not self.ativo or not estado or estado.get('vencedor') or estado.get('jogador_da_vez') != self.nome:
+            return
+        eu = next((j for j in estado['jogadores'] if j['nome'] == self.nome), None)
+        palavras_alvo = self.sala.palavras.get(eu and eu.get('alvo'), [])
+        indice = eu['palavra_atual_index'] if eu else 0
+        if random.random() < self.opcoes.erros or indice >= len(palavras_alvo):
+            palavra = PALAVRA_ERRADA
+        else:
+            palavra = palavras_alvo[indice]
+        self.tentando = True
+        self.enviar('tentar_adivinhar', {'sala': self.codigo, 'nome': self.nome, 'palavra': palavra}, 'resposta_tentativa')
+
+    def conversar(self):
+        if not self.ativo:
+            return
+        texto = f'{self.nome} {next(self._seq_chat)}'
+        with self._trava:
+            self._chat_pendente[texto] = time.perf_counter()
+        self.enviar('enviar_mensagem_chat', {'sala': self.codigo, 'nome': self.nome, 'mensagem': texto})
+        self.agenda.agendar(self.opcoes.chat * random.uniform(0.5, 1.5), self.conversar)
+
+    def reagir(self):
+        if not self.ativo:
+            return
+        self.enviar('enviar_emoji', {'sala': self.codigo, 'nome': self.nome, 'emoji': random.choice(EMOJIS)}, 'emoji')
+        self.agenda.agendar(self.opcoes.emoji * random.uniform(0.5, 1.5), self.reagir)
+
+    def iniciar_rotina(self):
+        self.agenda.agendar(random.uniform(0, self.opcoes.chat), self.conversar)
+        self.agenda.agendar(random.uniform(0, self.opcoes.emoji), self.reagir)
+
+    def desconectar(self):
+        self.ativo = False
+        try:
+            self.cliente.disconnect()
+        except Exception:
+            pass
+
+    # ===== Respostas do servidor =====
+    def _ao_criar(self, data):
+        self.codigo = data.get('codigo')
+        self._respondido('sala_criada')
+        self.pronto['sala_criada'].set()
+
+    def _ao_entrar(self, data):
+        self._respondido('meu_status')
+        self.pronto['meu_status'].set()
+
+    def _ao_pronto(self, data):
+        # Broadcast da sala: conta só o primeiro que já mostra este jogador pronto
+        if any(j.get('nome') == self.nome and j.get('pronto') for j in data.get('jogadores', [])):
+            self._respondido('status_prontos_atualizado')
+
+    def _ao_receber_palavras(self, data):
+        self._respondido('palavras_recebidas')
+        self.pronto['palavras_recebidas'].set()
+
+    def _ao_receber_estado(self, data):
+        if 'estado' in data:
+            self.estado, self.versao = data['estado'], data['versao']
+        elif 'delta' in data:
+            if data['base'] == self.versao and self.estado is not None:
+                self.estado, self.versao = aplicar_delta(self.estado, data['delta']), data['versao']
+            elif data['versao'] > self.versao:
+                self.enviar('pedir_estado', {'sala': self.codigo})
+                return
+        else:
+            return
+        self._talvez_jogar()
+
+    def _talvez_jogar(self):
+        estado = self.estado
+        if (estado and estado.get('jogo_iniciado') and not estado.get('vencedor')
+                and estado.get('jogador_da_vez') == self.nome and not self.tentando):
+            self.tentando = True
+            self.agenda.agendar(self.opcoes.pensar * random.uniform(0.5, 1.5), self.tentar)
+
+    def _ao_responder_tentativa(self, data):
+        if data.get('jogador') == self.nome:
+            self._respondido('resposta_tentativa')
+            self.tentando = False  # quem acerta continua na vez
+        self._ao_receber_estado(data)
+
+    def _ao_terminar(self, data):
+        if self.sala.criador is self:
+            self.agenda.agendar(1.0, lambda: self.enviar('novo_jogo', {'sala': self.codigo, 'nome': self.nome}, 'jogo_reiniciado'))
+
+    def _ao_reiniciar(self, data):
+        if self.sala.criador is self:
+            self._respondido('jogo_reiniciado')
+        self.estado, self.tentando = None, False
+        self.agenda.agendar(random.uniform(0.2, 1.0), self.enviar_palavras)
+
+    def _ao_receber_chat(self, data):
+        agora = time.perf_counter()
+        for mensagem in data.get('mensagens', [data]):
+            with self._trava:
+                inicio = self._chat_pendente.pop(mensagem.get('mensagem'), None)
+            if inicio is not None:
+                self.metricas.latencia('enviar_mensagem_chat', agora - inicio)
+
+    def _ao_receber_emoji(self, data):
+        if data.get('nome') == self.nome:
+            self._respondido('emoji')
+
+    def _ao_receber_emojis(self, data):
+        for reacao in data.get('reacoes', []):
+            if reacao.get('nome') == self.nome:
+                self._respondido('emoji', reacao.get('quantidade', 1))
+
+    def _ao_errar(self, data):
+        mensagem = data.get('msg', '')
+        self.metricas.erro(mensagem)
+        if mensagem == 'Não é sua vez de jogar':
+            with self._trava:
+                fila = self._pendentes.get('resposta_tentativa')
+                if fila:
+                    fila.pop()
+            self.tentando = False
+
+
+class SalaSimulada:
+    """Criador e convidados de uma sala, com as palavras de todos (para acertar o alvo)"""
+
+    def __init__(self, numero, agenda, metricas, opcoes):
+        self.palavras = {}
+        self.bots = [Bot(self, f'bot{numero}j{i}', agenda, metricas, opcoes) for i in range(opcoes.jogadores)]
+        self.criador = self.bots[0]
+
+    def montar(self, url, espera=TEMPO_RESPOSTA):
+        """Cria a sala, coloca todos dentro e envia as palavras; o jogo começa em seguida"""
+        criador = self.criador
+        criador.conectar(url)
+        criador.criar_sala()
+        if not criador.pronto['sala_criada'].wait(espera):
+            raise RuntimeError(f'{criador.nome}: sala_criada não chegou')
+        for bot in self.bots[1:]:
+            bot.conectar(url)
+            bot.entrar_na_sala(criador.codigo)
+            if not bot.pronto['meu_status'].wait(espera):
+                raise RuntimeError(f'{bot.nome}: meu_status não chegou')
+        for bot in self.bots[1:]:
+            bot.marcar_pronto()
+        for bot in self.bots:
+            bot.enviar_palavras()
+        for bot in self.bots:
+            bot.pronto['palavras_recebidas'].wait(espera)
+            bot.iniciar_rotina()
+
+    def desconectar(self):
+        for bot in self.bots:
+            bot.desconectar()
+
+
+# ===== Servidor local =====
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor(diretorio_log):
+    """Sobe o app com o gunicorn numa porta livre. Retorna (processo, url, log)"""
+    porta = porta_livre()
+    ambiente = dict(os.environ)
+    ambiente.setdefault('RENDER', '1')  # SocketIO em modo gevent, como em produção
+    ambiente['PASSAGEM_ARQUIVO'] = os.path.join(diretorio_log, 'passagem.pkl')
+    ambiente.pop('SNAPSHOT_ARQUIVO', None)
+    log = open(os.path.join(diretorio_log, 'servidor.log'), 'w')
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{porta}', '--max-requests', '0', '--access-logfile', '/dev/null', 'app:app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=ambiente,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    url = f'http://127.0.0.1:{porta}'
+    limite = time.time() + 60
+    while time.time() < limite:
+        if processo.poll() is not None:
+            break
+        try:
+            with urllib.request.urlopen(f'{url}/health', timeout=1) as resposta:
+                if resposta.status == 200:
+                    return processo, url, log
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    log.close()
+    raise RuntimeError(f'Servidor não subiu; veja {log.name}')
+
+
+def processo_worker(processo):
+    """Processo do worker do gunicorn (filho do mestre), ou None"""
+    try:
+        filhos = psutil.Process(processo.pid).children()
+    except psutil.Error:
+        return None
+    return filhos[0] if filhos else None
+
+
+def medir_worker(worker, cpu_anterior, inicio):
+    if worker is None:
+        return {}, None
+    try:
+        cpu = worker.cpu_times()
+        rss = worker.memory_info().rss
+    except psutil.Error:
+        return {}, None
+    usado = cpu.user + cpu.system
+    dados = {'rss_mb': round(rss / 2 ** 20, 1)}
+    if cpu_anterior is not None:
+        dados['cpu_pct'] = round(100 * (usado - cpu_anterior) / (time.perf_counter() - inicio), 1)
+    return dados, usado
+
+
+def executar(opcoes):
+    diretorio = tempfile.mkdtemp(prefix='carga-')
+    processo = log = None
+    url = opcoes.url
+    if not url:
+        processo, url, log = iniciar_servidor(diretorio)
+    worker = processo_worker(processo) if processo else None
+
+    metricas = Metricas()
+    agenda = Agenda()
+    salas = []
+    etapas = []
+    try:
+        dados_worker, cpu = medir_worker(worker, None, time.perf_counter())
+        base = {'salas': 0, 'jogadores': 0, **dados_worker}
+        print(f'servidor {url}  worker pid={worker.pid if worker else "-"}  rss inicial={base.get("rss_mb", "-")} MB')
+        for total in opcoes.salas:
+            metricas.reiniciar()
+            inicio = time.perf_counter()
+            while len(salas) < total:
+                sala = SalaSimulada(len(salas), agenda, metricas, opcoes)
+                salas.append(sala)
+                sala.montar(url)
+            montagem = time.perf_counter() - inicio
+            time.sleep(opcoes.duracao)
+            for sala in salas:
+                for bot in sala.bots:
+                    bot.descartar_antigos()
+            dados_worker, cpu = medir_worker(worker, cpu, inicio)
+            etapa = {
+                'salas': len(salas),
+                'jogadores': sum(len(s.bots) for s in salas),
+                'montagem_s': round(montagem, 2),
+                **dados_worker,
+                **metricas.resumo(),
+            }
+            etapas.append(etapa)
+            tentativa = etapa['latencia_ms'].get('tentar_adivinhar', {})
+            print(f"salas={etapa['salas']:>4} jogadores={etapa['jogadores']:>5} "
+                  f"env/s={etapa['enviados_por_segundo']:>7} rec/s={etapa['recebidos_por_segundo']:>8} "
+                  f"tentativa p50/p95/p99={tentativa.get('p50')}/{tentativa.get('p95')}/{tentativa.get('p99')} ms "
+                  f"rss={etapa.get('rss_mb', '-')} MB cpu={etapa.get('cpu_pct', '-')}% perdidos={etapa['sem_resposta']}")
+    finally:
+        for sala in salas:
+            sala.desconectar()
+        agenda.parar()
+        if processo:
+            processo.terminate()
+            processo.wait(timeout=30)
+            log.close()
+
+    resultado = {
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'url': url,
+        'opcoes': {
+            'jogadores': opcoes.jogadores,
+            'num_palavras': opcoes.num_palavras,
+            'duracao': opcoes.duracao,
+            'pensar': opcoes.pensar,
+            'erros': opcoes.erros,
+            'chat': opcoes.chat,
+            'emoji': opcoes.emoji,
+        },
+        'inicial': base,
+        'etapas': etapas,
+    }
+    with open(opcoes.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    print(f'resultado gravado em {opcoes.saida}')
+    return resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Teste de carga com jogadores simulados')
+    parser.add_argument('--salas', default='5,20,50',
+                        type=lambda texto: sorted(int(n) for n in texto.split(',')),
+                        help='total de salas em cada etapa, separado por vírgula')
+    parser.add_argument('--jogadores', type=int, default=4, help='jogadores por sala (2 a 10)')
+    parser.add_argument('--num-palavras', type=int, default=4)
+    parser.add_argument('--duracao', type=float, default=20, help='segundos de carga por etapa')
+    parser.add_argument('--pensar', type=float, default=1.0, help='segundos médios até o jogador da vez tentar')
+    parser.add_argument('--erros', type=float, default=0.3, help='fração de tentativas erradas')
+    parser.add_argument('--chat', type=float, default=5.0, help='segundos médios entre mensagens de cada jogador')
+    parser.add_argument('--emoji', type=float, default=2.0, help='segundos médios entre emojis de cada jogador')
+    parser.add_argument('--url', help='servidor já em execução (sem medição de memória do worker)')
+    parser.add_argument('--saida', default='carga.json')
+    executar(parser.parse_args())
@@ -0,0 +1,172 @@
+"""
+Deltas do estado do jogo: cada broadcast leva só o que mudou desde a versão anterior
+
+Formato do delta (JSON):
+
+    {
+        'campos': {chave: valor},              # chaves do topo substituídas
+        'jogadores': {nome: {campo: valor}},   # campos alterados de cada jogador
+    }
+
+Chaves vazias são omitidas. Se a lista de jogadores mudar (entrada, saída ou
+reordenação), ela vai inteira em ``campos``. O cliente aplica o delta sobre o
+estado da versão ``base``; se a sua versão for outra, pede o estado completo.
+
+Visões: os campos em ``CAMPOS_PRIVADOS`` de um jogador (a palavra anterior do
+alvo, inteira) só vão para ele próprio e para o dono dessa palavra (o jogador
+de quem ele é o alvo). Os demais recebem a visão de espectador. ``dica_atual``
+é pública de propósito: é o mesmo prefixo que ``dicas`` do alvo mostra no
+tabuleiro de todos. Jogadores com a mesma visão recebem o mesmo
+payload, montado uma única vez por versão.
+"""
+
+
+def copiar_estado(valor):
+    """Cópia profunda de dicts/listas (o estado referencia as listas vivas dos jogadores)"""
+    if isinstance(valor, dict):
+        return {chave: copiar_estado(v) for chave, v in valor.items()}
+    if isinstance(valor, list):
+        return [copiar_estado(v) for v in valor]
+    return valor
+
+
+def calcular_delta(anterior, atual):
+    """Retorna o delta que transforma ``anterior`` em ``atual`` ({} se nada mudou)"""
+    delta = {}
+    campos = {}
+    for chave, valor in atual.items():
+        if chave == 'jogadores':
+            continue
+        if anterior.get(chave) != valor:
+            campos[chave] = valor
+
+    jogadores_ant = anterior.get('jogadores', [])
+    jogadores_atu = atual.get('jogadores', [])
+    if [j['nome'] for j in jogadores_ant] != [j['nome'] for j in jogadores_atu]:
+        campos['jogadores'] = jogadores_atu
+    else:
+        alterados = {}
+        for ant, atu in zip(jogadores_ant, jogadores_atu):
+            mudancas = {campo: valor for campo, valor in atu.items() if ant.get(campo) != valor}
+            if mudancas:
+                alterados[atu['nome']] = mudancas
+        if alterados:
+            delta['jogadores'] = alterados
+
+    if campos:
+        delta['campos'] = campos
+    return delta
+
+
+def aplicar_delta(estado, delta):
+    """Aplica o delta sobre uma cópia de ``estado`` e a retorna (mesma regra do cliente)"""
+    novo = copiar_estado(estado)
+    novo.update(copiar_estado(delta.get('campos', {})))
+    por_nome = {j['nome']: j for j in novo.get('jogadores', [])}
+    for nome, mudancas in delta.get('jogadores', {}).items():
+        if nome in por_nome:
+            por_nome[nome].update(copiar_estado(mudancas))
+    return novo
+
+
+# ===== Visões por destinatário =====
+# dica_atual fica de fora: repete dicas[palavra_atual_index] do alvo, que é público
+CAMPOS_PRIVADOS = ('palavra_anterior',)
+
+
+def visiveis_por_jogador(estado):
+    """nome -> nomes cujos campos privados o jogador vê (ele e quem o tem como alvo)"""
+    visiveis = {j['nome']: {j['nome']} for j in estado.get('jogadores', [])}
+    for jogador in estado.get('jogadores', []):
+        if jogador.get('alvo') in visiveis:
+            visiveis[jogador['alvo']].add(jogador['nome'])
+    return {nome: frozenset(nomes) for nome, nomes in visiveis.items()}
+
+
+def _sem_privados(jogador):
+    return {campo: valor for campo, valor in jogador.items() if campo not in CAMPOS_PRIVADOS}
+
+
+def _projetar_jogadores(jogadores, visiveis):
+    return [j if j['nome'] in visiveis else _sem_privados(j) for j in jogadores]
+
+
+def _afetados(delta):
+    """Nomes cujos campos privados (ou alvo) aparecem no delta; None = todos"""
+    if 'jogadores' in delta.get('campos', {}):
+        return None
+    return {
+        nome for nome, mudancas in delta.get('jogadores', {}).items()
+        if 'alvo' in mudancas or any(campo in mudancas for campo in CAMPOS_PRIVADOS)
+    }
+
+
+def chave_visao(versionado, visiveis):
+    """Identifica a visão: destinatários com a mesma chave recebem o mesmo payload"""
+    if 'estado' in versionado:
+        return ('completo', visiveis)
+    afetados = _afetados(versionado['delta'])
+    return ('delta', visiveis if afetados is None else visiveis & afetados)
+
+
+def projetar(versionado, estado, visiveis):
+    """Projeta {'versao', 'estado'} ou {'versao', 'base', 'delta'} para quem vê ``visiveis``.
+
+    ``estado`` é o estado completo da versão atual: quem passou a ter um
+    jogador visível (troca de alvo) recebe os campos privados atuais dele.
+    """
+    if 'estado' in versionado:
+        completo = dict(versionado['estado'])
+        completo['jogadores'] = _projetar_jogadores(completo.get('jogadores', []), visiveis)
+        return {'versao': versionado['versao'], 'estado': completo}
+
+    delta = versionado['delta']
+    projetado = {}
+    if 'campos' in delta:
+        campos = dict(delta['campos'])
+        if 'jogadores' in campos:
+            campos['jogadores'] = _projetar_jogadores(campos['jogadores'], visiveis)
+        projetado['campos'] = campos
+    atuais = {j['nome']: j for j in estado.get('jogadores', [])}
+    jogadores = {}
+    for nome, mudancas in delta.get('jogadores', {}).items():
+        if 'alvo' in mudancas and nome in atuais:
+            if nome in visiveis:
+                mudancas = {**mudancas, **{c: atuais[nome][c] for c in CAMPOS_PRIVADOS if c in atuais[nome]}}
+            else:
+                mudancas = {**_sem_privados(mudancas), **{c: '' for c in CAMPOS_PRIVADOS}}
+        elif nome not in visiveis:
+            mudancas = _sem_privados(mudancas)
+        if mudancas:
+            jogadores[nome] = mudancas
+    if jogadores:
+        projetado['jogadores'] = jogadores
+    return {'versao': versionado['versao'], 'base': versionado['base'], 'delta': projetado}
+
+
+class CacheVisoes:
+    """Visões projetadas de cada sala, válidas até a próxima versão do estado"""
+
+    def __init__(self):
+        self._salas = {}  # codigo -> (versao, {chave: visao})
+        self.montadas = 0
+        self.reaproveitadas = 0
+
+    def obter(self, codigo, versao, chave, montar):
+        versao_cache, visoes = self._salas.get(codigo, (None, None))
+        if versao_cache != versao:
+            visoes = {}
+            self._salas[codigo] = (versao, visoes)
+        visao = visoes.get(chave)
+        if visao is None:
+            visao = visoes[chave] = montar()
+            self.montadas += 1
+        else:
+            self.reaproveitadas += 1
+        return visao
+
+    def descartar(self, codigo):
+        self._salas.pop(codigo, None)
+
+    def estatisticas(self):
+        return {'salas': len(self._salas), 'montadas': self.montadas, 'reaproveitadas': self.reaproveitadas}
@@ -0,0 +1,237 @@
+"""
+Fila de mensagens do Socket.IO para distribuir broadcasts entre processos
+
+Com mais de um worker, ``emit(..., room=codigo)`` só alcança os sockets do
+próprio processo. Com ``SOCKETIO_MESSAGE_QUEUE`` definido, cada broadcast é
+publicado na fila e reentregue por todos os workers, incluindo o emissor.
+
+URLs aceitas: ``redis://``/``rediss://``, ``kafka://``, ``zmq+tcp://``, URLs
+do Kombu (``amqp://`` etc.) e ``local://host:porta`` para o broker local
+deste módulo (``python fila_mensagens.py --porta 5600``), útil em testes.
+"""
+import argparse
+import collections
+import logging
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import socketio
+
+logger = logging.getLogger(__name__)
+
+_CABECALHO = struct.Struct('!I')
+
+
+def _enviar_quadro(sock, payload):
+    sock.sendall(_CABECALHO.pack(len(payload)) + payload)
+
+
+def _ler_exato(sock, tamanho):
+    partes = []
+    while tamanho:
+        parte = sock.recv(tamanho)
+        if not parte:
+            return None
+        partes.append(parte)
+        tamanho -= len(parte)
+    return b''.join(partes)
+
+
+def _ler_quadro(sock):
+    cabecalho = _ler_exato(sock, _CABECALHO.size)
+    if cabecalho is None:
+        return None
+    return _ler_exato(sock, _CABECALHO.unpack(cabecalho)[0])
+
+
+class MedicaoLatenciaMixin:
+    """Mede a latência extra de cada broadcast (publicação → reentrega local).
+
+    Deve vir antes de uma subclasse de ``socketio.PubSubManager`` na herança.
+    """
+
+    def _iniciar_medicao(self, amostras=1000):
+        self._latencias = collections.deque(maxlen=amostras)
+        self._contadores_fila = {'publicadas': 0, 'recebidas': 0}
+
+    def _publish(self, data):
+        if data.get('method') == 'emit':
+            data['enviado_em'] = time.time()
+            self._contadores_fila['publicadas'] += 1
+        return super()._publish(data)
+
+    def _handle_emit(self, message):
+        enviado_em = message.pop('enviado_em', None)
+        self._contadores_fila['recebidas'] += 1
+        super()._handle_emit(message)
+        if enviado_em is not None:
+            self._latencias.append((time.time() - enviado_em) * 1000)
+
+    def estatisticas(self):
+        """Contadores e latência (ms) dos broadcasts recentes"""
+        amostras = sorted(self._latencias)
+        resultado = {'backend': self.name, **self._contadores_fila}
+        if amostras:
+            resultado.update({
+                'latencia_media_ms': round(sum(amostras) / len(amostras), 3),
+                'latencia_p50_ms': round(amostras[len(amostras) // 2], 3),
+                'latencia_p95_ms': round(amostras[min(len(amostras) - 1, int(len(amostras) * 0.95))], 3),
+                'latencia_max_ms': round(amostras[-1], 3),
+            })
+        return resultado
+
+
+class _TransporteLocal(socketio.PubSubManager):
+    """Publicação e escuta no ``BrokerLocal`` via TCP"""
+
+    name = 'local'
+
+    def __init__(self, url='local://127.0.0.1:5600', channel='flask-socketio',
+                 write_only=False, logger=None):
+        endereco = url.split('://', 1)[-1]
+        host, _, porta = endereco.rpartition(':')
+        self.endereco = (host or '127.0.0.1', int(porta))
+        self._sock = None
+        self._trava_envio = threading.Lock()
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _conectar(self):
+        if self._sock is None:
+            self._sock = socket.create_connection(self.endereco)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return self._sock
+
+    def _publish(self, data):
+        payload = pickle.dumps({'canal': self.channel, 'dados': data})
+        with self._trava_envio:
+            for tentativa in range(2):
+                try:
+                    _enviar_quadro(self._conectar(), payload)
+                    return
+                except OSError:
+                    self._fechar()
+                    if tentativa:
+                        raise
+
+    def _listen(self):
+        while True:
+            try:
+                sock = self._conectar()
+                quadro = _ler_quadro(sock)
+            except OSError:
+                quadro = None
+            if quadro is None:
+                self._fechar()
+                self.server.sleep(1)
+                continue
+            mensagem = pickle.loads(quadro)
+            if mensagem.get('canal') == self.channel:
+                yield mensagem['dados']
+
+    def _fechar(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+class GerenciadorFilaLocal(MedicaoLatenciaMixin, _TransporteLocal):
+    """Gerenciador Socket.IO do broker local, com medição de latência"""
+
+    def __init__(self, *args, **kwargs):
+        self._iniciar_medicao()
+        super().__init__(*args, **kwargs)
+
+
+class BrokerLocal:
+    """Broker TCP mínimo: repassa cada quadro recebido para todos os clientes"""
+
+    def __init__(self, host='127.0.0.1', porta=5600):
+        self._clientes = set()
+        self._trava = threading.Lock()
+        broker = self
+
+        class _Tratador(socketserver.BaseRequestHandler):
+            def handle(self):
+                sock = self.request
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with broker._trava:
+                    broker._clientes.add(sock)
+                try:
+                    while True:
+                        quadro = _ler_quadro(sock)
+                        if quadro is None:
+                            break
+                        broker._repassar(quadro)
+                finally:
+                    with broker._trava:
+                        broker._clientes.discard(sock)
+
+        class _Servidor(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.servidor = _Servidor((host, porta), _Tratador)
+        self.endereco = self.servidor.server_address
+
+    @property
+    def url(self):
+        return f'local://{self.endereco[0]}:{self.endereco[1]}'
+
+    def _repassar(self, quadro):
+        with self._trava:
+            clientes = list(self._clientes)
+        for cliente in clientes:
+            try:
+                _enviar_quadro(cliente, quadro)
+            except OSError:
+                pass
+
+    def executar(self):
+        self.servidor.serve_forever()
+
+    def iniciar_em_thread(self):
+        threading.Thread(target=self.executar, daemon=True).start()
+        return self
+
+    def encerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def criar_gerenciador(url, channel='flask-socketio', write_only=False):
+    """Cria o gerenciador Socket.IO para a URL de fila, com medição de latência"""
+    if url.startswith('local://'):
+        return GerenciadorFilaLocal(url, channel=channel, write_only=write_only)
+    if url.startswith(('redis://', 'rediss://')):
+        base = socketio.RedisManager
+    elif url.startswith('kafka://'):
+        base = socketio.KafkaManager
+    elif url.startswith('zmq'):
+        base = socketio.ZmqManager
+    else:
+        base = socketio.KombuManager
+
+    class GerenciadorMedido(MedicaoLatenciaMixin, base):
+        def __init__(self, *args, **kwargs):
+            self._iniciar_medicao()
+            super().__init__(*args, **kwargs)
+
+    return GerenciadorMedido(url, channel=channel, write_only=write_only)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Broker local da fila de mensagens do Socket.IO')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=5600)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    broker = BrokerLocal(args.host, args.porta)
+    logger.info(f'Broker local em {broker.url}')
+    broker.executar()
@@ -37,3 +37,24 @@ umask = 0
 # SSL (não usado no Render)
 keyfile = None
 certfile = None
+
+# Passagem das salas em memória quando o worker é reciclado (max_requests, reload)
+def worker_exit(server, worker):
+    from app import entregar_salas
+    entregar_salas()
+
+def _worker_anterior_ativo(worker):
+    """Num reload (HUP) o worker antigo ainda está de pé e entregará as salas ao sair"""
+    import psutil
+    try:
+        proprio = psutil.Process(os.getpid())
+        return any(irmao.pid != proprio.pid and irmao.create_time() <= proprio.create_time()
+                   for irmao in psutil.Process(worker.ppid).children())
+    except psutil.Error:
+        return False
+
+def post_worker_init(worker):
+    from app import receber_salas, iniciar_tarefas
+    espera = worker.cfg.graceful_timeout + 5 if _worker_anterior_ativo(worker) else 0
+    receber_salas(espera=espera)
+    iniciar_tarefas()
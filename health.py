@@ -6,6 +6,13 @@ import psutil
 import os
 import time
 
+# Fornecedores de métricas extras exibidas em /health/detailed (nome -> callable)
+_metrics_providers = {}
+
+def register_metrics_provider(name, provider):
+    """Registra uma função que retorna métricas extras para /health/detailed"""
+    _metrics_providers[name] = provider
+
 def get_health_status():
     """Retorna o status de saúde da aplicação"""
     try:
@@ -55,7 +62,13 @@ def register_health_routes(app):
     @app.route('/health/detailed')
     def detailed_health():
         """Endpoint detalhado de health check"""
-        return jsonify(get_health_status())
+        status = get_health_status()
+        for name, provider in _metrics_providers.items():
+            try:
+                status[name] = provider()
+            except Exception as e:
+                status[name] = {"error": str(e)}
+        return jsonify(status)
     
     @app.route('/ping')
     def ping():
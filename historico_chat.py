@@ -0,0 +1,58 @@
+"""
+Histórico do chat de uma sala: buffer circular de capacidade fixa com sequência por mensagem
+"""
+
+
+class HistoricoChat:
+    """Guarda as últimas ``capacidade`` mensagens; cada uma recebe um ``seq`` crescente.
+
+    A sequência nunca volta atrás (nem ao limpar), então o cliente pode pedir
+    tudo depois do último ``seq`` que viu e detectar mensagens perdidas.
+    """
+
+    def __init__(self, capacidade=50):
+        self.capacidade = capacidade
+        self._slots = [None] * capacidade
+        self.ultima_seq = 0
+        self.primeira_seq = 1  # seq da mensagem mais antiga ainda guardada
+
+    def adicionar(self, jogador, mensagem, timestamp):
+        """Acrescenta a mensagem (sobrescreve a mais antiga se cheio) e a retorna"""
+        self.ultima_seq += 1
+        registro = {'seq': self.ultima_seq, 'jogador': jogador, 'mensagem': mensagem, 'timestamp': timestamp}
+        self._slots[self.ultima_seq % self.capacidade] = registro
+        self.primeira_seq = max(self.primeira_seq, self.ultima_seq - self.capacidade + 1)
+        return registro
+
+    def desde(self, desde_seq=0, limite=None):
+        """Mensagens com seq > ``desde_seq``, da mais antiga para a mais nova (até ``limite``)"""
+        inicio = max(desde_seq + 1, self.primeira_seq)
+        fim = self.ultima_seq + 1
+        if limite is not None:
+            fim = min(fim, inicio + max(0, limite))
+        return [self._slots[seq % self.capacidade] for seq in range(inicio, fim)]
+
+    def limpar(self):
+        """Descarta as mensagens mantendo a sequência"""
+        self._slots = [None] * self.capacidade
+        self.primeira_seq = self.ultima_seq + 1
+
+    def __len__(self):
+        return self.ultima_seq - self.primeira_seq + 1
+
+    def __iter__(self):
+        return iter(self.desde())
+
+    def para_dict(self):
+        return {'capacidade': self.capacidade, 'ultima_seq': self.ultima_seq, 'mensagens': self.desde()}
+
+    @classmethod
+    def de_dict(cls, dados):
+        historico = cls(dados.get('capacidade', 50))
+        mensagens = dados.get('mensagens', [])
+        # Mensagens sem seq (formato antigo) são numeradas em ordem
+        historico.ultima_seq = dados.get('ultima_seq', len(mensagens)) - len(mensagens)
+        historico.primeira_seq = historico.ultima_seq + 1
+        for m in mensagens:
+            historico.adicionar(m['jogador'], m['mensagem'], m['timestamp'])
+        return historico
@@ -1,27 +1,69 @@
-from normalizador import NormalizadorTexto
+import time
+
+from historico_chat import HistoricoChat
+from normalizador import normalizador_compartilhado
+
+_hora_formatada = [None, '']  # [segundo, 'HH:MM:SS']
+
+
+def hora_atual():
+    """Hora local 'HH:MM:SS', formatada no máximo uma vez por segundo"""
+    segundo = int(time.time())
+    if segundo != _hora_formatada[0]:
+        _hora_formatada[:] = segundo, time.strftime('%H:%M:%S', time.localtime(segundo))
+    return _hora_formatada[1]
 
 class Configuracao:
+    __slots__ = ('num_palavras', 'max_jogadores')
+
     def __init__(self, num_palavras=5, max_jogadores=8):
         self.num_palavras = max(4, min(8, num_palavras))  # Entre 4 e 8
         self.max_jogadores = max(2, min(10, max_jogadores))  # Entre 2 e 10
 
+    def para_dict(self):
+        return {'num_palavras': self.num_palavras, 'max_jogadores': self.max_jogadores}
+
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(dados['num_palavras'], dados['max_jogadores'])
+
+class PalavrasDesconhecidas(ValueError):
+    """Palavras fora do léxico; ``sugestoes`` leva cada uma às grafias válidas mais próximas"""
+
+    def __init__(self, sugestoes):
+        self.sugestoes = sugestoes
+        partes = []
+        for palavra, grafias in sugestoes.items():
+            if grafias:
+                opcoes = ', '.join(f"'{g}'" for g in grafias)
+                partes.append(f"'{palavra}' (você quis dizer {opcoes}?)")
+            else:
+                partes.append(f"'{palavra}'")
+        super().__init__(f"Palavras não encontradas no dicionário: {'; '.join(partes)}")
+
+
 class Jogador:
+    __slots__ = (
+        'nome', 'num_palavras', 'palavras', 'palavras_originais',
+        'palavra_atual_index', 'tentativas_erradas_atual', 'tentativas_por_palavra',
+        'palavras_descobertas', 'alvo_jogador', 'concluido', 'avatar',
+    )
+    normalizador = normalizador_compartilhado  # Compartilhado por todos os jogadores (somente leitura)
+
     def __init__(self, nome, num_palavras=5):
         self.nome = nome
         self.num_palavras = num_palavras
         self.palavras = []  # Lista com as N palavras definidas
         self.palavras_originais = []  # Lista com as palavras originais (antes da normalização)
-        self.dicas = []     # Lista com a dica de cada palavra
         self.palavra_atual_index = 1  # Índice da palavra que está tentando adivinhar (começa na 2ª palavra)
         self.tentativas_erradas_atual = 0  # Erros na palavra atual
         self.tentativas_por_palavra = []  # Erros acumulados por palavra
         self.palavras_descobertas = []  # Controla quais palavras foram descobertas
         self.alvo_jogador = None  # Jogador cujas palavras este jogador deve adivinhar
         self.concluido = False  # Se terminou de adivinhar todas as palavras
-        self.normalizador = NormalizadorTexto()  # Instância do normalizador
         self.avatar = '👤' # Avatar padrão do jogador
 
-    def definir_palavras(self, lista_palavras):
+    def definir_palavras(self, lista_palavras, validar_dicionario=False):
         if len(lista_palavras) != self.num_palavras:
             raise ValueError(f"É necessário inserir exatamente {self.num_palavras} palavras.")
         
@@ -34,6 +76,16 @@ class Jogador:
             if len(palavra.strip()) < 2:
                 raise ValueError("As palavras devem ter pelo menos 2 letras.")
         
+        # Sala com validação: todas as palavras precisam existir no léxico
+        if validar_dicionario:
+            desconhecidas = {
+                palavra.strip(): self.normalizador.sugerir_grafias(palavra)
+                for palavra in lista_palavras
+                if not self.normalizador.palavra_conhecida(palavra)
+            }
+            if desconhecidas:
+                raise PalavrasDesconhecidas(desconhecidas)
+        
         # Salvar palavras originais e normalizadas
         self.palavras_originais = [palavra.strip() for palavra in lista_palavras]
         self.palavras = []
@@ -48,16 +100,23 @@ class Jogador:
         
         # A primeira palavra já é considerada "descoberta" pois está completa
         self.palavras_descobertas[0] = True
-        
-        # Configurar dicas iniciais
-        self.dicas = []
-        for i, palavra in enumerate(self.palavras):
-            if i == 0:
-                # Primeira palavra: mostrar completa
-                self.dicas.append(palavra)
-            else:
-                # Demais palavras: apenas primeira letra
-                self.dicas.append(palavra[0])
+
+    def letras_reveladas(self, indice):
+        """Quantas letras da palavra ``indice`` a dica mostra: a 1ª inteira, as demais 1 + erros"""
+        palavra = self.palavras[indice]
+        if indice == 0:
+            return len(palavra)
+        erros = self.tentativas_por_palavra[indice] if indice < len(self.tentativas_por_palavra) else 0
+        return min(len(palavra), 1 + erros)
+
+    @property
+    def dicas(self):
+        """Dica de cada palavra, montada só quando o estado é serializado.
+
+        O tamanho revelado vem dos erros acumulados por palavra, então um erro
+        atualiza apenas o contador da palavra atual.
+        """
+        return [palavra[:self.letras_reveladas(i)] for i, palavra in enumerate(self.palavras)]
 
     def get_dica_palavra_atual(self):
         """Retorna a dica da palavra que o jogador está tentando adivinhar atualmente"""
@@ -75,22 +134,6 @@ class Jogador:
             total_letras = min(len(palavra), 1 + letras_extras)
             return palavra[:total_letras]
 
-    def atualizar_dicas_alvo(self):
-        """Atualiza as dicas do alvo baseado nos erros acumulados"""
-        if not self.alvo_jogador:
-            return
-        
-        for i, palavra in enumerate(self.alvo_jogador.palavras):
-            if i == 0:
-                # Primeira palavra: sempre completa
-                self.alvo_jogador.dicas[i] = palavra
-            else:
-                # Demais palavras: primeira letra + letras extras por erros
-                if i < len(self.alvo_jogador.tentativas_por_palavra):
-                    erros = self.alvo_jogador.tentativas_por_palavra[i]
-                    total_letras = min(len(palavra), 1 + erros)
-                    self.alvo_jogador.dicas[i] = palavra[:total_letras]
-
     def get_palavra_anterior(self):
         """Retorna a palavra anterior que foi descoberta (para referência)"""
         if not self.alvo_jogador or self.palavra_atual_index <= 0:
@@ -120,9 +163,6 @@ class Jogador:
             self.palavra_atual_index += 1
             self.tentativas_erradas_atual = 0
             
-            # Atualizar dicas do alvo após acertar
-            self.atualizar_dicas_alvo()
-            
             # Verificar se houve correção automática
             mensagem_correcao = ""
             if self.normalizador.foi_corrigida(palavra_tentada_original, palavra_tentada_normalizada):
@@ -138,19 +178,23 @@ class Jogador:
             # Errou - incrementar tentativas da palavra atual no alvo
             self.tentativas_erradas_atual += 1
             if self.palavra_atual_index < len(self.alvo_jogador.tentativas_por_palavra):
-                self.alvo_jogador.tentativas_por_palavra[self.palavra_atual_index] += 1
-            
-            # Atualizar dicas do alvo
-            self.atualizar_dicas_alvo()
+                self.alvo_jogador.tentativas_por_palavra[self.palavra_atual_index] += 1  # Revela mais uma letra
             
             nova_dica = self.get_dica_palavra_atual()
             
-            # Verificar se há sugestão de correção
+            # Verificar se há sugestão de correção (a mensagem vai para a sala toda:
+            # nunca sugerir uma das palavras do alvo)
             sugestao = self.normalizador.sugerir_correcao(palavra_tentada_original)
             mensagem_sugestao = ""
-            if sugestao and sugestao != palavra_tentada_normalizada:
+            if (sugestao and sugestao != palavra_tentada_normalizada
+                    and not any(self.normalizador.comparar_palavras(sugestao, palavra)
+                                for palavra in self.alvo_jogador.palavras)):
                 mensagem_sugestao = f" (você quis dizer '{sugestao}'?)"
             
+            # Palpite a uma ou duas letras da palavra certa
+            if self.normalizador.quase_acertou(palavra_tentada_normalizada, palavra_correta):
+                return False, f"Quase! Nova dica: {nova_dica}{mensagem_sugestao}"
+            
             return False, f"Errou! Nova dica: {nova_dica}{mensagem_sugestao}"
 
     def descobrir_palavra(self, indice):
@@ -162,29 +206,96 @@ class Jogador:
         """Define o avatar do jogador"""
         self.avatar = avatar_url
 
+    def para_dict(self):
+        """Serializa o jogador (o alvo é referenciado pelo nome)"""
+        return {
+            'nome': self.nome,
+            'num_palavras': self.num_palavras,
+            'palavras': self.palavras,
+            'palavras_originais': self.palavras_originais,
+            'palavra_atual_index': self.palavra_atual_index,
+            'tentativas_erradas_atual': self.tentativas_erradas_atual,
+            'tentativas_por_palavra': self.tentativas_por_palavra,
+            'palavras_descobertas': self.palavras_descobertas,
+            'alvo': self.alvo_jogador.nome if self.alvo_jogador else None,
+            'concluido': self.concluido,
+            'avatar': self.avatar,
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Reconstrói o jogador; o vínculo com o alvo é refeito pela partida"""
+        jogador = cls(dados['nome'], dados['num_palavras'])
+        jogador.palavras = list(dados['palavras'])
+        jogador.palavras_originais = list(dados['palavras_originais'])
+        jogador.palavra_atual_index = dados['palavra_atual_index']
+        jogador.tentativas_erradas_atual = dados['tentativas_erradas_atual']
+        jogador.tentativas_por_palavra = list(dados['tentativas_por_palavra'])
+        jogador.palavras_descobertas = list(dados['palavras_descobertas'])
+        jogador.concluido = dados['concluido']
+        jogador.avatar = dados.get('avatar', jogador.avatar)
+        return jogador
+
+
+def chave_nome(nome):
+    """Chave de busca de um jogador: nome sem espaços nas pontas e sem distinção de maiúsculas"""
+    return nome.strip().casefold()
+
 
 class PartidaMultiplayer:
+    __slots__ = ('config', '_jogadores', '_por_nome', 'turno_atual', 'jogo_iniciado', 'vencedor', 'chat', 'codigo_sala')
+
     def __init__(self, configuracao):
         self.config = configuracao
-        self.jogadores = []
+        self._jogadores = ()  # Ordem dos turnos (tupla: só muda por adicionar/remover_jogador)
+        self._por_nome = {}  # chave_nome(nome) -> jogador
         self.turno_atual = 0
         self.jogo_iniciado = False
         self.vencedor = None
-        self.mensagens_chat = []
+        self.chat = HistoricoChat(50)  # Últimas 50 mensagens, com sequência
         self.codigo_sala = ""
 
+    @property
+    def jogadores(self):
+        """Jogadores na ordem dos turnos (tupla imutável; use adicionar/remover_jogador)"""
+        return self._jogadores
+
+    def obter_jogador(self, nome):
+        """Jogador com esse nome (sem distinção de maiúsculas), ou None"""
+        return self._por_nome.get(chave_nome(nome))
+
     def adicionar_jogador(self, jogador):
         """Adiciona um jogador à partida"""
         if len(self.jogadores) >= self.config.max_jogadores:
             raise ValueError("Sala cheia")
+        chave = chave_nome(jogador.nome)
+        if chave in self._por_nome:
+            raise ValueError("Já existe um jogador com esse nome")
         
         jogador.num_palavras = self.config.num_palavras
-        self.jogadores.append(jogador)
+        self._jogadores += (jogador,)
+        self._por_nome[chave] = jogador
         
         # Se atingiu o número mínimo, configurar alvos
         if len(self.jogadores) >= 2:
             self._configurar_alvos()
 
+    def remover_jogador(self, nome):
+        """Remove o jogador pelo nome e mantém a vez com quem a tinha (ou com o seguinte).
+
+        Retorna o jogador removido, ou None se não estava na partida.
+        """
+        jogador = self._por_nome.pop(chave_nome(nome), None)
+        if jogador is None:
+            return None
+        posicao = self._jogadores.index(jogador)
+        self._jogadores = self._jogadores[:posicao] + self._jogadores[posicao + 1:]
+        if posicao < self.turno_atual:
+            self.turno_atual -= 1
+        if self.turno_atual >= len(self._jogadores):
+            self.turno_atual = 0
+        return jogador
+
     def _configurar_alvos(self):
         """Configura a lógica circular de alvos"""
         for i, jogador in enumerate(self.jogadores):
@@ -214,11 +325,7 @@ class PartidaMultiplayer:
             return False, "O jogo já terminou!"
         
         # Encontrar o jogador
-        jogador_atual = None
-        for j in self.jogadores:
-            if j.nome == jogador_nome:
-                jogador_atual = j
-                break
+        jogador_atual = self.obter_jogador(jogador_nome)
         
         if not jogador_atual:
             return False, "Jogador não encontrado!"
@@ -247,17 +354,13 @@ class PartidaMultiplayer:
         return None
 
     def adicionar_mensagem_chat(self, jogador_nome, mensagem):
-        """Adiciona uma mensagem ao chat"""
-        import datetime
-        self.mensagens_chat.append({
-            'jogador': jogador_nome,
-            'mensagem': mensagem.strip(),
-            'timestamp': datetime.datetime.now().strftime('%H:%M:%S')
-        })
-        
-        # Manter apenas as últimas 50 mensagens
-        if len(self.mensagens_chat) > 50:
-            self.mensagens_chat = self.mensagens_chat[-50:]
+        """Adiciona uma mensagem ao chat e a retorna (com o seq)"""
+        return self.chat.adicionar(jogador_nome, mensagem.strip(), hora_atual())
+
+    @property
+    def mensagens_chat(self):
+        """Mensagens guardadas, da mais antiga para a mais nova"""
+        return self.chat.desde()
 
     def get_estado_jogo(self):
         """Retorna o estado atual do jogo"""
@@ -286,8 +389,7 @@ class PartidaMultiplayer:
                     'palavras_originais': j.palavras_originais if self.vencedor else []
                 } for j in self.jogadores
 
-            ],
-            'mensagens_chat': self.mensagens_chat
+            ]
         }
     
     def get_gabarito_completo(self):
@@ -311,13 +413,12 @@ class PartidaMultiplayer:
         self.jogo_iniciado = False
         self.vencedor = None
         self.turno_atual = 0
-        self.mensagens_chat = []
+        self.chat.limpar()
         
         # Resetar estado dos jogadores
         for jogador in self.jogadores:
             jogador.palavras = []
             jogador.palavras_originais = []
-            jogador.dicas = []
             jogador.palavra_atual_index = 1
             jogador.tentativas_erradas_atual = 0
             jogador.tentativas_por_palavra = []
@@ -329,3 +430,34 @@ class PartidaMultiplayer:
             self._configurar_alvos()
         
         return True
+
+    def para_dict(self):
+        """Serializa a partida em tipos simples (compatível com JSON)"""
+        return {
+            'config': self.config.para_dict(),
+            'jogadores': [j.para_dict() for j in self.jogadores],
+            'turno_atual': self.turno_atual,
+            'jogo_iniciado': self.jogo_iniciado,
+            'vencedor': self.vencedor.nome if self.vencedor else None,
+            'chat': self.chat.para_dict(),
+            'codigo_sala': self.codigo_sala,
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Reconstrói a partida, refazendo as referências de alvo e vencedor"""
+        partida = cls(Configuracao.de_dict(dados['config']))
+        partida._jogadores = tuple(Jogador.de_dict(d) for d in dados['jogadores'])
+        partida._por_nome = {chave_nome(j.nome): j for j in partida._jogadores}
+        por_nome = {j.nome: j for j in partida.jogadores}
+        for jogador, d in zip(partida.jogadores, dados['jogadores']):
+            jogador.alvo_jogador = por_nome.get(d.get('alvo'))
+        partida.turno_atual = dados['turno_atual']
+        partida.jogo_iniciado = dados['jogo_iniciado']
+        partida.vencedor = por_nome.get(dados.get('vencedor'))
+        if 'chat' in dados:
+            partida.chat = HistoricoChat.de_dict(dados['chat'])
+        else:
+            partida.chat = HistoricoChat.de_dict({'mensagens': dados.get('mensagens_chat', [])})
+        partida.codigo_sala = dados.get('codigo_sala', '')
+        return partida
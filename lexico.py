@@ -0,0 +1,201 @@
+"""
+Léxico compacto em disco, consultado por mmap sem carregar as palavras na memória
+
+    python lexico.py compilar palavras.txt lexico.bin
+
+A entrada é uma lista de palavras em UTF-8, uma por linha (linhas vazias e
+iniciadas por '#' são ignoradas). Cada palavra é indexada pela grafia sem
+acentos em minúsculas, que aponta para a grafia correta; havendo várias
+grafias com a mesma chave, fica a do dicionário do normalizador ou, sem ela,
+a primeira em ordem alfabética.
+
+Formato (little-endian, versionado):
+
+    cabeçalho: b'CVLX' + versão (2 bytes) + 2 bytes reservados (zero)
+               + total de palavras (4) + total de posições da tabela de hash (4)
+               + tamanho do alfabeto (4), 20 bytes no total
+    alfabeto:  letras das chaves em UTF-8, completado com zeros até múltiplo de 4,
+               de modo que a tabela e os offsets começam alinhados em 4 bytes
+    tabela:    posições (uint32): índice da entrada + 1, ou 0 se vazia
+               (endereçamento aberto, hash CRC-32 da chave, sondagem linear)
+    offsets:   total + 1 inteiros (uint32) com o início de cada entrada nos dados
+    dados:     entradas em ordem de chave: chave, ou chave + b'\\0' + grafia quando diferem
+
+Como o arquivo é mapeado e só as páginas consultadas são lidas, os workers
+compartilham o cache de páginas do sistema e a abertura é instantânea.
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+MAGICO = b'CVLX'
+VERSAO_FORMATO = 2
+_CABECALHO = struct.Struct('<4sHxxIII')  # 20 bytes: os uint32 seguintes ficam alinhados
+_SEPARADOR = b'\0'
+
+
+def _alinhar(tamanho):
+    return (tamanho + 3) & ~3
+
+
+def _uint32(valores):
+    vetor = array('I', valores)
+    if sys.byteorder != 'little':
+        vetor.byteswap()
+    return vetor.tobytes()
+
+
+def compilar_lexico(pares, caminho):
+    """Grava o léxico a partir de pares (chave sem acentos, grafia); retorna o total de palavras"""
+    por_chave = {}
+    for chave, forma in sorted(pares):
+        por_chave.setdefault(chave, forma)
+    chaves = sorted(por_chave, key=lambda chave: chave.encode('utf-8'))
+
+    offsets = [0]
+    dados = bytearray()
+    for chave in chaves:
+        dados += chave.encode('utf-8')
+        if por_chave[chave] != chave:
+            dados += _SEPARADOR + por_chave[chave].encode('utf-8')
+        offsets.append(len(dados))
+
+    total_posicoes = 1
+    while total_posicoes < 2 * len(chaves):
+        total_posicoes *= 2
+    posicoes = [0] * total_posicoes
+    mascara = total_posicoes - 1
+    for indice, chave in enumerate(chaves):
+        posicao = zlib.crc32(chave.encode('utf-8')) & mascara
+        while posicoes[posicao]:
+            posicao = (posicao + 1) & mascara
+        posicoes[posicao] = indice + 1
+
+    alfabeto = ''.join(sorted({letra for chave in chaves for letra in chave})).encode('utf-8')
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(_CABECALHO.pack(MAGICO, VERSAO_FORMATO, len(chaves), total_posicoes, len(alfabeto)))
+        arquivo.write(alfabeto.ljust(_alinhar(len(alfabeto)), b'\0'))
+        arquivo.write(_uint32(posicoes))
+        arquivo.write(_uint32(offsets))
+        arquivo.write(dados)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+    return len(chaves)
+
+
+class LexicoCompacto:
+    """Léxico mapeado em memória: chave sem acentos -> grafia correta.
+
+    Se comporta como um dicionário somente leitura (``in``, ``get``, ``[]``,
+    ``len``, iteração em ordem de chave). Cada consulta custa um CRC-32 da
+    chave e, em média, uma comparação de bytes.
+    """
+
+    def __init__(self, caminho):
+        if sys.byteorder != 'little':
+            raise ValueError('Léxico compacto só é suportado em máquinas little-endian')
+        self.caminho = caminho
+        with open(caminho, 'rb') as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, versao, total, total_posicoes, tamanho_alfabeto = _CABECALHO.unpack_from(self._mapa, 0)
+        if magico != MAGICO:
+            raise ValueError(f'Arquivo de léxico inválido: {caminho}')
+        if versao != VERSAO_FORMATO:
+            raise ValueError(f'Versão de léxico não suportada: {versao}')
+        self._total = total
+        self._mascara = total_posicoes - 1
+
+        inicio = _CABECALHO.size
+        self.alfabeto = self._mapa[inicio:inicio + tamanho_alfabeto].decode('utf-8')
+        inicio += _alinhar(tamanho_alfabeto)
+        visao = memoryview(self._mapa)
+        self._posicoes = visao[inicio:inicio + 4 * total_posicoes].cast('I')
+        inicio += 4 * total_posicoes
+        self._offsets = visao[inicio:inicio + 4 * (total + 1)].cast('I')
+        self._inicio_dados = inicio + 4 * (total + 1)
+
+    def _entrada(self, chave_bytes):
+        """(início, fim) da entrada com essa chave nos dados, ou None"""
+        mapa = self._mapa
+        tamanho = len(chave_bytes)
+        posicao = zlib.crc32(chave_bytes) & self._mascara
+        while True:
+            indice = self._posicoes[posicao]
+            if not indice:
+                return None
+            inicio = self._inicio_dados + self._offsets[indice - 1]
+            fim = self._inicio_dados + self._offsets[indice]
+            if (mapa[inicio:inicio + tamanho] == chave_bytes
+                    and (inicio + tamanho == fim or mapa[inicio + tamanho] == 0)):
+                return inicio, fim
+            posicao = (posicao + 1) & self._mascara
+
+    def __contains__(self, chave):
+        return self._entrada(chave.encode('utf-8')) is not None
+
+    def get(self, chave, padrao=None):
+        chave_bytes = chave.encode('utf-8')
+        entrada = self._entrada(chave_bytes)
+        if entrada is None:
+            return padrao
+        inicio, fim = entrada
+        if inicio + len(chave_bytes) == fim:
+            return chave
+        return self._mapa[inicio + len(chave_bytes) + 1:fim].decode('utf-8')
+
+    def __getitem__(self, chave):
+        forma = self.get(chave)
+        if forma is None:
+            raise KeyError(chave)
+        return forma
+
+    def __len__(self):
+        return self._total
+
+    def __iter__(self):
+        for indice in range(self._total):
+            entrada = self._mapa[self._inicio_dados + self._offsets[indice]:self._inicio_dados + self._offsets[indice + 1]]
+            yield entrada.split(_SEPARADOR, 1)[0].decode('utf-8')
+
+    def fechar(self):
+        self._posicoes.release()
+        self._offsets.release()
+        self._mapa.close()
+
+
+def _ler_palavras(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            palavra = linha.strip().lower()
+            if palavra and not palavra.startswith('#'):
+                yield palavra
+
+
+def compilar_arquivo(entrada, saida):
+    """Compila a lista de palavras (mais as grafias corretas do normalizador) no arquivo binário"""
+    from normalizador import LEXICO, normalizador_compartilhado
+
+    dobrar = normalizador_compartilhado.remover_acentos
+    por_chave = {}
+    for palavra in sorted(_ler_palavras(entrada)):
+        por_chave.setdefault(dobrar(palavra), palavra)
+    # As grafias do normalizador têm preferência sobre as da lista
+    por_chave.update((dobrar(palavra), palavra) for palavra in LEXICO)
+    return compilar_lexico(por_chave.items(), saida)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compila a lista de palavras no léxico compacto')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    compilar = subcomandos.add_parser('compilar')
+    compilar.add_argument('entrada', help='lista de palavras em UTF-8, uma por linha')
+    compilar.add_argument('saida', help='arquivo binário gerado')
+    args = parser.parse_args()
+    total = compilar_arquivo(args.entrada, args.saida)
+    print(f'{total} palavras gravadas em {args.saida} ({os.path.getsize(args.saida)} bytes)')
@@ -0,0 +1,122 @@
+"""
+Limitador de eventos: token bucket por evento, por conexão (SID) e por jogador (player_id)
+"""
+import time
+
+# evento -> (capacidade do balde, fichas repostas por segundo)
+LIMITES_PADRAO = {
+    'criar_sala': (3, 0.1),
+    'entrar_na_sala': (10, 1.0),
+    'enviar_mensagem_chat': (5, 1.0),
+    'enviar_emoji': (10, 4.0),
+    'historico_chat': (5, 1.0),
+    'tentar_adivinhar': (10, 5.0),
+}
+
+
+def ler_limites(texto, padrao=LIMITES_PADRAO):
+    """Lê ``evento=capacidade/taxa`` separados por vírgula sobre os limites padrão.
+
+    Capacidade 0 desliga o limite do evento. Entradas malformadas são ignoradas.
+    """
+    limites = dict(padrao)
+    for item in (texto or '').split(','):
+        evento, _, valor = item.strip().partition('=')
+        capacidade, _, taxa = valor.partition('/')
+        try:
+            capacidade, taxa = int(capacidade), float(taxa or 1)
+        except ValueError:
+            continue
+        if capacidade <= 0:
+            limites.pop(evento, None)
+        elif taxa > 0:
+            limites[evento] = (capacidade, taxa)
+    return limites
+
+
+class LimitadorEventos:
+    """Decide se um evento pode ser processado, gastando uma ficha do balde.
+
+    Cada evento limitado tem um balde por SID e outro por player_id (quando
+    conhecido), de modo que abrir várias abas não multiplica a cota. O
+    player_id vem só da associação feita pelo servidor (``associar``), nunca
+    do payload do evento: assim uma conexão não troca de cota nem gasta a de
+    outro jogador só por mandar o id dele. Um balde
+    é só ``[fichas, instante]`` num dicionário; a reposição é calculada na
+    consulta, sem tarefa em segundo plano. Baldes cheios há tempo suficiente
+    equivalem a baldes novos e são podados quando o dicionário cresce.
+    """
+
+    LIMITE_PODA = 4096
+
+    def __init__(self, limites=None, relogio=time.monotonic):
+        self.limites = dict(LIMITES_PADRAO if limites is None else limites)
+        self.relogio = relogio
+        self._baldes = {}
+        self._jogador_do_sid = {}
+        self._proxima_poda = self.LIMITE_PODA
+        self._permitidos = dict.fromkeys(self.limites, 0)
+        self._descartados = dict.fromkeys(self.limites, 0)
+
+    def associar(self, sid, player_id):
+        """Liga o SID ao player_id para que os dois compartilhem a cota.
+
+        Vale a primeira associação da conexão; tentativas de trocar o
+        player_id depois dela são ignoradas.
+        """
+        if player_id and isinstance(player_id, str):
+            self._jogador_do_sid.setdefault(sid, player_id)
+
+    def esquecer(self, sid):
+        """Descarta os dados da conexão encerrada (os baldes do jogador continuam)"""
+        self._jogador_do_sid.pop(sid, None)
+        for evento in self.limites:
+            self._baldes.pop((evento, sid), None)
+
+    def permitir(self, evento, sid):
+        """True se o evento pode seguir; False se algum dos baldes está vazio"""
+        limite = self.limites.get(evento)
+        if limite is None:
+            return True
+        capacidade, taxa = limite
+        agora = self.relogio()
+        player_id = self._jogador_do_sid.get(sid)
+
+        balde_sid = self._balde((evento, sid), capacidade, taxa, agora)
+        balde_jogador = self._balde((evento, 'p:' + player_id), capacidade, taxa, agora) if player_id else None
+        if balde_sid[0] < 1 or (balde_jogador is not None and balde_jogador[0] < 1):
+            self._descartados[evento] += 1
+            return False
+        balde_sid[0] -= 1
+        if balde_jogador is not None:
+            balde_jogador[0] -= 1
+        self._permitidos[evento] += 1
+        return True
+
+    def _balde(self, chave, capacidade, taxa, agora):
+        balde = self._baldes.get(chave)
+        if balde is None:
+            if len(self._baldes) >= self._proxima_poda:
+                self._podar(agora)
+            balde = self._baldes[chave] = [capacidade, agora]
+        elif balde[0] < capacidade:
+            balde[0] = min(capacidade, balde[0] + (agora - balde[1]) * taxa)
+        balde[1] = agora
+        return balde
+
+    def _podar(self, agora):
+        """Remove baldes que já estariam cheios de novo"""
+        for chave, (fichas, instante) in list(self._baldes.items()):
+            capacidade, taxa = self.limites[chave[0]]
+            if fichas + (agora - instante) * taxa >= capacidade:
+                del self._baldes[chave]
+        self._proxima_poda = max(self.LIMITE_PODA, 2 * len(self._baldes))
+
+    def estatisticas(self):
+        return {
+            'permitidos': dict(self._permitidos),
+            'descartados': dict(self._descartados),
+            'baldes_ativos': len(self._baldes),
+            'conexoes_associadas': len(self._jogador_do_sid),
+            'limites': {evento: {'capacidade': c, 'por_segundo': t} for evento, (c, t) in self.limites.items()},
+        }
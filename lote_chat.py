@@ -0,0 +1,81 @@
+"""
+Entrega do chat em lotes: as mensagens de cada sala saem juntas num só pacote
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LoteChat:
+    """Acumula as mensagens de chat por sala e as envia num único ``nova_mensagem_chat``.
+
+    O lote de uma sala sai quando junta ``tamanho_maximo`` mensagens ou quando
+    termina o ``intervalo`` aberto pela primeira mensagem pendente (uma tarefa
+    em segundo plano por rajada, como nas reações). O pacote é
+    ``{'mensagens': [...], 'ts': ...}``; cada mensagem leva também ``ts``, o
+    relógio monotônico do servidor em ms no momento em que foi recebida, para
+    o cliente ordenar e espaçar sem depender do relógio de parede.
+    """
+
+    EVENTO = 'nova_mensagem_chat'
+
+    def __init__(self, socketio, intervalo=0.1, tamanho_maximo=20):
+        self.socketio = socketio
+        self.intervalo = max(0.01, intervalo)
+        self.tamanho_maximo = max(1, tamanho_maximo)
+        self._pendentes = {}  # sala -> [mensagens]
+        self._agendado = False
+        self._contadores = {
+            'mensagens': 0,
+            'pacotes': 0,
+            'por_tamanho': 0,
+            'erros': 0,
+        }
+
+    def adicionar(self, sala, registro):
+        """Enfileira a mensagem (já com seq) para o próximo lote da sala"""
+        self._contadores['mensagens'] += 1
+        mensagem = dict(registro, ts=int(time.monotonic() * 1000))
+        pendentes = self._pendentes.setdefault(sala, [])
+        pendentes.append(mensagem)
+        if len(pendentes) >= self.tamanho_maximo:
+            self._contadores['por_tamanho'] += 1
+            self._enviar(sala, self._pendentes.pop(sala))
+        elif not self._agendado:
+            self._agendado = True
+            self.socketio.start_background_task(self._aguardar_e_descarregar)
+
+    def _aguardar_e_descarregar(self):
+        self.socketio.sleep(self.intervalo)
+        self._agendado = False
+        try:
+            self.descarregar()
+        except Exception as e:
+            self._contadores['erros'] += 1
+            logger.error(f'Erro ao enviar lote de chat: {e}', exc_info=True)
+
+    def descarregar(self):
+        """Envia todos os lotes pendentes. Retorna quantos pacotes foram enviados"""
+        pendentes, self._pendentes = self._pendentes, {}
+        for sala, mensagens in pendentes.items():
+            self._enviar(sala, mensagens)
+        return len(pendentes)
+
+    def _enviar(self, sala, mensagens):
+        self._contadores['pacotes'] += 1
+        self.socketio.emit(self.EVENTO, {
+            'mensagens': mensagens,
+            'ts': int(time.monotonic() * 1000),
+        }, room=sala)
+
+    def descartar_sala(self, sala):
+        """Esquece o lote pendente de uma sala removida"""
+        self._pendentes.pop(sala, None)
+
+    def estatisticas(self):
+        dados = dict(self._contadores)
+        dados['intervalo_ms'] = round(self.intervalo * 1000)
+        dados['tamanho_maximo'] = self.tamanho_maximo
+        dados['salas_pendentes'] = len(self._pendentes)
+        return dados
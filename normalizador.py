@@ -1,367 +1,598 @@
+import logging
+import os
 import unicodedata
-import re
+from functools import lru_cache
+from types import MappingProxyType
 
-class NormalizadorTexto:
-    def __init__(self):
-        # Dicionário de correções comuns do português brasileiro
-        self.correcoes = {
-            # Palavras com til
-            'nao': 'não',
-            'mae': 'mãe',
-            'pao': 'pão',
-            'irmao': 'irmão',
-            'limao': 'limão',
-            'coracoes': 'corações',
-            'acoes': 'ações',
-            'opcoes': 'opções',
-            'informacoes': 'informações',
-            'situacoes': 'situações',
-            'tradicoes': 'tradições',
-            'emocoes': 'emoções',
-            'revolucoes': 'revoluções',
-            'solucoes': 'soluções',
-            'questoes': 'questões',
-            'decisoes': 'decisões',
-            'impressoes': 'impressões',
-            'dimensoes': 'dimensões',
-            'extensoes': 'extensões',
-            'tensoes': 'tensões',
-            'pensoes': 'pensões',
-            'mansoes': 'mansões',
-            'versoes': 'versões',
-            'diversoes': 'diversões',
-            'ilusoes': 'ilusões',
-            'conclusoes': 'conclusões',
-            'exclusoes': 'exclusões',
-            'inclusoes': 'inclusões',
-            'explosoes': 'explosões',
-            'erosoes': 'erosões',
-            'corrosoes': 'corrosões',
-            'fusoes': 'fusões',
-            'confusoes': 'confusões',
-            'difusoes': 'difusões',
-            'transfusoes': 'transfusões',
-            'intrusoes': 'intrusões',
-            'extrusoes': 'extrusões',
-            'oclusoes': 'oclusões',
-            'reclusoes': 'reclusões',
-            'seclusoes': 'seclusões',
-            'alusoes': 'alusões',
-            'ilusoes': 'ilusões',
-            'delusoes': 'delusões',
-            'colisoes': 'colisões',
-            'precisoes': 'precisões',
-            'decisoes': 'decisões',
-            'incisoes': 'incisões',
-            'divisoes': 'divisões',
-            'revisoes': 'revisões',
-            'previsoes': 'previsões',
-            'provisoes': 'provisões',
-            'televisoes': 'televisões',
-            'supervisoes': 'supervisões',
-            'visoes': 'visões',
-            'ocasioes': 'ocasiões',
-            'persuasoes': 'persuasões',
-            'invasoes': 'invasões',
-            'evasoes': 'evasões',
-            
-            # Palavras com acento agudo
-            'voce': 'você',
-            'cafe': 'café',
-            'pe': 'pé',
-            'fe': 'fé',
-            'cha': 'chá',
-            'la': 'lá',
-            'ca': 'cá',
-            'ja': 'já',
-            'so': 'só',
-            'nos': 'nós',
-            'pos': 'pós',
-            'apos': 'após',
-            'atraves': 'através',
-            'alem': 'além',
-            'porem': 'porém',
-            'tambem': 'também',
-            'ninguem': 'ninguém',
-            'alguem': 'alguém',
-            'parabens': 'parabéns',
-            'refens': 'reféns',
-            'armazens': 'armazéns',
-            'homens': 'homens',  # já correto
-            'jovens': 'jovens',  # já correto
-            'viagens': 'viagens',  # já correto
-            'imagens': 'imagens',  # já correto
-            'mensagens': 'mensagens',  # já correto
-            'vantagens': 'vantagens',  # já correto
-            'desvantagens': 'desvantagens',  # já correto
-            'bagagens': 'bagagens',  # já correto
-            'garagens': 'garagens',  # já correto
-            'miragens': 'miragens',  # já correto
-            'coragens': 'coragens',  # já correto
-            'selvagens': 'selvagens',  # já correto
-            
-            # Palavras com cedilha
-            'acao': 'ação',
-            'coracao': 'coração',
-            'opcao': 'opção',
-            'informacao': 'informação',
-            'educacao': 'educação',
-            'situacao': 'situação',
-            'tradicao': 'tradição',
-            'emocao': 'emoção',
-            'devocao': 'devoção',
-            'revolucao': 'revolução',
-            'solucao': 'solução',
-            'questao': 'questão',
-            'decisao': 'decisão',
-            'impressao': 'impressão',
-            'dimensao': 'dimensão',
-            'extensao': 'extensão',
-            'tensao': 'tensão',
-            'pensao': 'pensão',
-            'mansao': 'mansão',
-            'versao': 'versão',
-            'diversao': 'diversão',
-            'ilusao': 'ilusão',
-            'conclusao': 'conclusão',
-            'exclusao': 'exclusão',
-            'inclusao': 'inclusão',
-            'explosao': 'explosão',
-            'erosao': 'erosão',
-            'corrosao': 'corrosão',
-            'fusao': 'fusão',
-            'confusao': 'confusão',
-            'difusao': 'difusão',
-            'transfusao': 'transfusão',
-            'intrusao': 'intrusão',
-            'extrusao': 'extrusão',
-            'oclusao': 'oclusão',
-            'reclusao': 'reclusão',
-            'seclusao': 'seclusão',
-            'alusao': 'alusão',
-            'delusao': 'delusão',
-            'colisao': 'colisão',
-            'precisao': 'precisão',
-            'incisao': 'incisão',
-            'divisao': 'divisão',
-            'revisao': 'revisão',
-            'previsao': 'previsão',
-            'provisao': 'provisão',
-            'televisao': 'televisão',
-            'supervisao': 'supervisão',
-            'visao': 'visão',
-            'ocasiao': 'ocasião',
-            'persuasao': 'persuasão',
-            'invasao': 'invasão',
-            'evasao': 'evasão',
-            
-            # Palavras com acento circunflexo
-            'voce': 'você',
-            'tres': 'três',
-            'mes': 'mês',
-            'pes': 'pés',
-            'meses': 'meses',  # já correto
-            'paises': 'países',
-            'ingles': 'inglês',
-            'portugues': 'português',
-            'frances': 'francês',
-            'japones': 'japonês',
-            'chines': 'chinês',
-            'alemao': 'alemão',
-            'interesse': 'interesse',  # já correto
-            'interesses': 'interesses',  # já correto
-            
-            # Palavras comuns com acentos diversos
-            'agua': 'água',
-            'aguia': 'águia',
-            'area': 'área',
-            'ideia': 'ideia',  # já correto (nova ortografia)
-            'ideias': 'ideias',  # já correto (nova ortografia)
-            'heroi': 'herói',
-            'heroina': 'heroína',
-            'historia': 'história',
-            'historias': 'histórias',
-            'memoria': 'memória',
-            'memorias': 'memórias',
-            'vitoria': 'vitória',
-            'vitorias': 'vitórias',
-            'gloria': 'glória',
-            'glorias': 'glórias',
-            'categoria': 'categoria',  # já correto
-            'categorias': 'categorias',  # já correto
-            'secretaria': 'secretaria',  # já correto
-            'secretarias': 'secretarias',  # já correto
-            'primaria': 'primária',
-            'primarias': 'primárias',
-            'secundaria': 'secundária',
-            'secundarias': 'secundárias',
-            'universitaria': 'universitária',
-            'universitarias': 'universitárias',
-            'necessaria': 'necessária',
-            'necessarias': 'necessárias',
-            'voluntaria': 'voluntária',
-            'voluntarias': 'voluntárias',
-            'solitaria': 'solitária',
-            'solitarias': 'solitárias',
-            'imaginaria': 'imaginária',
-            'imaginarias': 'imaginárias',
-            'ordinaria': 'ordinária',
-            'ordinarias': 'ordinárias',
-            'extraordinaria': 'extraordinária',
-            'extraordinarias': 'extraordinárias',
-            
-            # Palavras com trema (antiga ortografia, mas ainda usadas)
-            'linguica': 'linguiça',
-            'cinquenta': 'cinquenta',  # já correto
-            'frequente': 'frequente',  # já correto (nova ortografia)
-            'frequencia': 'frequência',
-            'consequencia': 'consequência',
-            'sequencia': 'sequência',
-            'eloquencia': 'eloquência',
-            'delinquencia': 'delinquência',
-            'tranquilo': 'tranquilo',  # já correto (nova ortografia)
-            'tranquilidade': 'tranquilidade',  # já correto (nova ortografia)
-            
-            # Contrações e palavras compostas comuns
-            'dele': 'dele',  # já correto
-            'dela': 'dela',  # já correto
-            'deles': 'deles',  # já correto
-            'delas': 'delas',  # já correto
-            'nele': 'nele',  # já correto
-            'nela': 'nela',  # já correto
-            'neles': 'neles',  # já correto
-            'nelas': 'nelas',  # já correto
-            'pelo': 'pelo',  # já correto
-            'pela': 'pela',  # já correto
-            'pelos': 'pelos',  # já correto
-            'pelas': 'pelas',  # já correto
-            
-            # Verbos conjugados comuns
-            'esta': 'está',
-            'estao': 'estão',
-            'sao': 'são',
-            'tem': 'tem',  # já correto (singular)
-            'teem': 'têm',  # plural (antiga ortografia)
-            'tem': 'têm',   # plural (nova ortografia)
-            'vem': 'vem',   # já correto (singular)
-            'veem': 'vêm',  # plural (antiga ortografia)
-            'vem': 'vêm',   # plural (nova ortografia)
-            'da': 'dá',     # verbo dar
-            'das': 'das',   # já correto (artigo/preposição)
-            'de': 'dê',     # verbo dar (imperativo)
-            'le': 'lê',     # verbo ler
-            'leem': 'leem', # já correto (nova ortografia)
-            've': 'vê',     # verbo ver
-            'veem': 'veem', # já correto (nova ortografia)
-            'creem': 'creem', # já correto (nova ortografia)
-            'deem': 'deem',   # já correto (nova ortografia)
-            'leem': 'leem',   # já correto (nova ortografia)
-            'veem': 'veem',   # já correto (nova ortografia)
-            'descreem': 'descreem', # já correto (nova ortografia)
-            'releem': 'releem',     # já correto (nova ortografia)
-            'preveem': 'preveem',   # já correto (nova ortografia)
-            'proveem': 'proveem',   # já correto (nova ortografia)
-            'reveem': 'reveem',     # já correto (nova ortografia)
-        }
-        
-        # Padrões regex para identificar tipos de palavras
-        self.padroes = {
-            'acao_cao': re.compile(r'(.+)cao$'),  # palavras terminadas em -ção
-            'plural_oes': re.compile(r'(.+)oes$'),  # plurais terminados em -ões
-            'til_ao': re.compile(r'(.+)ao$'),  # palavras terminadas em -ão
-        }
+from lexico import LexicoCompacto
+from proximidade import IndiceProximidade, distancia_limitada
+
+logger = logging.getLogger(__name__)
+
+# Tabelas compartilhadas por todo o processo (somente leitura)
+# Dicionário de correções comuns do português brasileiro
+CORRECOES = MappingProxyType({
+    # Palavras com til
+    'nao': 'não',
+    'mae': 'mãe',
+    'pao': 'pão',
+    'irmao': 'irmão',
+    'limao': 'limão',
+    'coracoes': 'corações',
+    'acoes': 'ações',
+    'opcoes': 'opções',
+    'informacoes': 'informações',
+    'situacoes': 'situações',
+    'tradicoes': 'tradições',
+    'emocoes': 'emoções',
+    'revolucoes': 'revoluções',
+    'solucoes': 'soluções',
+    'questoes': 'questões',
+    'decisoes': 'decisões',
+    'impressoes': 'impressões',
+    'dimensoes': 'dimensões',
+    'extensoes': 'extensões',
+    'tensoes': 'tensões',
+    'pensoes': 'pensões',
+    'mansoes': 'mansões',
+    'versoes': 'versões',
+    'diversoes': 'diversões',
+    'ilusoes': 'ilusões',
+    'conclusoes': 'conclusões',
+    'exclusoes': 'exclusões',
+    'inclusoes': 'inclusões',
+    'explosoes': 'explosões',
+    'erosoes': 'erosões',
+    'corrosoes': 'corrosões',
+    'fusoes': 'fusões',
+    'confusoes': 'confusões',
+    'difusoes': 'difusões',
+    'transfusoes': 'transfusões',
+    'intrusoes': 'intrusões',
+    'extrusoes': 'extrusões',
+    'oclusoes': 'oclusões',
+    'reclusoes': 'reclusões',
+    'seclusoes': 'seclusões',
+    'alusoes': 'alusões',
+    'ilusoes': 'ilusões',
+    'delusoes': 'delusões',
+    'colisoes': 'colisões',
+    'precisoes': 'precisões',
+    'decisoes': 'decisões',
+    'incisoes': 'incisões',
+    'divisoes': 'divisões',
+    'revisoes': 'revisões',
+    'previsoes': 'previsões',
+    'provisoes': 'provisões',
+    'televisoes': 'televisões',
+    'supervisoes': 'supervisões',
+    'visoes': 'visões',
+    'ocasioes': 'ocasiões',
+    'persuasoes': 'persuasões',
+    'invasoes': 'invasões',
+    'evasoes': 'evasões',
     
-    def normalizar(self, texto):
-        """Normaliza texto aplicando correções automáticas"""
-        if not texto:
-            return texto
-            
-        texto_original = texto
-        texto = texto.lower().strip()
-        
-        # 1. Aplicar correções específicas do dicionário
-        if texto in self.correcoes:
-            return self.correcoes[texto]
-        
-        # 2. Aplicar padrões regex para correções automáticas
-        texto_corrigido = self._aplicar_padroes(texto)
-        if texto_corrigido != texto:
-            return texto_corrigido
-        
-        # 3. Se não houver correção, retornar texto original (mantendo capitalização)
-        return texto_original.strip()
+    # Palavras com acento agudo
+    'voce': 'você',
+    'cafe': 'café',
+    'pe': 'pé',
+    'fe': 'fé',
+    'cha': 'chá',
+    'la': 'lá',
+    'ca': 'cá',
+    'ja': 'já',
+    'so': 'só',
+    'nos': 'nós',
+    'pos': 'pós',
+    'apos': 'após',
+    'atraves': 'através',
+    'alem': 'além',
+    'porem': 'porém',
+    'tambem': 'também',
+    'ninguem': 'ninguém',
+    'alguem': 'alguém',
+    'parabens': 'parabéns',
+    'refens': 'reféns',
+    'armazens': 'armazéns',
+    'homens': 'homens',  # já correto
+    'jovens': 'jovens',  # já correto
+    'viagens': 'viagens',  # já correto
+    'imagens': 'imagens',  # já correto
+    'mensagens': 'mensagens',  # já correto
+    'vantagens': 'vantagens',  # já correto
+    'desvantagens': 'desvantagens',  # já correto
+    'bagagens': 'bagagens',  # já correto
+    'garagens': 'garagens',  # já correto
+    'miragens': 'miragens',  # já correto
+    'coragens': 'coragens',  # já correto
+    'selvagens': 'selvagens',  # já correto
     
-    def _aplicar_padroes(self, texto):
-        """Aplica padrões regex para correções automáticas"""
-        # Padrão: palavras terminadas em 'cao' -> 'ção'
-        if self.padroes['acao_cao'].match(texto) and not texto.endswith('ção'):
-            if texto.endswith('cao'):
-                return texto[:-3] + 'ção'
-        
-        # Padrão: palavras terminadas em 'oes' -> 'ões' 
-        if self.padroes['plural_oes'].match(texto) and not texto.endswith('ões'):
-            if texto.endswith('oes'):
-                return texto[:-3] + 'ões'
-        
-        # Padrão: palavras terminadas em 'ao' -> 'ão'
-        if self.padroes['til_ao'].match(texto) and not texto.endswith('ão'):
-            if texto.endswith('ao') and len(texto) > 2:
-                # Verificar se não é uma palavra que já termina corretamente em 'ao'
-                palavras_ao_corretas = ['mao', 'cao', 'sao', 'joao', 'sebastiao']
-                if texto not in palavras_ao_corretas:
-                    return texto[:-2] + 'ão'
-        
+    # Palavras com cedilha
+    'acao': 'ação',
+    'coracao': 'coração',
+    'opcao': 'opção',
+    'informacao': 'informação',
+    'educacao': 'educação',
+    'situacao': 'situação',
+    'tradicao': 'tradição',
+    'emocao': 'emoção',
+    'devocao': 'devoção',
+    'revolucao': 'revolução',
+    'solucao': 'solução',
+    'questao': 'questão',
+    'decisao': 'decisão',
+    'impressao': 'impressão',
+    'dimensao': 'dimensão',
+    'extensao': 'extensão',
+    'tensao': 'tensão',
+    'pensao': 'pensão',
+    'mansao': 'mansão',
+    'versao': 'versão',
+    'diversao': 'diversão',
+    'ilusao': 'ilusão',
+    'conclusao': 'conclusão',
+    'exclusao': 'exclusão',
+    'inclusao': 'inclusão',
+    'explosao': 'explosão',
+    'erosao': 'erosão',
+    'corrosao': 'corrosão',
+    'fusao': 'fusão',
+    'confusao': 'confusão',
+    'difusao': 'difusão',
+    'transfusao': 'transfusão',
+    'intrusao': 'intrusão',
+    'extrusao': 'extrusão',
+    'oclusao': 'oclusão',
+    'reclusao': 'reclusão',
+    'seclusao': 'seclusão',
+    'alusao': 'alusão',
+    'delusao': 'delusão',
+    'colisao': 'colisão',
+    'precisao': 'precisão',
+    'incisao': 'incisão',
+    'divisao': 'divisão',
+    'revisao': 'revisão',
+    'previsao': 'previsão',
+    'provisao': 'provisão',
+    'televisao': 'televisão',
+    'supervisao': 'supervisão',
+    'visao': 'visão',
+    'ocasiao': 'ocasião',
+    'persuasao': 'persuasão',
+    'invasao': 'invasão',
+    'evasao': 'evasão',
+    
+    # Palavras com acento circunflexo
+    'voce': 'você',
+    'tres': 'três',
+    'mes': 'mês',
+    'pes': 'pés',
+    'meses': 'meses',  # já correto
+    'paises': 'países',
+    'ingles': 'inglês',
+    'portugues': 'português',
+    'frances': 'francês',
+    'japones': 'japonês',
+    'chines': 'chinês',
+    'alemao': 'alemão',
+    'interesse': 'interesse',  # já correto
+    'interesses': 'interesses',  # já correto
+    
+    # Palavras comuns com acentos diversos
+    'agua': 'água',
+    'aguia': 'águia',
+    'area': 'área',
+    'ideia': 'ideia',  # já correto (nova ortografia)
+    'ideias': 'ideias',  # já correto (nova ortografia)
+    'heroi': 'herói',
+    'heroina': 'heroína',
+    'historia': 'história',
+    'historias': 'histórias',
+    'memoria': 'memória',
+    'memorias': 'memórias',
+    'vitoria': 'vitória',
+    'vitorias': 'vitórias',
+    'gloria': 'glória',
+    'glorias': 'glórias',
+    'categoria': 'categoria',  # já correto
+    'categorias': 'categorias',  # já correto
+    'secretaria': 'secretaria',  # já correto
+    'secretarias': 'secretarias',  # já correto
+    'primaria': 'primária',
+    'primarias': 'primárias',
+    'secundaria': 'secundária',
+    'secundarias': 'secundárias',
+    'universitaria': 'universitária',
+    'universitarias': 'universitárias',
+    'necessaria': 'necessária',
+    'necessarias': 'necessárias',
+    'voluntaria': 'voluntária',
+    'voluntarias': 'voluntárias',
+    'solitaria': 'solitária',
+    'solitarias': 'solitárias',
+    'imaginaria': 'imaginária',
+    'imaginarias': 'imaginárias',
+    'ordinaria': 'ordinária',
+    'ordinarias': 'ordinárias',
+    'extraordinaria': 'extraordinária',
+    'extraordinarias': 'extraordinárias',
+    
+    # Palavras com trema (antiga ortografia, mas ainda usadas)
+    'linguica': 'linguiça',
+    'cinquenta': 'cinquenta',  # já correto
+    'frequente': 'frequente',  # já correto (nova ortografia)
+    'frequencia': 'frequência',
+    'consequencia': 'consequência',
+    'sequencia': 'sequência',
+    'eloquencia': 'eloquência',
+    'delinquencia': 'delinquência',
+    'tranquilo': 'tranquilo',  # já correto (nova ortografia)
+    'tranquilidade': 'tranquilidade',  # já correto (nova ortografia)
+    
+    # Contrações e palavras compostas comuns
+    'dele': 'dele',  # já correto
+    'dela': 'dela',  # já correto
+    'deles': 'deles',  # já correto
+    'delas': 'delas',  # já correto
+    'nele': 'nele',  # já correto
+    'nela': 'nela',  # já correto
+    'neles': 'neles',  # já correto
+    'nelas': 'nelas',  # já correto
+    'pelo': 'pelo',  # já correto
+    'pela': 'pela',  # já correto
+    'pelos': 'pelos',  # já correto
+    'pelas': 'pelas',  # já correto
+    
+    # Verbos conjugados comuns
+    'esta': 'está',
+    'estao': 'estão',
+    'sao': 'são',
+    'tem': 'tem',  # já correto (singular)
+    'teem': 'têm',  # plural (antiga ortografia)
+    'tem': 'têm',   # plural (nova ortografia)
+    'vem': 'vem',   # já correto (singular)
+    'veem': 'vêm',  # plural (antiga ortografia)
+    'vem': 'vêm',   # plural (nova ortografia)
+    'da': 'dá',     # verbo dar
+    'das': 'das',   # já correto (artigo/preposição)
+    'de': 'dê',     # verbo dar (imperativo)
+    'le': 'lê',     # verbo ler
+    'leem': 'leem', # já correto (nova ortografia)
+    've': 'vê',     # verbo ver
+    'veem': 'veem', # já correto (nova ortografia)
+    'creem': 'creem', # já correto (nova ortografia)
+    'deem': 'deem',   # já correto (nova ortografia)
+    'leem': 'leem',   # já correto (nova ortografia)
+    'veem': 'veem',   # já correto (nova ortografia)
+    'descreem': 'descreem', # já correto (nova ortografia)
+    'releem': 'releem',     # já correto (nova ortografia)
+    'preveem': 'preveem',   # já correto (nova ortografia)
+    'proveem': 'proveem',   # já correto (nova ortografia)
+    'reveem': 'reveem',     # já correto (nova ortografia)
+})
+
+# Regras de sufixo: (sufixo, substituição, tamanho mínimo da palavra)
+REGRAS_SUFIXO = (
+    ('cao', 'ção', 4),  # palavras terminadas em -ção
+    ('oes', 'ões', 4),  # plurais terminados em -ões
+    ('ao', 'ão', 3),  # palavras terminadas em -ão
+)
+
+# Palavras que já terminam corretamente em 'ao'
+PALAVRAS_AO_CORRETAS = frozenset(['mao', 'cao', 'sao', 'joao', 'sebastiao'])
+
+
+def _compilar(correcoes, regras, excecoes):
+    """Junta dicionário, exceções e regras de sufixo nas tabelas do motor de normalização.
+
+    ``exatas``: palavra -> correção, ou None para palavra que não deve ser corrigida.
+    ``trie``: árvore dos sufixos lidos de trás para frente; o nó onde um sufixo
+    termina guarda em '' a regra (substituição, tamanho mínimo da palavra).
+    """
+    exatas = {palavra: None for palavra in excecoes}
+    exatas.update(correcoes)
+    trie = {}
+    for sufixo, substituicao, minimo in regras:
+        no = trie
+        for letra in reversed(sufixo):
+            no = no.setdefault(letra, {})
+        no[''] = (substituicao, minimo)
+    return exatas, trie
+
+
+_EXATAS, _TRIE_SUFIXOS = _compilar(CORRECOES, REGRAS_SUFIXO, PALAVRAS_AO_CORRETAS)
+_SUFIXOS = tuple(sufixo for sufixo, _, _ in REGRAS_SUFIXO)  # filtro em C (str.endswith) antes da trie
+_MAIOR_SUFIXO = max(len(sufixo) for sufixo in _SUFIXOS)
+_SEM_REGRA = object()
+
+# Final da palavra (últimos _MAIOR_SUFIXO caracteres) -> regras que casam, da mais longa
+# para a mais curta: ((tamanho do sufixo, substituição, tamanho mínimo), ...).
+# Preenchida sob demanda a partir da trie; a maioria dos finais leva a ().
+_REGRAS_POR_FINAL = {}
+_LIMITE_FINAIS = 4096
+
+
+def _regras_do_final(final):
+    """Percorre a trie com o final da palavra, de trás para frente"""
+    regras = _REGRAS_POR_FINAL.get(final)
+    if regras is not None:
+        return regras
+    encontradas = []
+    no = _TRIE_SUFIXOS
+    for tamanho, letra in enumerate(reversed(final), 1):
+        no = no.get(letra)
+        if no is None:
+            break
+        if '' in no:
+            substituicao, minimo = no['']
+            encontradas.append((tamanho, substituicao, minimo))
+    regras = tuple(reversed(encontradas))
+    if len(_REGRAS_POR_FINAL) < _LIMITE_FINAIS:
+        _REGRAS_POR_FINAL[final] = regras
+    return regras
+
+
+def _corrigir(chave):
+    """Correção da palavra já em minúsculas, ou None se não houver"""
+    correcao = _EXATAS.get(chave, _SEM_REGRA)
+    if correcao is not _SEM_REGRA:
+        return correcao
+    return _corrigir_sufixo(chave)
+
+
+def _corrigir_sufixo(chave):
+    """Aplica a regra do sufixo mais longo que casar, ou retorna None"""
+    if not chave.endswith(_SUFIXOS):
+        return None
+    regras = _REGRAS_POR_FINAL.get(chave[-_MAIOR_SUFIXO:])
+    if regras is None:
+        regras = _regras_do_final(chave[-_MAIOR_SUFIXO:])
+    for tamanho, substituicao, minimo in regras:
+        if len(chave) >= minimo and '\n' not in chave:  # regras de sufixo valem só para uma linha
+            return chave[:-tamanho] + substituicao
+    return None
+
+
+def _normalizar(texto):
+    """Normaliza texto aplicando correções automáticas"""
+    if not texto:
         return texto
+
+    # Dicionário e regras de sufixo; sem correção, mantém o texto original (com capitalização)
+    correcao = _corrigir(texto.lower().strip())
+    if correcao is not None:
+        return correcao
+    return texto.strip()
+
+
+def _comparar_palavras(palavra1, palavra2):
+    """Compara duas palavras considerando variações de acentos"""
+    if not palavra1 or not palavra2:
+        return False
+
+    # Normalizar ambas as palavras
+    norm1 = _ativas['normalizar'](palavra1)
+    norm2 = _ativas['normalizar'](palavra2)
+
+    # Comparar versões normalizadas
+    if norm1.lower() == norm2.lower():
+        return True
+
+    # Comparar também versões sem acentos
+    sem_acentos1 = _ativas['remover_acentos'](norm1.lower())
+    sem_acentos2 = _ativas['remover_acentos'](norm2.lower())
+
+    return sem_acentos1 == sem_acentos2
+
+
+def _remover_acentos_nfd(texto):
+    """Remove acentos decompondo em NFD e descartando as marcas diacríticas (Mn)"""
+    texto_nfd = unicodedata.normalize('NFD', texto)
+    return ''.join(char for char in texto_nfd if unicodedata.category(char) != 'Mn')
+
+
+# Tabela de str.translate para Latin-1 e Latin Extended-A (U+0000 a U+017F), gerada a partir
+# do caminho NFD caractere a caractere: dentro da faixa, o resultado é idêntico a ele.
+# Indexada pelo código (tupla completa: sem buscas que falham); caracteres além dela
+# ficam como estão no translate e são tratados pelo caminho NFD.
+ULTIMO_CARACTERE_TABELA = '\u017f'
+TABELA_ACENTOS = tuple(_remover_acentos_nfd(chr(codigo)) for codigo in range(ord(ULTIMO_CARACTERE_TABELA) + 1))
+
+
+def _remover_acentos(texto):
+    """Remove acentos de um texto"""
+    if not texto or texto.isascii():
+        return texto
+    sem_acentos = texto.translate(TABELA_ACENTOS)
+    if sem_acentos.isascii() or max(texto) <= ULTIMO_CARACTERE_TABELA:
+        return sem_acentos
+    # Fora da tabela (ex.: marcas combinantes soltas, outros alfabetos)
+    return _remover_acentos_nfd(texto)
+
+
+# ===== Cache LRU =====
+# Os mesmos palpites e palavras-alvo passam várias vezes por estas funções em uma partida.
+# NORMALIZADOR_CACHE=0 desliga o cache (útil para benchmarks).
+TAMANHO_CACHE = int(os.environ.get('NORMALIZADOR_CACHE', 4096))
+
+_FUNCOES = {
+    'normalizar': _normalizar,
+    'remover_acentos': _remover_acentos,
+    'comparar_palavras': _comparar_palavras,
+}
+_ativas = dict(_FUNCOES)  # nome -> função chamada (com ou sem cache)
+_cacheadas = {}  # nome -> função envolvida por lru_cache (vazio com o cache desligado)
+
+
+def configurar_cache(tamanho):
+    """Recria os caches com ``tamanho`` entradas por função; 0 desliga"""
+    global TAMANHO_CACHE
+    TAMANHO_CACHE = max(0, int(tamanho))
+    _cacheadas.clear()
+    for nome, funcao in _FUNCOES.items():
+        if TAMANHO_CACHE:
+            _cacheadas[nome] = lru_cache(maxsize=TAMANHO_CACHE)(funcao)
+        _ativas[nome] = _cacheadas.get(nome, funcao)
+
+
+def estatisticas_cache():
+    """Acertos, faltas, ocupação e despejos de cada cache, para o health check"""
+    estatisticas = {'ligado': bool(_cacheadas), 'capacidade': TAMANHO_CACHE}
+    for nome, funcao in _cacheadas.items():
+        info = funcao.cache_info()
+        estatisticas[nome] = {
+            'acertos': info.hits,
+            'faltas': info.misses,
+            'entradas': info.currsize,
+            'despejos': info.misses - info.currsize,
+        }
+    return estatisticas
+
+
+configurar_cache(TAMANHO_CACHE)
+
+
+# ===== Palavras próximas =====
+# Léxico das grafias corretas, usado para validar palavras e sugerir grafias ao
+# defini-las: grafia sem acentos -> grafia correta. A busca é feita sem acentos:
+# 'historai' chega a 'historia' e daí a 'história'. Por padrão são as grafias do dicionário de correções; com
+# LEXICO_ARQUIVO, o léxico compacto gerado por ``python lexico.py compilar``.
+LEXICO = frozenset(CORRECOES.values())
+LEXICO_ARQUIVO = os.environ.get('LEXICO_ARQUIVO')
+
+
+def _lexico_embutido():
+    lexico = {}
+    for palavra in sorted(LEXICO):
+        lexico.setdefault(_remover_acentos(palavra), palavra)
+    return lexico
+
+
+def configurar_lexico(caminho=None):
+    """Usa o léxico compacto em ``caminho`` (ou o embutido, se None ou inválido)"""
+    global _lexico, _indice_lexico
+    lexico = None
+    if caminho:
+        try:
+            lexico = LexicoCompacto(caminho)
+            logger.info(f'Léxico carregado de {caminho}: {len(lexico)} palavras')
+        except (OSError, ValueError) as e:
+            logger.warning(f'Não foi possível abrir o léxico {caminho}: {e}; usando o embutido')
+    if lexico is None:
+        lexico = _lexico_embutido()
+    _lexico = lexico
+    _indice_lexico = IndiceProximidade(lexico, getattr(lexico, 'alfabeto', None))
+
+
+def lexico_completo():
+    """Se há um léxico de palavras carregado de arquivo (necessário para validar palavras)"""
+    return isinstance(_lexico, LexicoCompacto)
+
+
+configurar_lexico(LEXICO_ARQUIVO)
+
+
+def limite_quase(palavra):
+    """Distância máxima para um palpite contar como "quase": 1, ou 2 em palavras longas"""
+    return 1 if len(palavra) <= 6 else 2
+
+
+class NormalizadorTexto:
+    """Normalizador sem estado próprio: todas as instâncias usam as tabelas do módulo"""
+
+    __slots__ = ()
+    correcoes = CORRECOES
+
+    def normalizar(self, texto):
+        """Normaliza texto aplicando correções automáticas"""
+        return _ativas['normalizar'](texto)
+
+    def normalizar_lote(self, textos):
+        """Normaliza vários textos de uma vez (ex.: pré-processar um léxico); retorna uma lista"""
+        exatas = _EXATAS
+        sem_regra = _SEM_REGRA
+        corrigir_sufixo = _corrigir_sufixo
+        sufixos = _SUFIXOS
+        resultado = []
+        adicionar = resultado.append
+        for texto in textos:
+            if not texto:
+                adicionar(texto)
+                continue
+            chave = texto.lower().strip()
+            correcao = exatas.get(chave, sem_regra)
+            if correcao is sem_regra:
+                correcao = corrigir_sufixo(chave) if chave.endswith(sufixos) else None
+            adicionar(texto.strip() if correcao is None else correcao)
+        return resultado
     
     def comparar_palavras(self, palavra1, palavra2):
         """Compara duas palavras considerando variações de acentos"""
-        if not palavra1 or not palavra2:
-            return False
-            
-        # Normalizar ambas as palavras
-        norm1 = self.normalizar(palavra1)
-        norm2 = self.normalizar(palavra2)
-        
-        # Comparar versões normalizadas
-        if norm1.lower() == norm2.lower():
-            return True
-        
-        # Comparar também versões sem acentos
-        sem_acentos1 = self.remover_acentos(norm1.lower())
-        sem_acentos2 = self.remover_acentos(norm2.lower())
-        
-        return sem_acentos1 == sem_acentos2
-    
+        return _ativas['comparar_palavras'](palavra1, palavra2)
+
     def remover_acentos(self, texto):
         """Remove acentos de um texto"""
-        if not texto:
-            return texto
-            
-        # Normalizar para NFD (decompor caracteres acentuados)
-        texto_nfd = unicodedata.normalize('NFD', texto)
-        
-        # Remover marcas diacríticas (acentos)
-        texto_sem_acentos = ''.join(
-            char for char in texto_nfd 
-            if unicodedata.category(char) != 'Mn'
-        )
-        
-        return texto_sem_acentos
+        return _ativas['remover_acentos'](texto)
     
+    def remover_acentos_lote(self, textos):
+        """Remove acentos de vários textos de uma vez (sem cache); retorna uma lista"""
+        tabela = TABELA_ACENTOS
+        ultimo = ULTIMO_CARACTERE_TABELA
+        resultado = []
+        adicionar = resultado.append
+        for texto in textos:
+            if not texto or texto.isascii():
+                adicionar(texto)
+                continue
+            sem_acentos = texto.translate(tabela)
+            if sem_acentos.isascii() or max(texto) <= ultimo:
+                adicionar(sem_acentos)
+            else:
+                adicionar(_remover_acentos_nfd(texto))
+        return resultado
+
     def sugerir_correcao(self, palavra):
-        """Sugere uma correção para a palavra se disponível"""
+        """Sugere uma correção para a palavra se disponível.
+
+        Só o dicionário de correções e as regras de sufixo: roda a cada palpite
+        errado, e a busca de vizinhos no léxico custaria ~100 µs por palpite e
+        tenderia a sugerir a própria resposta.
+        """
         palavra_lower = palavra.lower().strip()
         
-        if palavra_lower in self.correcoes:
-            return self.correcoes[palavra_lower]
-        
-        # Tentar aplicar padrões
-        corrigida = self._aplicar_padroes(palavra_lower)
-        if corrigida != palavra_lower:
-            return corrigida
-        
-        return None
+        return _corrigir(palavra_lower)
+
+    def palavra_conhecida(self, palavra):
+        """Se a palavra (cada parte, se composta) está no léxico, sem considerar acentos"""
+        remover_acentos = _ativas['remover_acentos']
+        return all(remover_acentos(parte) in _lexico for parte in palavra.lower().split())
+
+    def sugerir_grafias(self, palavra, limite=3):
+        """Até ``limite`` grafias do léxico a um passo da palavra (trocando a parte desconhecida)"""
+        remover_acentos = _ativas['remover_acentos']
+        partes = palavra.lower().split()
+        sugestoes = []
+        for i, parte in enumerate(partes):
+            chave = remover_acentos(parte)
+            if chave in _lexico:
+                continue
+            for vizinho in _indice_lexico.vizinhos(chave):
+                sugestoes.append(' '.join(partes[:i] + [_lexico[vizinho]] + partes[i + 1:]))
+                if len(sugestoes) >= limite:
+                    return sugestoes
+        return sugestoes
+
+    def quase_acertou(self, palavra_tentada, palavra_correta):
+        """Se o palpite errado ficou a poucas letras da palavra (sem considerar acentos)"""
+        tentada = _ativas['remover_acentos'](palavra_tentada.lower())
+        correta = _ativas['remover_acentos'](palavra_correta.lower())
+        limite = limite_quase(correta)
+        return 0 < distancia_limitada(tentada, correta, limite) <= limite
     
     def foi_corrigida(self, palavra_original, palavra_normalizada):
         """Verifica se a palavra foi corrigida durante a normalização"""
         return palavra_original.lower().strip() != palavra_normalizada.lower().strip()
+
+
+# Instância única usada pelos jogadores
+normalizador_compartilhado = NormalizadorTexto()
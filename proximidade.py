@@ -0,0 +1,78 @@
+"""
+Proximidade entre palavras: distância de Damerau-Levenshtein limitada e busca de vizinhos num léxico
+
+A distância usada é a de alinhamento ótimo (inserção, remoção, troca de letra e
+transposição de letras vizinhas, cada uma custando 1).
+"""
+
+
+def distancia_limitada(a, b, limite):
+    """Distância de Damerau-Levenshtein entre ``a`` e ``b``, ou ``limite + 1`` se passar do limite.
+
+    Para assim que toda uma linha da matriz passa do limite; com limite pequeno
+    o custo fica perto de O(len(a) * (2 * limite + 1)).
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    if not a or not b:
+        return max(len(a), len(b))
+
+    acima = None  # linha i - 2 (para a transposição)
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        atual = [i] + [limite + 1] * len(b)
+        letra_a = a[i - 1]
+        # Só a faixa diagonal pode ficar dentro do limite
+        inicio = max(1, i - limite)
+        fim = min(len(b), i + limite)
+        menor = i if inicio == 1 else limite + 1
+        for j in range(inicio, fim + 1):
+            custo = 0 if letra_a == b[j - 1] else 1
+            valor = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + custo)
+            if (acima is not None and j > 1 and letra_a == b[j - 2] and a[i - 2] == b[j - 1]
+                    and acima[j - 2] + 1 < valor):
+                valor = acima[j - 2] + 1
+            atual[j] = valor
+            if valor < menor:
+                menor = valor
+        if menor > limite:
+            return limite + 1
+        acima, anterior = anterior, atual
+    return min(anterior[len(b)], limite + 1)
+
+
+def variacoes_a_um_passo(palavra, alfabeto):
+    """Todas as palavras a distância 1 de ``palavra`` com letras de ``alfabeto``"""
+    cortes = [(palavra[:i], palavra[i:]) for i in range(len(palavra) + 1)]
+    variacoes = {esq + dir[1:] for esq, dir in cortes if dir}
+    variacoes.update(esq + dir[1] + dir[0] + dir[2:] for esq, dir in cortes if len(dir) > 1)
+    variacoes.update(esq + letra + dir[1:] for esq, dir in cortes if dir for letra in alfabeto)
+    variacoes.update(esq + letra + dir for esq, dir in cortes for letra in alfabeto)
+    variacoes.discard(palavra)
+    return variacoes
+
+
+class IndiceProximidade:
+    """Vizinhos a distância 1 de uma palavra dentro de um léxico.
+
+    Em vez de percorrer o léxico (uma BK-tree em Python visita milhares de nós
+    por consulta com 300 mil palavras), gera as variações da consulta a um
+    passo (~60 por letra do alfabeto e da palavra) e testa cada uma no léxico.
+    Serve qualquer léxico com ``in``: um set ou o léxico compacto em disco.
+    """
+
+    def __init__(self, lexico, alfabeto=None):
+        self.lexico = lexico
+        if alfabeto is None:
+            alfabeto = ''.join(sorted({letra for palavra in lexico for letra in palavra}))
+        self.alfabeto = alfabeto
+
+    def __contains__(self, palavra):
+        return palavra in self.lexico
+
+    def vizinhos(self, palavra):
+        """Palavras do léxico a distância exatamente 1, em ordem alfabética"""
+        lexico = self.lexico
+        return sorted(v for v in variacoes_a_um_passo(palavra, self.alfabeto) if v in lexico)
@@ -0,0 +1,78 @@
+"""
+Reações (emojis) agregadas por sala em janelas curtas antes do envio
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AgregadorReacoes:
+    """Junta as reações de cada sala e envia um único quadro por janela.
+
+    A primeira reação de uma rajada agenda uma tarefa em segundo plano que
+    dorme ``janela`` segundos e envia, para cada sala com reações pendentes,
+    um evento ``emojis_recebidos`` com a contagem por remetente e emoji. Fora
+    das rajadas nenhuma tarefa fica acordando. Com ``janela`` 0 cada reação é
+    repassada na hora como ``emoji_recebido``.
+    """
+
+    EVENTO = 'emojis_recebidos'
+
+    def __init__(self, socketio, janela=0.1):
+        self.socketio = socketio
+        self.janela = max(0.0, janela)
+        self._pendentes = {}  # sala -> {(nome, emoji): quantidade}
+        self._agendado = False
+        self._contadores = {
+            'reacoes': 0,
+            'quadros': 0,
+            'erros': 0,
+        }
+
+    def adicionar(self, sala, nome, emoji):
+        """Registra uma reação; o envio fica para o fim da janela"""
+        self._contadores['reacoes'] += 1
+        if not self.janela:
+            self._contadores['quadros'] += 1
+            self.socketio.emit('emoji_recebido', {'nome': nome, 'emoji': emoji}, room=sala)
+            return
+        contagem = self._pendentes.setdefault(sala, {})
+        contagem[nome, emoji] = contagem.get((nome, emoji), 0) + 1
+        if not self._agendado:
+            self._agendado = True
+            self.socketio.start_background_task(self._aguardar_e_descarregar)
+
+    def _aguardar_e_descarregar(self):
+        self.socketio.sleep(self.janela)
+        self._agendado = False
+        try:
+            self.descarregar()
+        except Exception as e:
+            self._contadores['erros'] += 1
+            logger.error(f'Erro ao enviar reações agregadas: {e}', exc_info=True)
+
+    def descarregar(self):
+        """Envia o quadro de cada sala pendente. Retorna quantos quadros foram enviados"""
+        pendentes, self._pendentes = self._pendentes, {}
+        momento = time.time()
+        for sala, contagem in pendentes.items():
+            self.socketio.emit(self.EVENTO, {
+                'reacoes': [
+                    {'nome': nome, 'emoji': emoji, 'quantidade': quantidade}
+                    for (nome, emoji), quantidade in contagem.items()
+                ],
+                'timestamp': momento,
+            }, room=sala)
+        self._contadores['quadros'] += len(pendentes)
+        return len(pendentes)
+
+    def descartar_sala(self, sala):
+        """Esquece as reações pendentes de uma sala removida"""
+        self._pendentes.pop(sala, None)
+
+    def estatisticas(self):
+        dados = dict(self._contadores)
+        dados['janela_ms'] = round(self.janela * 1000)
+        dados['salas_pendentes'] = len(self._pendentes)
+        return dados
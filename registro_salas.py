@@ -0,0 +1,201 @@
+"""
+Registro de salas com índices reversos SID → sala/jogador e nome → SIDs
+"""
+from collections.abc import MutableMapping
+
+from armazenamento import ArmazenamentoMemoria
+from jogo import chave_nome
+
+
+class RegistroSalas(MutableMapping):
+    """Mapeamento código → sala que mantém índices de conexões atualizados.
+
+    Todo vínculo de socket com uma sala (``sala['players']``) deve passar por
+    ``conectar``/``desconectar`` para que os índices continuem consistentes.
+
+    O estado é gravado no ``armazenamento``. Com o backend em memória (padrão)
+    o registro guarda os próprios objetos e ``salvar`` só incrementa a versão.
+    Com um backend compartilhado, o registro funciona como cache local: cada
+    leitura confere a versão remota e recarrega a sala se outro processo a
+    alterou; ``salvar`` grava com controle otimista de versão.
+
+    ``escopo`` (opcional) retorna o conjunto de códigos já conferidos no evento
+    atual, ou None fora de um evento: dentro dele cada sala é conferida no
+    armazenamento uma única vez, por mais que seja acessada.
+    """
+
+    def __init__(self, armazenamento=None, escopo=None):
+        self.armazenamento = armazenamento or ArmazenamentoMemoria()
+        self._compartilhado = self.armazenamento.compartilhado
+        self._escopo = escopo
+        self._salas = {}
+        self._versoes = {}  # codigo -> versão da cópia local
+        # sid -> {codigo: nome}
+        self._por_sid = {}
+        # (codigo, chave_nome(nome)) -> {sid, ...}, mesma chave da partida
+        self._por_nome = {}
+
+    # ===== Interface de dicionário =====
+    def __getitem__(self, codigo):
+        if self._compartilhado:
+            self._sincronizar(codigo)
+        return self._salas[codigo]
+
+    def __setitem__(self, codigo, sala):
+        self._substituir_local(codigo, sala, self._versoes.get(codigo))
+        self.salvar(codigo)
+
+    def __delitem__(self, codigo):
+        if codigo not in self._salas and not (self._compartilhado and self.armazenamento.existe(codigo)):
+            raise KeyError(codigo)
+        self._descartar_local(codigo)
+        self.armazenamento.remover(codigo)
+
+    def __iter__(self):
+        if self._compartilhado:
+            return iter(self.armazenamento.codigos())
+        return iter(self._salas)
+
+    def __len__(self):
+        if self._compartilhado:
+            return self.armazenamento.total()
+        return len(self._salas)
+
+    def __contains__(self, codigo):
+        if self._compartilhado:
+            self._sincronizar(codigo)
+        return codigo in self._salas
+
+    # ===== Persistência =====
+    def salvar(self, codigo):
+        """Grava a sala no armazenamento após uma alteração.
+
+        Levanta ``ConflitoVersao`` se outro processo gravou a sala antes; a
+        cópia local é descartada para ser recarregada no próximo acesso.
+        """
+        sala = self._salas.get(codigo)
+        if sala is None:
+            return
+        try:
+            self._versoes[codigo] = self.armazenamento.salvar(codigo, sala, self._versoes.get(codigo))
+        except Exception:
+            if self._compartilhado:
+                self._descartar_local(codigo)
+                conferidas = self._escopo() if self._escopo else None
+                if conferidas is not None:
+                    conferidas.discard(codigo)
+            raise
+
+    def _sincronizar(self, codigo):
+        """Confere a versão remota (uma vez por evento, se houver escopo)"""
+        conferidas = self._escopo() if self._escopo else None
+        if conferidas is None:
+            self._recarregar_se_mudou(codigo)
+        elif codigo not in conferidas:
+            self._recarregar_se_mudou(codigo)
+            conferidas.add(codigo)
+
+    def _recarregar_se_mudou(self, codigo):
+        """Recarrega a cópia local se a versão remota mudou"""
+        versao = self.armazenamento.versao(codigo)
+        if versao is None:
+            if codigo in self._salas:
+                self._descartar_local(codigo)
+            return
+        if versao == self._versoes.get(codigo) and codigo in self._salas:
+            return
+        carregada = self.armazenamento.carregar(codigo)
+        if carregada is None:
+            self._descartar_local(codigo)
+            return
+        sala, versao = carregada
+        self._substituir_local(codigo, sala, versao)
+
+    def _substituir_local(self, codigo, sala, versao):
+        if codigo in self._salas:
+            self._desindexar_sala(codigo)
+        self._salas[codigo] = sala
+        self._versoes[codigo] = versao
+        for sid, nome in sala.get('players', {}).items():
+            self._indexar(codigo, sid, nome)
+
+    def _descartar_local(self, codigo):
+        if codigo in self._salas:
+            self._desindexar_sala(codigo)
+            del self._salas[codigo]
+        self._versoes.pop(codigo, None)
+
+    # ===== Conexões =====
+    def conectar(self, codigo, sid, nome):
+        """Associa um SID a um jogador da sala"""
+        sala = self[codigo]
+        nome_anterior = sala['players'].get(sid)
+        if nome_anterior is not None:
+            self._desindexar(codigo, sid, nome_anterior)
+        sala['players'][sid] = nome
+        self._indexar(codigo, sid, nome)
+        self.salvar(codigo)
+
+    def desconectar(self, sid, codigo=None, salvar=True):
+        """Remove o SID da sala indicada (ou de todas). Retorna [(codigo, nome), ...]
+
+        Com ``salvar=False`` a gravação fica com quem chamou (ex.: para repetir
+        a alteração inteira em caso de conflito de versão).
+        """
+        salas_do_sid = self._por_sid.get(sid)
+        if not salas_do_sid:
+            return []
+        codigos = [codigo] if codigo is not None else list(salas_do_sid)
+        removidos = []
+        for cod in codigos:
+            nome = salas_do_sid.get(cod)
+            if nome is None or cod not in self:
+                continue
+            sala = self[cod]
+            nome = sala['players'].pop(sid, None)
+            if nome is None:
+                continue
+            self._desindexar(cod, sid, nome)
+            if salvar:
+                self.salvar(cod)
+            removidos.append((cod, nome))
+        return removidos
+
+    def salas_do_sid(self, sid):
+        """Retorna {codigo: nome} das salas em que o SID está conectado"""
+        return dict(self._por_sid.get(sid, {}))
+
+    def sids_do_nome(self, codigo, nome):
+        """Retorna os SIDs conectados de um jogador (nome sem distinção de maiúsculas)"""
+        return set(self._por_nome.get((codigo, chave_nome(nome)), ()))
+
+    def sid_do_nome(self, codigo, nome):
+        """Retorna um SID conectado do jogador, ou None"""
+        sids = self._por_nome.get((codigo, chave_nome(nome)))
+        return next(iter(sids)) if sids else None
+
+    def esta_conectado(self, codigo, nome):
+        """Indica se o jogador tem ao menos uma conexão ativa na sala"""
+        return bool(self._por_nome.get((codigo, chave_nome(nome))))
+
+    # ===== Manutenção dos índices =====
+    def _indexar(self, codigo, sid, nome):
+        self._por_sid.setdefault(sid, {})[codigo] = nome
+        self._por_nome.setdefault((codigo, chave_nome(nome)), set()).add(sid)
+
+    def _desindexar(self, codigo, sid, nome):
+        salas_do_sid = self._por_sid.get(sid)
+        if salas_do_sid is not None:
+            salas_do_sid.pop(codigo, None)
+            if not salas_do_sid:
+                del self._por_sid[sid]
+        chave = (codigo, chave_nome(nome))
+        sids = self._por_nome.get(chave)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self._por_nome[chave]
+
+    def _desindexar_sala(self, codigo):
+        for sid, nome in self._salas[codigo].get('players', {}).items():
+            self._desindexar(codigo, sid, nome)
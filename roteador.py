@@ -0,0 +1,124 @@
+"""
+Roteador de afinidade: encaminha cada conexão ao processo dono da sala
+
+Uso (um processo do app por shard, cada um em sua porta):
+
+    SHARD_ID=0 TOTAL_SHARDS=2 PORT=5001 python app.py
+    SHARD_ID=1 TOTAL_SHARDS=2 PORT=5002 python app.py
+    ROTEADOR_BACKENDS=127.0.0.1:5001,127.0.0.1:5002 PORT=5000 python roteador.py
+
+A posição do backend na lista é o SHARD_ID. O roteador lê apenas o cabeçalho
+HTTP de cada conexão: ``/sala/<codigo>`` e ``?sala=<codigo>`` (o cliente
+Socket.IO envia a sala na query) vão para o shard do código; o restante é
+distribuído por hash do IP do cliente, o que mantém o long-polling do
+Engine.IO no mesmo processo. Depois disso os bytes são repassados sem
+interpretação, inclusive em WebSocket. Requisições comuns recebem
+``Connection: close`` para que cada conexão carregue uma única requisição.
+"""
+import logging
+import os
+import zlib
+
+from gevent import socket
+from gevent.server import StreamServer
+import gevent
+
+from shards import codigo_na_requisicao, shard_do_codigo, validar_shards
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_MAX_CABECALHO = 16 * 1024
+
+
+def _ler_cabecalho(cliente):
+    """Lê até o fim do cabeçalho HTTP. Retorna (cabecalho, resto) ou (None, None)"""
+    dados = b''
+    while b'\r\n\r\n' not in dados:
+        parte = cliente.recv(4096)
+        if not parte or len(dados) > TAMANHO_MAX_CABECALHO:
+            return None, None
+        dados += parte
+    cabecalho, _, resto = dados.partition(b'\r\n\r\n')
+    return cabecalho, resto
+
+
+def _reescrever_cabecalho(linhas):
+    """Força ``Connection: close`` exceto em pedidos de upgrade (WebSocket)"""
+    upgrade = any(l.lower().startswith(b'upgrade:') for l in linhas[1:])
+    if upgrade:
+        return linhas
+    filtradas = [l for l in linhas if not l.lower().startswith((b'connection:', b'keep-alive:'))]
+    filtradas.append(b'Connection: close')
+    return filtradas
+
+
+def _bombear(origem, destino):
+    try:
+        while True:
+            dados = origem.recv(65536)
+            if not dados:
+                break
+            destino.sendall(dados)
+    except OSError:
+        pass
+    finally:
+        try:
+            destino.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+class Roteador:
+    def __init__(self, backends):
+        self.backends = backends  # lista de (host, porta); índice = SHARD_ID
+        self.contadores = {'conexoes': 0, 'por_codigo': 0, 'por_ip': 0, 'falhas': 0}
+
+    def escolher_backend(self, alvo, ip_cliente):
+        codigo = codigo_na_requisicao(alvo)
+        if codigo:
+            self.contadores['por_codigo'] += 1
+            return self.backends[shard_do_codigo(codigo, len(self.backends))]
+        self.contadores['por_ip'] += 1
+        return self.backends[zlib.crc32(ip_cliente.encode()) % len(self.backends)]
+
+    def tratar(self, cliente, endereco):
+        self.contadores['conexoes'] += 1
+        backend = None
+        try:
+            cabecalho, resto = _ler_cabecalho(cliente)
+            if cabecalho is None:
+                return
+            linhas = cabecalho.split(b'\r\n')
+            partes = linhas[0].split(b' ')
+            alvo = partes[1].decode('latin-1') if len(partes) > 1 else '/'
+            destino = self.escolher_backend(alvo, endereco[0])
+            backend = socket.create_connection(destino)
+            backend.sendall(b'\r\n'.join(_reescrever_cabecalho(linhas)) + b'\r\n\r\n' + resto)
+            subida = gevent.spawn(_bombear, cliente, backend)
+            _bombear(backend, cliente)
+            subida.join()
+        except OSError as e:
+            self.contadores['falhas'] += 1
+            logger.warning(f'Falha ao encaminhar conexão de {endereco[0]}: {e}')
+        finally:
+            if backend is not None:
+                backend.close()
+            cliente.close()
+
+
+def _ler_backends(texto):
+    backends = []
+    for item in texto.split(','):
+        host, _, porta = item.strip().rpartition(':')
+        backends.append((host or '127.0.0.1', int(porta)))
+    return backends
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    backends = _ler_backends(os.environ.get('ROTEADOR_BACKENDS', '127.0.0.1:5001'))
+    validar_shards(len(backends))
+    porta = int(os.environ.get('PORT', 5000))
+    roteador = Roteador(backends)
+    logger.info(f'Roteador em 0.0.0.0:{porta} para {len(backends)} shards: {backends}')
+    StreamServer(('0.0.0.0', porta), roteador.tratar).serve_forever()
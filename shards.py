@@ -0,0 +1,44 @@
+"""
+Afinidade de salas por processo (shards): o código da sala identifica o processo dono
+"""
+import random
+import re
+import string
+
+ALFABETO = string.ascii_uppercase + string.digits
+# O primeiro caractere do código identifica o shard: no máximo um shard por caractere
+MAX_SHARDS = len(ALFABETO)
+
+_RE_CAMINHO_SALA = re.compile(r'/sala/([A-Za-z0-9]+)')
+_RE_QUERY_SALA = re.compile(r'[?&]sala=([A-Za-z0-9]+)')
+
+
+def validar_shards(total_shards):
+    """Levanta ValueError se não houver caracteres iniciais para todos os shards"""
+    if not 1 <= total_shards <= MAX_SHARDS:
+        raise ValueError(f'TOTAL_SHARDS deve estar entre 1 e {MAX_SHARDS} '
+                         f'(um caractere inicial de código por shard), recebido {total_shards}')
+
+
+def shard_do_codigo(codigo, total_shards):
+    """Retorna o shard dono do código (o primeiro caractere codifica o shard)"""
+    if total_shards <= 1 or not codigo:
+        return 0
+    indice = ALFABETO.find(codigo[0].upper())
+    if indice < 0:
+        return 0
+    return indice % total_shards
+
+
+def gerar_codigo(shard_id=0, total_shards=1, tamanho=6):
+    """Gera um código aleatório cujo primeiro caractere pertence ao shard"""
+    if total_shards <= 1:
+        return ''.join(random.choices(ALFABETO, k=tamanho))
+    primeiros = ALFABETO[shard_id::total_shards]
+    return random.choice(primeiros) + ''.join(random.choices(ALFABETO, k=tamanho - 1))
+
+
+def codigo_na_requisicao(alvo):
+    """Extrai o código da sala do alvo HTTP (``/sala/<codigo>`` ou ``?sala=<codigo>``)"""
+    achado = _RE_CAMINHO_SALA.search(alvo) or _RE_QUERY_SALA.search(alvo)
+    return achado.group(1).upper() if achado else None
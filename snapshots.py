@@ -0,0 +1,273 @@
+"""
+Snapshots das salas em disco para recuperar partidas após reinício do processo
+
+Formato (versionado, apenas acréscimos):
+
+    cabeçalho: b'CVSN' + versão (1 byte)
+    registro:  operação (b'S' grava / b'D' remove) + tamanho do código (2 bytes)
+               + tamanho do blob (4 bytes) + código + blob
+
+O blob é a sala serializada por ``armazenamento.serializar_sala``. A cada ciclo
+só as salas alteradas desde o snapshot anterior são acrescentadas; quando o
+arquivo cresce demais ele é reescrito por completo (compactação atômica).
+Na restauração vale o último registro de cada código; um registro truncado
+no fim do arquivo (queda durante a escrita) é ignorado.
+"""
+import argparse
+import logging
+import os
+import struct
+import time
+
+from armazenamento import desserializar_sala, serializar_sala
+
+logger = logging.getLogger(__name__)
+
+MAGICO = b'CVSN'
+VERSAO_FORMATO = 1
+_REGISTRO = struct.Struct('!cHI')
+GRAVAR = b'S'
+REMOVER = b'D'
+
+
+def _registro(operacao, codigo, blob=b''):
+    codigo_bytes = codigo.encode('utf-8')
+    return _REGISTRO.pack(operacao, len(codigo_bytes), len(blob)) + codigo_bytes + blob
+
+
+def ler_snapshot(caminho):
+    """Lê o arquivo e retorna {codigo: blob} com o último estado de cada sala"""
+    blobs = {}
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read()
+    if dados[:len(MAGICO)] != MAGICO:
+        raise ValueError(f'Arquivo de snapshot inválido: {caminho}')
+    versao = dados[len(MAGICO)]
+    if versao != VERSAO_FORMATO:
+        raise ValueError(f'Versão de snapshot não suportada: {versao}')
+    pos = len(MAGICO) + 1
+    visao = memoryview(dados)
+    while pos + _REGISTRO.size <= len(dados):
+        operacao, tam_codigo, tam_blob = _REGISTRO.unpack_from(dados, pos)
+        inicio = pos + _REGISTRO.size
+        fim = inicio + tam_codigo + tam_blob
+        if fim > len(dados):
+            logger.warning(f'Registro truncado no snapshot {caminho} (posição {pos}); ignorando o restante')
+            break
+        codigo = bytes(visao[inicio:inicio + tam_codigo]).decode('utf-8')
+        if operacao == GRAVAR:
+            blobs[codigo] = bytes(visao[inicio + tam_codigo:fim])
+        else:
+            blobs.pop(codigo, None)
+        pos = fim
+    return blobs
+
+
+class GerenciadorSnapshots:
+    """Grava periodicamente, em segundo plano, as salas alteradas do registro"""
+
+    def __init__(self, salas, caminho, socketio=None, intervalo=10):
+        self.salas = salas
+        self.caminho = caminho
+        self.socketio = socketio
+        self.intervalo = max(0.5, intervalo)
+        self._iniciado = False
+        self._registros_no_arquivo = 0
+        self._estatisticas = {
+            'snapshots': 0,
+            'salas_gravadas': 0,
+            'compactacoes': 0,
+            'erros': 0,
+            'ultimo_snapshot_ms': 0.0,
+            'ultima_restauracao_ms': 0.0,
+            'salas_restauradas': 0,
+            'tamanho_bytes': 0,
+        }
+
+    # ===== Ciclo em segundo plano =====
+    def iniciar(self):
+        """Inicia a gravação periódica (apenas uma vez por processo)"""
+        if self._iniciado or self.socketio is None:
+            return
+        self._iniciado = True
+        self.socketio.start_background_task(self._loop)
+        logger.info(f'Snapshots de salas em {self.caminho} a cada {self.intervalo}s')
+
+    def _loop(self):
+        while True:
+            self.socketio.sleep(self.intervalo)
+            try:
+                self.salvar_incremental()
+            except Exception as e:
+                self._estatisticas['erros'] += 1
+                logger.error(f'Erro ao gravar snapshot: {e}', exc_info=True)
+
+    # ===== Gravação =====
+    def salvar_incremental(self):
+        """Acrescenta ao arquivo apenas as salas alteradas/removidas. Retorna quantas gravou"""
+        inicio = time.perf_counter()
+        alteradas, removidas = self.salas.armazenamento.retirar_alteracoes()
+        if not alteradas and not removidas and os.path.exists(self.caminho):
+            return 0
+
+        # Arquivo inexistente ou grande demais: reescrever tudo
+        if not os.path.exists(self.caminho) or self._registros_no_arquivo > 2 * len(self.salas) + 1000:
+            return self.salvar_completo()
+
+        partes = []
+        pendentes = set()
+        for codigo in alteradas:
+            try:
+                partes.append(_registro(GRAVAR, codigo, serializar_sala(self.salas[codigo])))
+            except KeyError:
+                continue
+            except RuntimeError:
+                pendentes.add(codigo)  # alterada durante a serialização: tentar no próximo ciclo
+        for codigo in removidas:
+            partes.append(_registro(REMOVER, codigo))
+        for codigo in pendentes:
+            self.salas.armazenamento.marcar_alterada(codigo)
+
+        with open(self.caminho, 'ab') as arquivo:
+            arquivo.write(b''.join(partes))
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        self._registros_no_arquivo += len(partes)
+        self._registrar(inicio, len(partes))
+        return len(partes)
+
+    def salvar_completo(self):
+        """Reescreve o arquivo com todas as salas (troca atômica). Retorna quantas gravou"""
+        inicio = time.perf_counter()
+        self.salas.armazenamento.retirar_alteracoes()
+        partes = [MAGICO, bytes([VERSAO_FORMATO])]
+        for codigo in list(self.salas):
+            try:
+                partes.append(_registro(GRAVAR, codigo, serializar_sala(self.salas[codigo])))
+            except KeyError:
+                continue
+        temporario = f'{self.caminho}.tmp'
+        diretorio = os.path.dirname(os.path.abspath(self.caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(b''.join(partes))
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.caminho)
+        self._registros_no_arquivo = len(partes) - 2
+        self._estatisticas['compactacoes'] += 1
+        self._registrar(inicio, len(partes) - 2)
+        return len(partes) - 2
+
+    def _registrar(self, inicio, gravadas):
+        self._estatisticas['snapshots'] += 1
+        self._estatisticas['salas_gravadas'] += gravadas
+        self._estatisticas['ultimo_snapshot_ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+        try:
+            self._estatisticas['tamanho_bytes'] = os.path.getsize(self.caminho)
+        except OSError:
+            pass
+
+    # ===== Restauração =====
+    def restaurar(self, preparar=None, ignorar_existentes=False):
+        """Carrega as salas do arquivo no registro. Retorna quantas foram restauradas.
+
+        ``preparar(codigo, sala)`` é chamado antes de cada sala entrar no
+        registro (ex.: abrir janelas de reconexão para os jogadores). Com
+        ``ignorar_existentes`` as salas já presentes no registro são mantidas.
+        """
+        if not os.path.exists(self.caminho):
+            return 0
+        inicio = time.perf_counter()
+        try:
+            blobs = ler_snapshot(self.caminho)
+        except (OSError, ValueError) as e:
+            self._estatisticas['erros'] += 1
+            logger.error(f'Não foi possível ler o snapshot {self.caminho}: {e}')
+            return 0
+
+        restauradas = 0
+        for codigo, blob in blobs.items():
+            if ignorar_existentes and codigo in self.salas:
+                continue
+            try:
+                sala = desserializar_sala(blob)
+                if preparar:
+                    preparar(codigo, sala)
+                self.salas[codigo] = sala
+                restauradas += 1
+            except Exception as e:
+                self._estatisticas['erros'] += 1
+                logger.error(f'Erro ao restaurar sala {codigo}: {e}')
+        # O arquivo já reflete estas salas: não regravá-las no próximo ciclo
+        self.salas.armazenamento.retirar_alteracoes()
+        self._registros_no_arquivo = len(blobs)
+
+        self._estatisticas['salas_restauradas'] = restauradas
+        self._estatisticas['ultima_restauracao_ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+        logger.info(f'{restauradas} salas restauradas de {self.caminho} em {self._estatisticas["ultima_restauracao_ms"]}ms')
+        return restauradas
+
+    def estatisticas(self):
+        """Contadores e tempos para o health check"""
+        return dict(self._estatisticas)
+
+
+def _benchmark(total_salas, caminho):
+    """Mede snapshot completo, incremental (1% alteradas) e restauração"""
+    from jogo import Configuracao, Jogador, PartidaMultiplayer
+    from registro_salas import RegistroSalas
+
+    salas = RegistroSalas()
+    for i in range(total_salas):
+        partida = PartidaMultiplayer(Configuracao(5, 8))
+        nomes = [f'jogador{n}' for n in range(4)]
+        for nome in nomes:
+            jogador = Jogador(nome, 5)
+            partida.adicionar_jogador(jogador)
+            jogador.definir_palavras(['casa', 'carro', 'pedra', 'agua', 'sol'])
+        partida.iniciar_jogo()
+        for n in range(10):
+            partida.adicionar_mensagem_chat(nomes[n % 4], f'mensagem {n}')
+        codigo = f'S{i:07d}'
+        salas[codigo] = {
+            'partida': partida,
+            'criador': 'sid0',
+            'players': {f'sid{n}': nome for n, nome in enumerate(nomes)},
+            'players_prontos': set(nomes[1:]),
+            'palavras': {},
+            'player_ids': {},
+            'avatars': {},
+            'ultimo_acesso': time.time(),
+            'criada_em': time.time(),
+            'modo': 'classico',
+        }
+
+    gerenciador = GerenciadorSnapshots(salas, caminho)
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    gerenciador.salvar_incremental()
+    completo = gerenciador.estatisticas()['ultimo_snapshot_ms']
+    tamanho = os.path.getsize(caminho)
+
+    for codigo in list(salas)[:max(1, total_salas // 100)]:
+        salas.salvar(codigo)
+    gerenciador.salvar_incremental()
+    incremental = gerenciador.estatisticas()['ultimo_snapshot_ms']
+
+    destino = GerenciadorSnapshots(RegistroSalas(), caminho)
+    destino.restaurar()
+    restauracao = destino.estatisticas()['ultima_restauracao_ms']
+
+    print(f'{total_salas} salas, arquivo de {tamanho / 1024:.0f} KiB')
+    print(f'snapshot completo:        {completo:.1f} ms')
+    print(f'snapshot incremental 1%:  {incremental:.1f} ms')
+    print(f'restauração:              {restauracao:.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark dos snapshots de salas')
+    parser.add_argument('--salas', type=int, default=10000)
+    parser.add_argument('--arquivo', default='/tmp/corrente_verbal_bench.snap')
+    args = parser.parse_args()
+    _benchmark(args.salas, args.arquivo)
@@ -0,0 +1,57 @@
+"""
+Visões do estado: o que cada jogador vê dos campos dos outros
+"""
+from delta_estado import calcular_delta, projetar, visiveis_por_jogador
+from jogo import Configuracao, Jogador, PartidaMultiplayer
+
+PALAVRAS = {
+    'Ana': ['casa', 'carro', 'pedra', 'agua'],
+    'Bia': ['sol', 'luar', 'mar', 'ceu'],
+    'Caio': ['um', 'dois', 'tres', 'seis'],
+}
+
+
+def _partida():
+    # Alvos em círculo: Ana -> Bia -> Caio -> Ana
+    partida = PartidaMultiplayer(Configuracao(4, 5))
+    for nome, palavras in PALAVRAS.items():
+        jogador = Jogador(nome, 4)
+        partida.adicionar_jogador(jogador)
+        jogador.definir_palavras(palavras)
+    partida.iniciar_jogo()
+    return partida
+
+
+def _jogador(estado, nome):
+    return next(j for j in estado['jogadores'] if j['nome'] == nome)
+
+
+def test_espectador_ve_dica_mas_nao_palavra_anterior():
+    partida = _partida()
+    partida.tentar_adivinhar('Ana', 'luar')  # acerta a 2ª de Bia (a 1ª já vem revelada)
+    partida.tentar_adivinhar('Ana', 'mel')   # erra a 3ª: revela uma letra a mais
+    estado = partida.get_estado_jogo()
+    visiveis = visiveis_por_jogador(estado)
+    assert visiveis['Caio'] == {'Caio', 'Bia'}
+
+    ana = _jogador(projetar({'versao': 1, 'estado': estado}, estado, visiveis['Caio'])['estado'], 'Ana')
+    bia = _jogador(estado, 'Bia')
+    # A dica é pública: é o mesmo prefixo do tabuleiro (dicas do alvo)
+    assert ana['dica_atual'] == 'ma' == bia['dicas'][ana['palavra_atual_index']]
+    # A palavra anterior inteira só vai para Ana e para Bia, dona da palavra
+    assert 'palavra_anterior' not in ana
+    for nome in ('Ana', 'Bia'):
+        visao = projetar({'versao': 1, 'estado': estado}, estado, visiveis[nome])['estado']
+        assert _jogador(visao, 'Ana')['palavra_anterior'] == 'luar'
+
+
+def test_delta_de_espectador_sem_palavra_anterior():
+    partida = _partida()
+    anterior = partida.get_estado_jogo()
+    partida.tentar_adivinhar('Ana', 'luar')
+    estado = partida.get_estado_jogo()
+    versionado = {'versao': 2, 'base': 1, 'delta': calcular_delta(anterior, estado)}
+
+    caio = projetar(versionado, estado, visiveis_por_jogador(estado)['Caio'])['delta']['jogadores']['Ana']
+    assert caio['dica_atual'] == 'm'
+    assert 'palavra_anterior' not in caio
@@ -0,0 +1,34 @@
+"""
+Palpites errados: a mensagem vai para a sala toda e não pode entregar a resposta
+"""
+import pytest
+
+from jogo import Configuracao, Jogador, PartidaMultiplayer
+
+PALAVRAS_BIA = ['casa', 'irmão', 'coração', 'mesa']
+
+
+def _ana_contra_bia():
+    partida = PartidaMultiplayer(Configuracao(4, 5))
+    for nome, palavras in (('Ana', ['sol', 'lua', 'mar', 'ceu']), ('Bia', PALAVRAS_BIA)):
+        jogador = Jogador(nome, 4)
+        partida.adicionar_jogador(jogador)
+        jogador.definir_palavras(palavras)
+    partida.iniciar_jogo()
+    return partida.obter_jogador('Ana')  # alvo: Bia, tentando 'irmão'
+
+
+@pytest.mark.parametrize('palpite', ['irmap', 'irmaos', 'coracai', 'coracao', 'mesas'])
+def test_palpite_proximo_nao_revela_palavras_do_alvo(palpite):
+    acertou, mensagem = _ana_contra_bia().tentar_adivinhar(palpite)
+
+    assert not acertou
+    texto = mensagem.lower()
+    for palavra in PALAVRAS_BIA[1:]:
+        assert palavra not in texto
+        assert palavra.replace('ã', 'a').replace('ç', 'c') not in texto
+
+
+def test_quase_continua_avisando():
+    _, mensagem = _ana_contra_bia().tentar_adivinhar('irmap')
+    assert mensagem == 'Quase! Nova dica: ir'
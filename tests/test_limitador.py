@@ -0,0 +1,28 @@
+"""
+Limitador de eventos: a cota do jogador vem da associação do SID, não do payload
+"""
+import app
+from limitador import LimitadorEventos
+
+
+def test_payload_nao_troca_o_jogador_associado():
+    limitador = LimitadorEventos({'enviar_emoji': (3, 1.0)}, relogio=lambda: 0.0)
+    limitador.associar('sid-atacante', 'atacante')
+    limitador.associar('sid-atacante', 'vitima')  # troca depois da associação é ignorada
+    limitador.associar('sid-vitima', 'vitima')
+
+    assert [limitador.permitir('enviar_emoji', 'sid-atacante') for _ in range(4)] == [True, True, True, False]
+    assert [limitador.permitir('enviar_emoji', 'sid-vitima') for _ in range(3)] == [True, True, True]
+
+
+def test_evento_com_player_id_alheio_nao_gasta_a_cota_da_vitima():
+    capacidade, _ = app.limitador.limites['enviar_emoji']
+    atacante = app.socketio.test_client(app.app, auth={'player_id': 'atacante'})
+    try:
+        for _ in range(3 * capacidade):
+            atacante.emit('enviar_emoji', {'sala': 'XXXXXX', 'nome': 'Zé', 'emoji': '🔥', 'player_id': 'vitima'})
+        assert app.limitador._descartados['enviar_emoji'] > 0
+        assert ('enviar_emoji', 'p:vitima') not in app.limitador._baldes
+        assert app.limitador._baldes[('enviar_emoji', 'p:atacante')][0] < 1
+    finally:
+        atacante.disconnect()
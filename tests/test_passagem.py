@@ -0,0 +1,90 @@
+"""
+Passagem das salas num reload (HUP): o worker novo sobe antes de o antigo sair
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import RAIZ
+
+# Worker antigo: grava o snapshot, altera/remove salas e só entrega ao receber uma linha
+WORKER_ANTIGO = '''
+import sys
+import app
+cliente = app.socketio.test_client(app.app)
+codigos = []
+for nome in ('Ana', 'Bia'):
+    cliente.emit('criar_sala', {'nome': nome})
+    codigos += [m['args'][0]['codigo'] for m in cliente.get_received() if m['name'] == 'sala_criada']
+alterada, removida = codigos
+app.snapshots.salvar_incremental()
+cliente.emit('enviar_mensagem_chat', {'sala': alterada, 'nome': 'Ana', 'mensagem': 'depois do snapshot'})
+app.remover_sala(removida)
+print(alterada, removida, flush=True)
+sys.stdin.readline()
+app.entregar_salas()
+'''
+
+# Worker novo: aguarda a passagem e imprime as salas que ficaram
+WORKER_NOVO = '''
+import json, sys, time
+import app
+app.receber_salas(espera=float(sys.argv[1]))
+if 'ciclo_snapshot' in sys.argv:
+    # O ciclo de snapshots já roda durante a espera (iniciado com o worker)
+    app.snapshots.salvar_incremental()
+print(len(app.salas), flush=True)
+limite = time.time() + 15
+while not len(app.salas) and time.time() < limite:
+    time.sleep(0.1)
+print(json.dumps({codigo: [m['mensagem'] for m in sala['partida'].chat.desde(0)]
+                  for codigo, sala in app.salas.items()}), flush=True)
+'''
+
+
+def _iniciar(script, tmp_path, *args):
+    env = dict(os.environ,
+               SNAPSHOT_ARQUIVO=str(tmp_path / 'salas.snap'),
+               PASSAGEM_ARQUIVO=str(tmp_path / 'passagem.snap'),
+               LIMITES_EVENTOS='criar_sala=0,enviar_mensagem_chat=0')
+    env.pop('RENDER', None)
+    return subprocess.Popen([sys.executable, '-c', script, *args], cwd=RAIZ, env=env, text=True,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+
+def test_passagem_prevalece_sobre_snapshot_antigo(tmp_path):
+    antigo = _iniciar(WORKER_ANTIGO, tmp_path)
+    alterada, removida = antigo.stdout.readline().split()
+
+    novo = _iniciar(WORKER_NOVO, tmp_path, '10')
+    try:
+        # Enquanto espera a passagem, o worker novo não carrega o snapshot antigo
+        assert novo.stdout.readline().strip() == '0'
+        antigo.communicate('\n', timeout=30)
+        salas = json.loads(novo.stdout.readline())
+    finally:
+        novo.kill()
+        antigo.kill()
+
+    assert removida not in salas
+    assert salas[alterada] == ['depois do snapshot']
+
+
+@pytest.mark.parametrize('extra', [[], ['ciclo_snapshot']])
+def test_sem_passagem_no_prazo_usa_snapshot(tmp_path, extra):
+    antigo = _iniciar(WORKER_ANTIGO, tmp_path)
+    alterada, removida = antigo.stdout.readline().split()
+    antigo.kill()
+
+    novo = _iniciar(WORKER_NOVO, tmp_path, '1', *extra)
+    try:
+        assert novo.stdout.readline().strip() == '0'
+        salas = json.loads(novo.stdout.readline())
+    finally:
+        novo.kill()
+
+    assert set(salas) == {alterada, removida}
+    assert salas[alterada] == []
@@ -0,0 +1,18 @@
+"""
+Shards: o primeiro caractere do código identifica o processo dono da sala
+"""
+import pytest
+
+from shards import MAX_SHARDS, gerar_codigo, shard_do_codigo, validar_shards
+
+
+def test_todo_shard_gera_codigos_proprios_no_maximo():
+    validar_shards(MAX_SHARDS)
+    for shard_id in range(MAX_SHARDS):
+        assert shard_do_codigo(gerar_codigo(shard_id, MAX_SHARDS), MAX_SHARDS) == shard_id
+
+
+@pytest.mark.parametrize('total', [0, MAX_SHARDS + 1])
+def test_total_de_shards_fora_do_alfabeto_e_recusado(total):
+    with pytest.raises(ValueError, match='TOTAL_SHARDS'):
+        validar_shards(total)
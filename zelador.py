@@ -0,0 +1,94 @@
+"""
+Zelador: tarefa periódica em segundo plano que dispara os prazos vencidos das salas
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Zelador:
+    """Dispara, em ciclos periódicos, os prazos vencidos do agendador.
+
+    Cada ciclo processa prazos em lotes até esgotar ``orcamento_ms``; os que
+    sobrarem continuam vencidos e ficam para o próximo ciclo. Usa
+    ``socketio.start_background_task`` e ``socketio.sleep``, funcionando tanto
+    com gevent quanto com threading.
+    """
+
+    TAMANHO_LOTE = 32
+
+    def __init__(self, socketio, agendador, disparar, intervalo=5, orcamento_ms=20):
+        self.socketio = socketio
+        self.agendador = agendador
+        self.disparar = disparar  # callable(chave, tempo_atual) -> bool (sala removida)
+        self.intervalo = max(0.1, intervalo)
+        self.orcamento = max(1.0, orcamento_ms) / 1000.0
+        self._iniciado = False
+        self._contadores = {
+            'ciclos': 0,
+            'ciclos_estourados': 0,
+            'prazos_disparados': 0,
+            'salas_removidas': 0,
+            'erros': 0,
+        }
+        self._ultimo_ciclo_ms = 0.0
+
+    def iniciar(self):
+        """Inicia a tarefa em segundo plano (apenas uma vez por processo)"""
+        if self._iniciado:
+            return
+        self._iniciado = True
+        self.socketio.start_background_task(self._loop)
+        logger.info(f'Zelador iniciado (intervalo={self.intervalo}s, orçamento={self.orcamento * 1000:.0f}ms)')
+
+    def _loop(self):
+        while True:
+            self.socketio.sleep(self.intervalo)
+            try:
+                self.executar_ciclo()
+            except Exception as e:
+                self._contadores['erros'] += 1
+                logger.error(f'Erro no ciclo do zelador: {e}', exc_info=True)
+
+    def executar_ciclo(self, tempo_atual=None):
+        """Dispara prazos vencidos até esgotar o orçamento. Retorna quantos foram disparados"""
+        inicio = time.perf_counter()
+        limite = inicio + self.orcamento
+        tempo_atual = tempo_atual if tempo_atual is not None else time.time()
+
+        disparados = 0
+        while True:
+            if time.perf_counter() >= limite:
+                proximo = self.agendador.proximo_prazo()
+                if proximo is not None and proximo <= tempo_atual:
+                    self._contadores['ciclos_estourados'] += 1
+                break
+            lote = self.agendador.vencidos(tempo_atual, limite=self.TAMANHO_LOTE)
+            if not lote:
+                break
+            for chave in lote:
+                try:
+                    if self.disparar(chave, tempo_atual):
+                        self._contadores['salas_removidas'] += 1
+                except Exception as e:
+                    self._contadores['erros'] += 1
+                    logger.error(f'Erro ao disparar prazo {chave}: {e}', exc_info=True)
+                disparados += 1
+
+        self._contadores['ciclos'] += 1
+        self._contadores['prazos_disparados'] += disparados
+        self._ultimo_ciclo_ms = (time.perf_counter() - inicio) * 1000
+        if disparados:
+            logger.debug(f'Zelador: {disparados} prazos disparados, {len(self.agendador)} agendados')
+        return disparados
+
+    def estatisticas(self):
+        """Contadores para o health check"""
+        return {
+            **self._contadores,
+            'prazos_agendados': len(self.agendador),
+            'ultimo_ciclo_ms': round(self._ultimo_ciclo_ms, 3),
+            'intervalo_s': self.intervalo,
+            'orcamento_ms': self.orcamento * 1000,
+        }